@@ -1,15 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from functools import partial
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
+from typing import List, Optional
 
 from app.utils.database import get_db
 from app.models.calendar import Calendar
 from app.schemas import Calendar as CalendarSchema, CalendarCreate
 from app.services.calendar_sync import sync_calendar
 from app.services.calendar_sync_up import sync_events_up
-from app.services.two_way_sync import full_two_way_sync, sync_icloud_to_homebase, sync_homebase_to_icloud, smart_two_way_sync
-from scripts.hockey_schedule_sync import sync_hockey_events, create_hockey_category, cleanup_old_hockey_events
+from app.services.two_way_sync import audit_two_way_sync, full_two_way_sync, sync_icloud_to_homebase, sync_homebase_to_icloud, smart_two_way_sync
+from app.services.outbox import outbox_status
+from app.services.resilience import upstream_status
+from app.services.tombstones import tombstone_status
+from app.services.sync_gate import sync_gate
+from app.services.sync_scheduler import sync_scheduler, hockey_sync_job
 
 router = APIRouter()
 
@@ -35,10 +40,28 @@ async def get_calendars(db: AsyncSession = Depends(get_db)):
     calendars = result.scalars().all()
     return calendars
 
+@router.get("/sync-status", status_code=status.HTTP_200_OK)
+async def get_sync_status(db: AsyncSession = Depends(get_db)):
+    """Outcome of the last scheduled syncs; pages read this instead of triggering a sync."""
+    result = await db.execute(select(Calendar).filter(Calendar.name == "HomeBase"))
+    homebase = result.scalar_one_or_none()
+    return {
+        "last_synced": homebase.last_synced.isoformat() if homebase and homebase.last_synced else None,
+        "scheduler": sync_scheduler.snapshot(),
+        "outbox": await outbox_status(db),
+        "tombstones": await tombstone_status(db),
+        "upstreams": upstream_status()
+    }
+
+@router.get("/upstreams", status_code=status.HTTP_200_OK)
+async def get_upstreams():
+    """Circuit breaker state of iCloud and the hockey site; an open circuit means syncs are skipped."""
+    return upstream_status()
+
 @router.post("/sync", status_code=status.HTTP_200_OK)
-async def sync_icloud_calendar(db: AsyncSession = Depends(get_db)):
+async def sync_icloud_calendar(max_age: Optional[float] = None):
     """Legacy endpoint - use /sync-two-way for better sync"""
-    sync_result = await sync_calendar(db)
+    sync_result = await sync_gate.run("legacy_import", sync_calendar, max_age)
     if sync_result["status"] == "error":
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -47,9 +70,9 @@ async def sync_icloud_calendar(db: AsyncSession = Depends(get_db)):
     return sync_result
 
 @router.post("/sync-up", status_code=status.HTTP_200_OK)
-async def sync_local_events_to_icloud(db: AsyncSession = Depends(get_db)):
+async def sync_local_events_to_icloud(max_age: Optional[float] = None):
     """Legacy endpoint - use /sync-two-way for better sync"""
-    sync_result = await sync_events_up(db)
+    sync_result = await sync_gate.run("legacy_export", sync_events_up, max_age)
     if sync_result["status"] == "error":
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -58,12 +81,32 @@ async def sync_local_events_to_icloud(db: AsyncSession = Depends(get_db)):
     return sync_result
 
 @router.post("/sync-two-way", status_code=status.HTTP_200_OK)
-async def sync_two_way(db: AsyncSession = Depends(get_db)):
+async def sync_two_way(max_age: Optional[float] = None, dry_run: bool = False):
     """
     NEW: Perform complete two-way sync between HomeBase and iCloud.
     This prevents duplicates by checking both systems before syncing.
+    Concurrent calls share one run; with max_age (seconds) a recent result is reused.
+    With dry_run the planned changes are returned and nothing is written.
     """
-    sync_result = await full_two_way_sync(db)
+    if dry_run:
+        # Its own gate key: a preview never stands in for a real run, or the other way round
+        sync_result = await sync_gate.run("two_way_plan", partial(full_two_way_sync, dry_run=True), max_age)
+    else:
+        sync_result = await sync_gate.run("two_way", full_two_way_sync, max_age)
+    if sync_result["status"] == "error":
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=sync_result["message"],
+        )
+    return sync_result
+
+@router.post("/sync-audit", status_code=status.HTTP_200_OK)
+async def sync_audit(max_age: Optional[float] = None):
+    """
+    Two-way sync of every event, including those outside the sync window that
+    routine syncs leave alone. Runs on its own schedule; this triggers it now.
+    """
+    sync_result = await sync_gate.run("audit", audit_two_way_sync, max_age)
     if sync_result["status"] == "error":
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -72,12 +115,12 @@ async def sync_two_way(db: AsyncSession = Depends(get_db)):
     return sync_result
 
 @router.post("/sync-import", status_code=status.HTTP_200_OK)
-async def sync_import_from_icloud(db: AsyncSession = Depends(get_db)):
+async def sync_import_from_icloud(max_age: Optional[float] = None):
     """
     NEW: Import events from iCloud to HomeBase only.
     Only adds new events or updates existing ones.
     """
-    sync_result = await sync_icloud_to_homebase(db)
+    sync_result = await sync_gate.run("import", sync_icloud_to_homebase, max_age)
     if sync_result["status"] == "error":
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -86,12 +129,12 @@ async def sync_import_from_icloud(db: AsyncSession = Depends(get_db)):
     return sync_result
 
 @router.post("/sync-export", status_code=status.HTTP_200_OK)
-async def sync_export_to_icloud(db: AsyncSession = Depends(get_db)):
+async def sync_export_to_icloud(max_age: Optional[float] = None):
     """
     NEW: Export events from HomeBase to iCloud only.
     Always checks iCloud first to prevent duplicates.
     """
-    sync_result = await sync_homebase_to_icloud(db)
+    sync_result = await sync_gate.run("export", sync_homebase_to_icloud, max_age)
     if sync_result["status"] == "error":
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -100,50 +143,29 @@ async def sync_export_to_icloud(db: AsyncSession = Depends(get_db)):
     return sync_result
 
 @router.post("/sync-hockey", status_code=status.HTTP_200_OK)
-async def sync_hockey_schedule(db: AsyncSession = Depends(get_db)):
+async def sync_hockey_schedule(max_age: Optional[float] = None):
     """Sync hockey schedule from Wallingford Hawks website with full comparison."""
     try:
-        # Create hockey category
-        await create_hockey_category()
-        
-        # Clean up old events
-        cleaned_count = await cleanup_old_hockey_events()
-        
-        # Sync hockey events
-        sync_result = await sync_hockey_events()
-        
-        if sync_result is None:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to sync hockey schedule"
-            )
-        
-        return {
-            "status": "success",
-            "message": "Hockey schedule synced successfully",
-            "details": {
-                "added": sync_result["added"],
-                "updated": sync_result["updated"],
-                "deleted": sync_result["deleted"],
-                "cleaned_up_old": cleaned_count,
-                "total_website_events": sync_result["total_website_events"],
-                "total_db_events": sync_result["total_db_events"],
-                "user": sync_result["user"]
-            }
-        }
+        sync_result = await sync_gate.run("hockey", hockey_sync_job, max_age)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error syncing hockey schedule: {str(e)}"
         )
+    if sync_result["status"] == "error":
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=sync_result["message"]
+        )
+    return sync_result
 
 @router.post("/smart-sync", status_code=status.HTTP_200_OK)
-async def smart_sync(db: AsyncSession = Depends(get_db)):
+async def smart_sync(max_age: Optional[float] = None):
     """
     Smart two-way sync: Pull from iCloud, compare to local, push only truly new local events to iCloud, and update local DB to match iCloud.
     """
-    sync_result = await smart_two_way_sync(db)
-    if sync_result["status"] != "success":
+    sync_result = await sync_gate.run("smart", smart_two_way_sync, max_age)
+    if sync_result["status"] == "error":
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=sync_result["message"],
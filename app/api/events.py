@@ -1,145 +1,131 @@
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from sqlalchemy import and_, delete, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
 from app.utils.database import get_db
-from app.models.events import Event
+from app.models.events import Event, Category
 from app.models.calendar import Calendar
+from app.models.event_fields import storage_time
 from app.schemas import Event as EventSchema, EventCreate, EventUpdate
-from app.services.two_way_sync import sync_icloud_to_homebase, sync_homebase_to_icloud, delete_event_from_icloud
+from app.services.two_way_sync import find_matching_category, reconcile_in_background
+from app.services import tombstones
+from app.services.outbox import DELETE, PUT, deliver_in_background, enqueue
+from app.services.recurrence import default_window, expand_events
 
 router = APIRouter()
 
 @router.post("/", response_model=EventSchema, status_code=status.HTTP_201_CREATED)
-async def create_event(event: EventCreate, db: AsyncSession = Depends(get_db)):
-    """Create a new event: push to iCloud first, then sync local DB from iCloud."""
-    # 1. Create the event in iCloud
-    from icalendar import Event as iEvent, Calendar as iCalendar, vText
-    import caldav
-    from config import settings
-    import uuid
-    from datetime import datetime
-    try:
-        client = caldav.DAVClient(
-            url=settings.caldav_url,
-            username=settings.icloud_username,
-            password=settings.icloud_password
-        )
-        principal = client.principal()
-        caldav_calendars = [c for c in principal.calendars() if c.name == "HomeBase"]
-        if not caldav_calendars:
-            raise HTTPException(status_code=500, detail="HomeBase calendar not found on iCloud")
-        calendar = caldav_calendars[0]
-        # Generate UID and create event
-        event_uid = str(uuid.uuid4())
-        new_ievent = iEvent()
-        new_ievent.add('uid', event_uid)
-        new_ievent.add('summary', event.title)
-        new_ievent.add('dtstart', event.start_time)
-        new_ievent.add('dtend', event.end_time)
-        if event.description:
-            new_ievent.add('description', event.description)
-        if event.location:
-            new_ievent.add('location', vText(event.location))
-        new_ical = iCalendar()
-        new_ical.add_component(new_ievent)
-        calendar.save_event(new_ical.to_ical())
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create event in iCloud: {e}")
-    # 2. Sync local DB from iCloud
-    await sync_icloud_to_homebase(db)
-    # 3. Return the event from the DB (by UID)
-    result = await db.execute(select(Event).where(Event.uid == event_uid))
-    created_event = result.scalar_one_or_none()
-    if not created_event:
-        raise HTTPException(status_code=500, detail="Event created in iCloud but not found in local DB after sync.")
-    return created_event
+async def create_event(event: EventCreate, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+    """Create a new event locally and queue it for iCloud (see services/outbox)."""
+    # 1. Write it locally, together with the outbox operation that delivers it
+    result = await db.execute(select(Calendar).where(Calendar.name == "HomeBase"))
+    homebase = result.scalar_one_or_none()
+    if not homebase:
+        raise HTTPException(status_code=500, detail="HomeBase calendar not found in database.")
+    categories = (await db.execute(select(Category))).scalars().all()
+    category = find_matching_category(event.title, event.description or "", categories)
+    event_uid = str(uuid.uuid4())
+    created_event = Event(
+        uid=event_uid,
+        title=event.title,
+        description=event.description,
+        location=event.location,
+        start_time=storage_time(event.start_time),
+        end_time=storage_time(event.end_time),
+        calendar_id=homebase.id,
+        category_id=category.id if category else None
+    )
+    db.add(created_event)
+    await enqueue(db, event_uid, PUT)
+    await db.flush()
+    created_id = created_event.id
+    await db.commit()
+    # 2. Deliver to iCloud and reconcile everything else after the response is sent
+    background_tasks.add_task(deliver_in_background)
+    background_tasks.add_task(reconcile_in_background)
+    return await _load_event(db, created_id)
 
 @router.get("/", response_model=List[EventSchema])
-async def get_all_events(db: AsyncSession = Depends(get_db)):
+async def get_all_events(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Events overlapping [start, end), recurring series expanded into their occurrences."""
+    default_start, default_end = default_window()
+    start = storage_time(start) if start else default_start
+    end = storage_time(end) if end else default_end
     result = await db.execute(
-        select(Event).options(selectinload(Event.category))
+        select(Event).options(selectinload(Event.category)).where(or_(
+            Event.rrule.isnot(None),
+            Event.series_uid.isnot(None),
+            and_(Event.start_time < end, Event.end_time > start)
+        ))
     )
-    events = result.scalars().all()
-    return events
+    return expand_events(result.scalars().all(), start, end)
 
 @router.patch("/{event_id}", response_model=EventSchema)
 async def update_event(
     event_id: int,
     event_data: EventUpdate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
-    # 1. Get the event from the DB to get UID and start_time
+    """Apply an edit locally and queue it for iCloud; edits not yet delivered collapse into one PUT."""
     event = await db.get(Event, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
-    from icalendar import Event as iEvent, Calendar as iCalendar, vText
-    import caldav
-    from config import settings
-    try:
-        client = caldav.DAVClient(
-            url=settings.caldav_url,
-            username=settings.icloud_username,
-            password=settings.icloud_password
-        )
-        principal = client.principal()
-        caldav_calendars = [c for c in principal.calendars() if c.name == "HomeBase"]
-        if not caldav_calendars:
-            raise HTTPException(status_code=500, detail="HomeBase calendar not found on iCloud")
-        calendar = caldav_calendars[0]
-        # Find the event in iCloud by UID and DTSTART
-        found = False
-        for caldav_event in calendar.events():
-            ical = caldav_event.icalendar_component
-            event_uid = str(ical.get('uid', ''))
-            event_start = ical.get('dtstart')
-            if event_uid == event.uid and event_start and getattr(event_start, 'dt', None) == event.start_time:
-                # Update fields
-                new_ievent = iEvent()
-                new_ievent.add('uid', event.uid)
-                new_ievent.add('summary', event_data.title or event.title)
-                new_ievent.add('dtstart', event_data.start_time or event.start_time)
-                new_ievent.add('dtend', event_data.end_time or event.end_time)
-                if event_data.description is not None:
-                    new_ievent.add('description', event_data.description)
-                elif event.description:
-                    new_ievent.add('description', event.description)
-                if event_data.location is not None:
-                    new_ievent.add('location', vText(event_data.location))
-                elif event.location:
-                    new_ievent.add('location', vText(event.location))
-                new_ical = iCalendar()
-                new_ical.add_component(new_ievent)
-                caldav_event.delete()
-                calendar.save_event(new_ical.to_ical())
-                found = True
-                break
-        if not found:
-            raise HTTPException(status_code=404, detail="Event not found in iCloud for update")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to update event in iCloud: {e}")
-    # 2. Sync local DB from iCloud
-    await sync_icloud_to_homebase(db)
-    # 3. Return the updated event from the DB
-    result = await db.execute(select(Event).where(Event.uid == event.uid))
-    updated_event = result.scalar_one_or_none()
-    if not updated_event:
-        raise HTTPException(status_code=500, detail="Event updated in iCloud but not found in local DB after sync.")
-    return updated_event
+    if event.series_uid:
+        raise HTTPException(status_code=400, detail="Single occurrences of a recurring event can only be changed in iCloud")
+    # 1. Apply the change locally, together with the outbox operation that delivers it
+    if event_data.title:
+        event.title = event_data.title
+    if event_data.start_time:
+        event.start_time = storage_time(event_data.start_time)
+    if event_data.end_time:
+        event.end_time = storage_time(event_data.end_time)
+    if event_data.description is not None:
+        event.description = event_data.description
+    if event_data.location is not None:
+        event.location = event_data.location
+    if event_data.category_id is not None:
+        event.category_id = event_data.category_id
+    db.add(event)
+    await enqueue(db, event.uid, PUT)
+    await db.commit()
+    # 2. Deliver to iCloud and reconcile everything else after the response is sent
+    background_tasks.add_task(deliver_in_background)
+    background_tasks.add_task(reconcile_in_background)
+    return await _load_event(db, event_id)
 
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_event(event_id: int, db: AsyncSession = Depends(get_db)):
-    # 1. Get the event from the DB to get UID and start_time
+async def delete_event(event_id: int, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+    """Delete an event locally and queue its removal from iCloud."""
     event = await db.get(Event, event_id)
     if not event:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Event not found")
-    # 2. Delete from iCloud first
-    deleted = await delete_event_from_icloud(event.uid, event.start_time)
-    if not deleted:
-        raise HTTPException(status_code=500, detail="Failed to delete event from iCloud or event not found in iCloud")
-    # 3. Sync local DB from iCloud
-    await sync_icloud_to_homebase(db)
-    return 
\ No newline at end of file
+    if event.series_uid:
+        raise HTTPException(status_code=400, detail="Single occurrences of a recurring event can only be changed in iCloud")
+    # 1. Remove it locally; the outbox keeps its href for the DELETE, and the
+    #    tombstone keeps syncs from bringing it back before iCloud has it
+    await enqueue(db, event.uid, DELETE, event.remote_href)
+    await tombstones.record(db, [(event.uid, event.remote_href)], tombstones.LOCAL)
+    if event.rrule:
+        await db.execute(delete(Event).where(Event.series_uid == event.uid))
+    await db.delete(event)
+    await db.commit()
+    # 2. Deliver to iCloud and reconcile everything else after the response is sent
+    background_tasks.add_task(deliver_in_background)
+    background_tasks.add_task(reconcile_in_background)
+    return
+
+async def _load_event(db: AsyncSession, event_id: int) -> Event:
+    result = await db.execute(
+        select(Event).options(selectinload(Event.category)).where(Event.id == event_id)
+    )
+    return result.scalar_one()
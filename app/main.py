@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
@@ -6,8 +7,22 @@ import os
 
 # Routers
 from app.api import events, categories, calendar
-
-app = FastAPI(title="HomeBase Calendar")
+from app.utils.database import init_db
+from app.services.caldav_client import caldav_session
+from app.services.sync_scheduler import sync_scheduler
+from config import settings
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bring older database.db files up to the current schema
+    await init_db()
+    if settings.scheduler_enabled:
+        sync_scheduler.start()
+    yield
+    sync_scheduler.shutdown()
+    await caldav_session.aclose()
+
+app = FastAPI(title="HomeBase Calendar", lifespan=lifespan)
 
 # Frontend is now in the same directory as the app
 frontend_dir = os.path.join(os.getcwd(), "frontend")
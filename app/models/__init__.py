@@ -1,3 +1,5 @@
 from .calendar import Calendar
 from .events import Event, Category
-from .sync_logs import SyncLog 
\ No newline at end of file
+from .outbox import OutboxOperation
+from .sync_logs import SyncLog 
+from .tombstone import Tombstone
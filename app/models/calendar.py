@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, JSON
 from sqlalchemy.orm import relationship
 from app.utils.database import Base
 
@@ -9,6 +9,8 @@ class Calendar(Base):
     name = Column(String(255), nullable=False, unique=True)
     url = Column(String(500), nullable=False)
     last_synced = Column(DateTime, nullable=True)
+    sync_token = Column(String(500), nullable=True)  # RFC 6578 sync-collection token
+    feed_state = Column(JSON, nullable=True)  # {consumer: {etag, last_modified, digest}} for the webcal feed
 
     events = relationship("Event", back_populates="calendar", cascade="all, delete-orphan")
     sync_logs = relationship("SyncLog", back_populates="calendar", cascade="all, delete-orphan") 
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Canonical form of the event fields compared during sync, so an unchanged event
+compares equal whether it comes from iCloud or from SQLite, and its fingerprint.
+"""
+
+import hashlib
+from datetime import date, datetime, time, timezone
+from typing import Any, Optional, Tuple, Union
+
+TimeValue = Union[datetime, date, None]
+
+
+def storage_time(value: TimeValue) -> Optional[datetime]:
+    """The value as stored in events.start_time/end_time: a naive local datetime."""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        # All-day: midnight of that day
+        return datetime.combine(value, time.min)
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def canonical_time(value: TimeValue) -> Union[datetime, date, None]:
+    """A timed value as an aware UTC datetime to the second; dates are left as they are."""
+    if value is None or not isinstance(value, datetime):
+        return value
+    # astimezone() reads a naive datetime as local time
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def is_all_day(start: TimeValue, end: TimeValue) -> bool:
+    """Plain dates, or a stored midnight-to-midnight span of whole days."""
+    if start is not None and not isinstance(start, datetime):
+        return True
+    start, end = storage_time(start), storage_time(end)
+    return (
+        start is not None and end is not None and end > start and
+        start.time() == time.min and end.time() == time.min
+    )
+
+
+def canonical_text(value: Any) -> str:
+    """vText and str compare equal, None equals '', and line endings and outer whitespace are ignored."""
+    if value is None:
+        return ''
+    return str(value).replace('\r\n', '\n').strip()
+
+
+def canonical_fields(event) -> Tuple:
+    """
+    The synced fields of an iCloud event dict or an Event row, in a form
+    that is equal for both whenever they describe the same event.
+    """
+    get = event.get if isinstance(event, dict) else lambda name: getattr(event, name)
+    start, end = get('start_time'), get('end_time')
+    if is_all_day(start, end):
+        times = (storage_time(start).date(), storage_time(end).date() if end is not None else None)
+    else:
+        times = (canonical_time(start), canonical_time(end))
+    return (
+        canonical_text(get('title')),
+        canonical_text(get('description')),
+        canonical_text(get('location')),
+    ) + times
+
+
+def fields_differ(a, b) -> bool:
+    return canonical_fields(a) != canonical_fields(b)
+
+
+def recurrence_fields(event) -> Tuple:
+    """RRULE and EXDATEs (as stored, see recurrence) of a series master; empty for other events."""
+    if isinstance(event, dict):
+        return (event.get('rrule') or '', event.get('exdates') or '')
+    return (getattr(event, 'rrule', None) or '', getattr(event, 'exdates', None) or '')
+
+
+def fingerprint(event) -> str:
+    """Hash of canonical_fields(): equal fingerprints mean there is nothing to sync."""
+    parts = []
+    for value in canonical_fields(event):
+        if value is None:
+            parts.append('')
+        elif isinstance(value, date):
+            parts.append(value.isoformat())
+        else:
+            parts.append(value)
+    recurrence = recurrence_fields(event)
+    if any(recurrence):
+        # Only series hash their rule, so single events keep their fingerprints
+        parts.extend(recurrence)
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, func
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, event, func
 from sqlalchemy.orm import relationship
 from app.utils.database import Base
 from datetime import datetime
 from .calendar import Calendar
+from .event_fields import fingerprint
 
 class Category(Base):
     __tablename__ = "categories"
@@ -30,6 +31,21 @@ class Event(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     synced_at = Column(DateTime(timezone=True), nullable=True)
+    remote_href = Column(String, nullable=True, index=True)  # CalDAV resource href on iCloud
+    remote_etag = Column(String, nullable=True)  # ETag of that resource when last seen
+    content_hash = Column(String, nullable=True, index=True)  # fingerprint() of the synced fields
+    remote_sequence = Column(Integer, nullable=True)  # SEQUENCE of the iCloud copy when last synced
+    rrule = Column(String, nullable=True)  # RRULE of a recurring master (see recurrence)
+    exdates = Column(Text, nullable=True)  # EXDATEs of a recurring master, comma-separated
+    recurrence_id = Column(DateTime, nullable=True)  # On an override: start of the occurrence it replaces
+    series_uid = Column(String, nullable=True, index=True)  # On an override: uid of its master
     
     calendar = relationship("Calendar", back_populates="events")
-    category = relationship("Category", back_populates="events") 
\ No newline at end of file
+    category = relationship("Category", back_populates="events") 
+
+
+@event.listens_for(Event, "before_insert")
+@event.listens_for(Event, "before_update")
+def _update_content_hash(mapper, connection, target):
+    # Every writer (sync, API, hockey script) keeps the fingerprint current
+    target.content_hash = fingerprint(target)
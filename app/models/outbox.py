@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from app.utils.database import Base
+from datetime import datetime
+
+class OutboxOperation(Base):
+    """A local write waiting to be delivered to iCloud (see services/outbox)."""
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_uid = Column(String, unique=True, index=True, nullable=False)  # One operation per event
+    operation = Column(String, nullable=False)  # "put" or "delete"
+    remote_href = Column(String, nullable=True)  # Resource to delete (the event row is gone by then)
+    status = Column(String, nullable=False, default="pending")  # "pending" or "failed"
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.utils.database import Base
+from datetime import datetime
+
+class Tombstone(Base):
+    """A deleted event, kept for a while so the deletion reaches the other side (see services/tombstones)."""
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    uid = Column(String, unique=True, index=True, nullable=False)
+    origin = Column(String, nullable=False)  # "icloud" or "local": where the event was deleted
+    remote_href = Column(String, nullable=True)  # Resource the event was stored in, if known
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    propagated_at = Column(DateTime, nullable=True)  # When the other side was known to be rid of it too
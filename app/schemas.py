@@ -47,6 +47,7 @@ class Event(EventBase):
     uid: str
     calendar_id: int
     category: Optional[Category] = None
+    recurrence_id: Optional[datetime] = None  # Set on occurrences of a recurring event
     model_config = ConfigDict(from_attributes=True)
 
 # --- Calendar Schemas ---
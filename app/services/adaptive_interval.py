@@ -0,0 +1,44 @@
+"""
+Adaptive intervals for the scheduled syncs: longer while runs change nothing,
+shorter when they do, the floor while events are about to start.
+"""
+
+from datetime import timedelta
+from typing import Dict
+
+
+class AdaptiveInterval:
+    def __init__(self, base: timedelta, floor: timedelta, ceiling: timedelta, idle_runs: int):
+        self.base = min(max(base, floor), ceiling)
+        self.floor = floor
+        self.ceiling = ceiling
+        self.idle_runs = idle_runs
+        self.current = self.base
+        self.unchanged_runs = 0
+        self.upcoming = False
+
+    def record(self, changed: bool) -> timedelta:
+        """Fold one successful run into the interval; returns the new current interval."""
+        if changed:
+            self.unchanged_runs = 0
+            # From the configured interval if it had grown past it, so a burst is followed closely
+            self.current = max(self.floor, min(self.current, self.base) / 2)
+        else:
+            self.unchanged_runs += 1
+            if self.unchanged_runs >= self.idle_runs:
+                self.current = min(self.ceiling, self.current * 2)
+        return self.current
+
+    def next_interval(self, upcoming: bool) -> timedelta:
+        """Delay until the next run; the floor while events are about to start."""
+        self.upcoming = upcoming
+        return self.floor if upcoming else self.current
+
+    def report(self) -> Dict:
+        return {
+            "interval_minutes": round((self.floor if self.upcoming else self.current).total_seconds() / 60, 1),
+            "floor_minutes": round(self.floor.total_seconds() / 60, 1),
+            "ceiling_minutes": round(self.ceiling.total_seconds() / 60, 1),
+            "unchanged_runs": self.unchanged_runs,
+            "upcoming_events": self.upcoming,
+        }
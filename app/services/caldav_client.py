@@ -0,0 +1,500 @@
+"""
+Async CalDAV access to the iCloud HomeBase calendar over one shared httpx
+client. Errors are raised as the caldav library's exception types.
+"""
+
+import httpx
+import logging
+import sys
+import os
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from caldav.lib.error import AuthorizationError, DAVError, DeleteError, NotFoundError, PutError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, urljoin, urlparse
+from xml.sax.saxutils import escape
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.models.calendar import Calendar as CalendarModel
+from app.services.resilience import ICLOUD_CALDAV, retry_after
+from app.utils.database import AsyncSessionLocal
+from config import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DAV_NS = "DAV:"
+CALDAV_NS = "urn:ietf:params:xml:ns:caldav"
+
+
+class SyncTokenInvalid(Exception):
+    """The server no longer recognises our sync token (RFC 6578 valid-sync-token)."""
+
+
+class SyncCollectionUnsupported(Exception):
+    """The server does not support sync-collection / calendar-multiget."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CalendarNotFound(Exception):
+    """The HomeBase calendar could not be found on the CalDAV server."""
+
+
+class PreconditionFailed(Exception):
+    """If-Match failed (HTTP 412): the resource changed on the server since we saw it."""
+
+
+class ServerBusy(Exception):
+    """The server is throttling us (HTTP 429 or 503)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class SyncDelta:
+    sync_token: str
+    changed: Dict[str, str] = field(default_factory=dict)  # href -> etag
+    deleted: List[str] = field(default_factory=list)
+
+
+def has_caldav_credentials() -> bool:
+    return bool(settings.caldav_url and settings.icloud_username and settings.icloud_password)
+
+
+def caldav_auth() -> httpx.BasicAuth:
+    return httpx.BasicAuth(settings.icloud_username, settings.icloud_password)
+
+
+def is_caldav_collection_url(url: Optional[str]) -> bool:
+    """
+    True if url points at a CalDAV calendar collection (as opposed to the
+    published webcal feed, which is what new Calendar rows are seeded with).
+    """
+    if not url or not url.startswith('https://'):
+        return False
+    return '/calendars/' in url and '/published/' not in url
+
+
+class CalDAVCalendar:
+    """
+    One calendar collection on the CalDAV server.
+    Holds the absolute collection URL and the session's httpx client; the
+    resource helpers below take it as their first argument.
+    """
+
+    def __init__(self, http: httpx.AsyncClient, url: str):
+        self.http = http
+        self.url = url if url.endswith('/') else url + '/'
+
+    def resource_url(self, href: str) -> str:
+        return urljoin(self.url, href)
+
+
+def is_resource_url(calendar: CalDAVCalendar, url: Optional[str]) -> bool:
+    """Whether url is a resource inside the calendar collection (not the collection itself)."""
+    if not url:
+        return False
+    path = urlparse(calendar.resource_url(url)).path
+    collection = urlparse(calendar.url).path
+    return path.startswith(collection) and path.rstrip('/') != collection.rstrip('/')
+
+
+class CalDAVSessionManager:
+    """
+    Process-wide CalDAV session for the HomeBase calendar.
+
+    Holds one httpx.AsyncClient (and with it one pooled connection) and the
+    resolved calendar. The calendar URL is persisted in Calendar.url so later
+    processes skip principal/calendar discovery; it is re-discovered only
+    after a 401, or a 404 for the calendar itself.
+    """
+
+    def __init__(self, calendar_name: str = "HomeBase"):
+        self.calendar_name = calendar_name
+        self._calendar: Optional[CalDAVCalendar] = None
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            # Timeouts, retries and the circuit breaker come with the upstream's transport
+            self._http = ICLOUD_CALDAV.client(
+                auth=caldav_auth(),
+                follow_redirects=True,
+            )
+        return self._http
+
+    def invalidate(self):
+        """Forget the resolved calendar so the next call re-resolves it."""
+        self._calendar = None
+
+    async def get_calendar(self, db: Optional[AsyncSession] = None, rediscover: bool = False) -> CalDAVCalendar:
+        """
+        Return the HomeBase calendar.
+        Uses the cached handle, then the URL stored in Calendar.url, and only
+        falls back to PROPFIND discovery when neither is available (or when
+        rediscover is set because the stored URL stopped working).
+        If db is given a newly discovered URL is set on its Calendar row and
+        committed with the caller's next commit; otherwise it is committed here.
+        """
+        if self._calendar is not None and not rediscover:
+            return self._calendar
+
+        if db is not None:
+            calendar_row = await self._load_row(db)
+            url = await self._resolve_url(calendar_row, rediscover)
+            if calendar_row is not None and calendar_row.url != url:
+                calendar_row.url = url
+                db.add(calendar_row)
+        else:
+            async with AsyncSessionLocal() as own_db:
+                calendar_row = await self._load_row(own_db)
+                url = await self._resolve_url(calendar_row, rediscover)
+                if calendar_row is not None and calendar_row.url != url:
+                    calendar_row.url = url
+                    await own_db.commit()
+
+        self._calendar = CalDAVCalendar(self.http, url)
+        return self._calendar
+
+    async def run(self, operation: Callable[[CalDAVCalendar], Awaitable], db: Optional[AsyncSession] = None):
+        """
+        Await operation(calendar). On a 401, or a 404 for the collection (or any
+        URL outside it, such as the principal), the calendar is re-discovered
+        once and the operation retried. A 404 for a resource in the collection
+        is the caller's to handle.
+        """
+        calendar = await self.get_calendar(db)
+        try:
+            return await operation(calendar)
+        except (AuthorizationError, NotFoundError, SyncCollectionUnsupported) as e:
+            if isinstance(e, SyncCollectionUnsupported) and e.status_code not in (401, 404):
+                raise
+            if isinstance(e, NotFoundError) and is_resource_url(calendar, e.url):
+                raise
+            logger.info(f"CalDAV {type(e).__name__}, re-discovering '{self.calendar_name}' calendar")
+            self.invalidate()
+            calendar = await self.get_calendar(db, rediscover=True)
+            return await operation(calendar)
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self._calendar = None
+
+    async def _load_row(self, db: AsyncSession):
+        result = await db.execute(select(CalendarModel).where(CalendarModel.name == self.calendar_name))
+        return result.scalar_one_or_none()
+
+    async def _resolve_url(self, calendar_row, rediscover: bool = False) -> str:
+        if not rediscover and calendar_row is not None and is_caldav_collection_url(calendar_row.url):
+            return calendar_row.url
+        url = await discover_calendar_url(self.http, settings.caldav_url, self.calendar_name)
+        if not url:
+            raise CalendarNotFound(f"Calendar '{self.calendar_name}' not found on iCloud.")
+        return url
+
+
+caldav_session = CalDAVSessionManager()
+
+
+def _tag(ns: str, name: str) -> str:
+    return f"{{{ns}}}{name}"
+
+
+def _parse_multistatus(body: bytes) -> Tuple[List[Tuple[str, int, Dict[str, ET.Element]]], Optional[str]]:
+    """
+    Parse a 207 multistatus body.
+    Returns ([(href, status_code, {prop_tag: element})], sync_token).
+    The status is the response-level status if present, else the 200 propstat status.
+    """
+    root = ET.fromstring(body)
+    responses = []
+    for response in root.findall(_tag(DAV_NS, 'response')):
+        href_el = response.find(_tag(DAV_NS, 'href'))
+        if href_el is None or not href_el.text:
+            continue
+        href = href_el.text.strip()
+
+        status = None
+        status_el = response.find(_tag(DAV_NS, 'status'))
+        if status_el is not None and status_el.text:
+            status = _status_code(status_el.text)
+
+        props = {}
+        for propstat in response.findall(_tag(DAV_NS, 'propstat')):
+            ps_status_el = propstat.find(_tag(DAV_NS, 'status'))
+            ps_status = _status_code(ps_status_el.text) if ps_status_el is not None and ps_status_el.text else 200
+            if ps_status != 200:
+                continue
+            prop = propstat.find(_tag(DAV_NS, 'prop'))
+            if prop is None:
+                continue
+            for child in prop:
+                props[child.tag] = child
+            if status is None:
+                status = 200
+
+        responses.append((href, status or 200, props))
+
+    token_el = root.find(_tag(DAV_NS, 'sync-token'))
+    sync_token = token_el.text.strip() if token_el is not None and token_el.text else None
+    return responses, sync_token
+
+
+def _status_code(status_line: str) -> int:
+    # "HTTP/1.1 404 Not Found" -> 404
+    parts = status_line.split()
+    try:
+        return int(parts[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+async def _report(client: httpx.AsyncClient, url: str, body: str) -> httpx.Response:
+    return await client.request(
+        "REPORT",
+        url,
+        content=body.encode('utf-8'),
+        headers={"Depth": "1", "Content-Type": "application/xml; charset=utf-8"},
+    )
+
+
+def _raise_for_status(response: httpx.Response, what: str, ok: Tuple[int, ...], error=DAVError):
+    if response.status_code in ok:
+        return
+    if response.status_code == 401:
+        raise AuthorizationError(str(response.url), f"{what} returned HTTP 401")
+    if response.status_code == 404:
+        raise NotFoundError(str(response.url), f"{what} returned HTTP 404")
+    if response.status_code == 412:
+        raise PreconditionFailed(f"{what}: resource changed on the server")
+    if response.status_code in (429, 503):
+        raise ServerBusy(f"{what} returned HTTP {response.status_code}", retry_after(response))
+    raise error(str(response.url), f"{what} returned HTTP {response.status_code}")
+
+
+async def _propfind(client: httpx.AsyncClient, url: str, props: str, depth: str = "0") -> Tuple[str, List[Tuple[str, int, Dict[str, ET.Element]]]]:
+    """PROPFIND url; returns (final URL after redirects, parsed responses)."""
+    body = (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<d:propfind xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">'
+        f'<d:prop>{props}</d:prop>'
+        '</d:propfind>'
+    )
+    response = await client.request(
+        "PROPFIND",
+        url,
+        content=body.encode('utf-8'),
+        headers={"Depth": depth, "Content-Type": "application/xml; charset=utf-8"},
+    )
+    _raise_for_status(response, f"PROPFIND {url}", ok=(207,))
+    responses, _ = _parse_multistatus(response.content)
+    return str(response.url), responses
+
+
+def _prop_href(props: Dict[str, ET.Element], ns: str, name: str) -> Optional[str]:
+    el = props.get(_tag(ns, name))
+    if el is None:
+        return None
+    href_el = el.find(_tag(DAV_NS, 'href'))
+    return href_el.text.strip() if href_el is not None and href_el.text else None
+
+
+async def discover_calendar_url(client: httpx.AsyncClient, caldav_url: str, calendar_name: str) -> Optional[str]:
+    """
+    Find the collection URL of the calendar named calendar_name:
+    current-user-principal -> calendar-home-set -> Depth 1 listing of the home.
+    """
+    base, responses = await _propfind(client, caldav_url, '<d:current-user-principal/>')
+    principal = next((_prop_href(p, DAV_NS, 'current-user-principal') for _, _, p in responses), None)
+    if not principal:
+        return None
+
+    base, responses = await _propfind(client, urljoin(base, principal), '<c:calendar-home-set/>')
+    home = next((_prop_href(p, CALDAV_NS, 'calendar-home-set') for _, _, p in responses), None)
+    if not home:
+        return None
+
+    base, responses = await _propfind(client, urljoin(base, home), '<d:displayname/><d:resourcetype/>', depth="1")
+    for href, status, props in responses:
+        resourcetype = props.get(_tag(DAV_NS, 'resourcetype'))
+        if resourcetype is None or resourcetype.find(_tag(CALDAV_NS, 'calendar')) is None:
+            continue
+        name_el = props.get(_tag(DAV_NS, 'displayname'))
+        if name_el is not None and (name_el.text or '').strip() == calendar_name:
+            return urljoin(base, href)
+    return None
+
+
+async def sync_collection(client: httpx.AsyncClient, calendar_url: str, sync_token: Optional[str]) -> SyncDelta:
+    """
+    Run an RFC 6578 sync-collection REPORT against calendar_url.
+    With no token the server lists every resource (initial sync).
+    Raises SyncTokenInvalid if the token has expired and SyncCollectionUnsupported
+    if the server cannot do sync-collection at all.
+    """
+    body = (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<d:sync-collection xmlns:d="DAV:">'
+        f'<d:sync-token>{escape(sync_token or "")}</d:sync-token>'
+        '<d:sync-level>1</d:sync-level>'
+        '<d:prop><d:getetag/></d:prop>'
+        '</d:sync-collection>'
+    )
+    response = await _report(client, calendar_url, body)
+
+    if response.status_code in (403, 409) and b'valid-sync-token' in response.content:
+        raise SyncTokenInvalid(f"Sync token rejected by server ({response.status_code})")
+    if response.status_code != 207:
+        raise SyncCollectionUnsupported(f"sync-collection returned HTTP {response.status_code}", response.status_code)
+
+    responses, new_token = _parse_multistatus(response.content)
+    if not new_token:
+        raise SyncCollectionUnsupported("sync-collection response carried no sync-token")
+
+    delta = SyncDelta(sync_token=new_token)
+    for href, status, props in responses:
+        if status == 404:
+            delta.deleted.append(href)
+            continue
+        if not href.endswith('.ics'):
+            continue
+        etag_el = props.get(_tag(DAV_NS, 'getetag'))
+        delta.changed[href] = etag_el.text.strip() if etag_el is not None and etag_el.text else ''
+    return delta
+
+
+async def calendar_multiget(client: httpx.AsyncClient, calendar_url: str, hrefs: List[str]) -> List[Tuple[str, str, str]]:
+    """
+    Fetch several calendar resources in one calendar-multiget REPORT.
+    Returns [(href, etag, ical_text)]; hrefs the server reports as missing are omitted.
+    """
+    if not hrefs:
+        return []
+    href_xml = ''.join(f'<d:href>{escape(href)}</d:href>' for href in hrefs)
+    body = (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<c:calendar-multiget xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">'
+        '<d:prop><d:getetag/><c:calendar-data/></d:prop>'
+        f'{href_xml}'
+        '</c:calendar-multiget>'
+    )
+    response = await _report(client, calendar_url, body)
+    if response.status_code != 207:
+        raise SyncCollectionUnsupported(f"calendar-multiget returned HTTP {response.status_code}", response.status_code)
+
+    responses, _ = _parse_multistatus(response.content)
+    resources = []
+    for href, status, props in responses:
+        if status != 200:
+            continue
+        data_el = props.get(_tag(CALDAV_NS, 'calendar-data'))
+        if data_el is None or not data_el.text:
+            continue
+        etag_el = props.get(_tag(DAV_NS, 'getetag'))
+        etag = etag_el.text.strip() if etag_el is not None and etag_el.text else ''
+        resources.append((href, etag, data_el.text))
+    return resources
+
+
+async def calendar_query_uid(client: httpx.AsyncClient, calendar_url: str, uid: str) -> List[Tuple[str, str, str]]:
+    """
+    Find VEVENT resources whose UID contains uid with a calendar-query REPORT.
+    text-match is a substring match, so UIDs with the old timestamp suffixes are found too.
+    Returns [(href, etag, ical_text)].
+    """
+    body = (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<c:calendar-query xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">'
+        '<d:prop><d:getetag/><c:calendar-data/></d:prop>'
+        '<c:filter><c:comp-filter name="VCALENDAR"><c:comp-filter name="VEVENT">'
+        f'<c:prop-filter name="UID"><c:text-match collation="i;octet">{escape(uid)}</c:text-match></c:prop-filter>'
+        '</c:comp-filter></c:comp-filter></c:filter>'
+        '</c:calendar-query>'
+    )
+    response = await _report(client, calendar_url, body)
+    if response.status_code != 207:
+        raise SyncCollectionUnsupported(f"calendar-query returned HTTP {response.status_code}", response.status_code)
+
+    responses, _ = _parse_multistatus(response.content)
+    resources = []
+    for href, status, props in responses:
+        if status != 200:
+            continue
+        data_el = props.get(_tag(CALDAV_NS, 'calendar-data'))
+        etag_el = props.get(_tag(DAV_NS, 'getetag'))
+        etag = etag_el.text.strip() if etag_el is not None and etag_el.text else ''
+        resources.append((href, etag, data_el.text if data_el is not None and data_el.text else ''))
+    return resources
+
+
+def event_href(calendar: CalDAVCalendar, uid: str) -> str:
+    """Server-relative href for a new resource named after uid, the same form REPORT responses use."""
+    return urlparse(calendar.url).path + quote(uid) + ".ics"
+
+
+async def get_resource(calendar: CalDAVCalendar, href: str) -> Tuple[str, str]:
+    """
+    GET one calendar resource by href.
+    Returns (ical_text, etag).
+    """
+    response = await calendar.http.get(calendar.resource_url(href))
+    _raise_for_status(response, f"GET {href}", ok=(200,))
+    return response.text, response.headers.get('ETag', '')
+
+
+async def put_resource(calendar: CalDAVCalendar, href: str, ical_data: bytes, etag: Optional[str] = None) -> Optional[str]:
+    """
+    PUT a calendar resource in place.
+    With an etag the write is conditional (If-Match) and PreconditionFailed is
+    raised if the resource changed on the server meanwhile.
+    Returns the new ETag if the server sent one.
+    """
+    headers = {"Content-Type": 'text/calendar; charset="utf-8"'}
+    if etag:
+        headers["If-Match"] = etag
+    response = await calendar.http.put(calendar.resource_url(href), content=ical_data, headers=headers)
+    _raise_for_status(response, f"PUT {href}", ok=(200, 201, 204), error=PutError)
+    return response.headers.get('ETag')
+
+
+async def create_resource(calendar: CalDAVCalendar, uid: str, ical_data: bytes) -> Tuple[str, Optional[str]]:
+    """
+    Store a new event as <uid>.ics in the calendar, unless a resource is
+    already there (If-None-Match: *). An existing one is kept and its ETag
+    returned; the next pull reconciles it with the local row.
+    Returns (href, etag).
+    """
+    href = event_href(calendar, uid)
+    headers = {"Content-Type": 'text/calendar; charset="utf-8"', "If-None-Match": "*"}
+    response = await calendar.http.put(calendar.resource_url(href), content=ical_data, headers=headers)
+    if response.status_code == 412:
+        # E.g. a retried create whose first response was lost
+        logger.info(f"{href} already exists in iCloud; keeping the stored copy")
+        _text, etag = await get_resource(calendar, href)
+        return href, etag
+    _raise_for_status(response, f"PUT {href}", ok=(200, 201, 204), error=PutError)
+    return href, response.headers.get('ETag')
+
+
+async def delete_resource(calendar: CalDAVCalendar, href: str) -> bool:
+    """
+    DELETE one calendar resource by href.
+    Returns False if it was already gone.
+    """
+    response = await calendar.http.delete(calendar.resource_url(href))
+    if response.status_code == 404:
+        return False
+    _raise_for_status(response, f"DELETE {href}", ok=(200, 204), error=DeleteError)
+    return True
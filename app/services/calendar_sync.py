@@ -1,6 +1,6 @@
 import caldav
 from caldav.lib.error import AuthorizationError, NotFoundError
-from icalendar import Calendar
+from sqlalchemy import and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from datetime import datetime, timedelta
@@ -9,16 +9,25 @@ import sys
 import os
 import re
 import httpx
-from typing import Union
-import recurring_ical_events
+from typing import Optional, Union
 
 # Add the project's root directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from app.models.calendar import Calendar as CalendarModel
+from app.models.event_fields import storage_time
 from app.models.events import Event, Category
+from app.services.ics_stream import stream_components
+from app.services.parallel_parse import parse_event_records
+from app.services.reconciler import reconcile
+from app.services.resilience import ICLOUD_FEED, CircuitOpen, skipped, unavailable
+from app.services.sync_context import SyncContext
+from app.services.webcal_feed import get_feed_validators, open_feed, set_feed_validators
 from config import settings
 
+# Key for this module's validators in Calendar.feed_state
+FEED_CONSUMER = "legacy"
+
 def find_matching_category(title: str, description: str, categories: list[Category]) -> Union[Category, None]:
     """
     Find a matching category based on name appearing in event title or description.
@@ -34,39 +43,46 @@ def find_matching_category(title: str, description: str, categories: list[Catego
     
     return None
 
-async def sync_calendar(db: AsyncSession):
+async def sync_calendar(db: AsyncSession, ctx: Optional[SyncContext] = None):
     """
     Fetches events from iCloud calendar using webcal URL,
     parses them, and stores them in the database.
-    Uses recurring_ical_events library to handle both recurring and non-recurring events.
+    Recurring events are stored as their master and overrides, not one row per
+    occurrence; large feeds are parsed in worker processes.
     """
+    if ctx is None:
+        ctx = SyncContext(db)
+
     # We will sync the HomeBase calendar specifically.
-    result = await db.execute(select(CalendarModel).where(CalendarModel.name == "HomeBase"))
-    calendar_to_sync = result.scalar_one_or_none()
+    calendar_to_sync = await ctx.calendar_row()
 
     if not calendar_to_sync:
         return {"status": "error", "message": "HomeBase calendar not found in the database. Please ensure it exists."}
 
-    # Get all categories for name matching
-    result = await db.execute(select(Category))
-    categories = result.scalars().all()
-
-    # Convert webcal:// URL to https:// URL
-    webcal_url = settings.icloud_calendar_url
-    if webcal_url.startswith('webcal://'):
-        https_url = webcal_url.replace('webcal://', 'https://')
-    else:
-        https_url = webcal_url
+    down = unavailable(ICLOUD_FEED)
+    if down:
+        return down
 
     try:
-        # Fetch the calendar data using HTTP
-        async with httpx.AsyncClient() as client:
-            response = await client.get(https_url)
-            response.raise_for_status()
-            
-        cal_data = response.text
-        cal = Calendar.from_ical(cal_data)
+        # Fetch the calendar data using HTTP (conditional on the last fetch)
+        previous = get_feed_validators(calendar_to_sync, FEED_CONSUMER) if not ctx.audit else None
+        # The streamed VEVENTs and VTIMEZONEs are kept unparsed until the feed is known
+        # to have changed; the feed text itself is never held, nor are events outside
+        # the sync window
+        async with open_feed(settings.icloud_calendar_url, previous) as feed:
+            components = [
+                component async for component in stream_components(feed.iter_bytes())
+                if component.name != "VEVENT" or ctx.window is None or ctx.window.keeps(component)
+            ]
+        set_feed_validators(calendar_to_sync, FEED_CONSUMER, feed.validators)
+        if feed.unchanged:
+            calendar_to_sync.last_synced = datetime.utcnow()
+            db.add(calendar_to_sync)
+            await db.commit()
+            return {"status": "success", "message": "Sync complete. Calendar unchanged since last sync.", "unchanged": True}
         
+    except CircuitOpen as exc:
+        return skipped(exc)
     except httpx.RequestError as exc:
         return {"status": "error", "message": f"An error occurred while requesting {exc.request.url!r}."}
     except httpx.HTTPStatusError as exc:
@@ -74,7 +90,7 @@ async def sync_calendar(db: AsyncSession):
     except Exception as e:
         return {"status": "error", "message": f"Error fetching calendar: {str(e)}"}
     
-    events_added = 0
+    rows = []
     events_skipped = 0
     processed_uids = set()
     processed_event_keys = set()  # Track normalized event keys to prevent duplicates
@@ -99,77 +115,89 @@ async def sync_calendar(db: AsyncSession):
             norm(location)
         )
 
+    series_uids = []
+
     try:
-        # Use recurring_ical_events to expand ALL events (both recurring and non-recurring)
-        # This ensures we get all instances without double-processing
-        now = datetime.utcnow()
-        one_year_later = now + timedelta(days=365)
-        expanded_events = list(recurring_ical_events.of(cal).between(now, one_year_later))
-        print(f"[DEBUG] Number of expanded events (recurring + non-recurring): {len(expanded_events)}", flush=True)
+        # A recurring event is stored once, as its master plus any overrides, and expanded
+        # when read (see recurrence); single events that already ended or lie beyond the
+        # sync window are left out
+        now = datetime.now()
+        # Large feeds are parsed across worker processes (see parallel_parse)
+        records = await parse_event_records(components)
+        print(f"[DEBUG] Number of parsed events (singles, series and overrides): {len(records)}", flush=True)
         
-        for event in expanded_events:
-            uid = str(event.get('UID'))
-            summary = str(event.get('SUMMARY', ''))
-            start = event.get('DTSTART').dt
-            instance_uid = f"{uid}-{start.isoformat()}"
+        for event in records:
+            uid = event['uid']
+            summary = event['title']
+            start = event['start_time']
+            recurring = bool(event['rrule'] or event['series_uid'])
+            # Single events keep the per-occurrence key this sync has always used
+            instance_uid = uid if recurring else f"{uid}-{start.isoformat()}"
             
             if instance_uid in processed_uids:
                 print(f"[DEBUG] Skipping duplicate instance: {instance_uid}")
                 continue
             processed_uids.add(instance_uid)
-
-            # Check if event already exists in the DB
-            result = await db.execute(select(Event).filter(Event.uid == instance_uid))
-            existing_event = result.scalar_one_or_none()
-            if existing_event:
-                events_skipped += 1
-                continue
             
             try:
                 # Extract event data
-                description = str(event.get('DESCRIPTION', ''))
-                location = str(event.get('LOCATION', ''))
-                end = event.get('DTEND')
-                if end:
-                    end = end.dt
-                else:
-                    # If no end time, assume 1 hour duration
-                    if hasattr(start, 'hour'):
-                        end = start + timedelta(hours=1)
-                    else:
-                        end = start + timedelta(days=1)
+                description = event['description']
+                location = event['location']
+                end = event['end_time']
                 
-                # Check for duplicates using normalized event key
-                event_key = normalize_event_key(summary, start, end, location)
-                if event_key in processed_event_keys:
-                    print(f"[DEBUG] Skipping duplicate event key: {summary} at {start}")
-                    events_skipped += 1
-                    continue
-                processed_event_keys.add(event_key)
+                if not recurring:
+                    if storage_time(end) <= now or (ctx.window is not None and not ctx.window.contains(event)):
+                        events_skipped += 1
+                        continue
+                    # Check for duplicates using normalized event key
+                    event_key = normalize_event_key(summary, start, end, location)
+                    if event_key in processed_event_keys:
+                        print(f"[DEBUG] Skipping duplicate event key: {summary} at {start}")
+                        events_skipped += 1
+                        continue
+                    processed_event_keys.add(event_key)
+                elif event['rrule']:
+                    series_uids.append(uid)
                 
-                # Create event in database
-                event_obj = Event(
-                    uid=instance_uid,
-                    title=summary,
-                    description=description,
-                    location=location,
-                    start_time=start,
-                    end_time=end,
-                    calendar_id=calendar_to_sync.id
-                )
-                db.add(event_obj)
-                events_added += 1
-                print(f"[DEBUG] Added event: {instance_uid}, {summary}, {start}", flush=True)
+                # Staged for one bulk insert below
+                rows.append({
+                    'uid': instance_uid,
+                    'title': summary,
+                    'description': description,
+                    'location': location,
+                    'start_time': start,
+                    'end_time': end,
+                    'rrule': event['rrule'],
+                    'exdates': event['exdates'],
+                    'recurrence_id': event['recurrence_id'],
+                    'series_uid': event['series_uid'],
+                    'calendar_id': calendar_to_sync.id
+                })
                 
             except Exception as e:
                 print(f"[ERROR] Failed to process event {instance_uid}: {e}", flush=True)
                 events_skipped += 1
                 
     except Exception as e:
-        print(f"[ERROR] Failed to expand events: {e}", flush=True)
+        print(f"[ERROR] Failed to parse events: {e}", flush=True)
         return {"status": "error", "message": f"Failed to process calendar events: {str(e)}"}
 
+    # Occurrence rows earlier versions wrote for each series (uid + "-" + start) are
+    # replaced by the series itself
+    scope = None
+    if series_uids:
+        scope = and_(
+            Event.calendar_id == calendar_to_sync.id,
+            or_(*(Event.uid.like(f"{uid}-%") for uid in series_uids))
+        )
+    # Events already in the DB are left as they are; only new uids are inserted
+    reconciled = await reconcile(db, rows, scope=scope, update=False)
+    events_added = reconciled.added
+    events_skipped += reconciled.unchanged
+    ctx.reset_local()
+    ctx.wrote("db", reconciled.writes)
+
     calendar_to_sync.last_synced = datetime.utcnow()
     db.add(calendar_to_sync)
     await db.commit()
-    return {"status": "success", "message": f"Sync complete. Added {events_added} new events, skipped {events_skipped} existing events."} 
\ No newline at end of file
+    return {"status": "success", "message": f"Sync complete. Added {events_added} new events, skipped {events_skipped} existing events.", "unchanged": False} 
\ No newline at end of file
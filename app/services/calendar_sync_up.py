@@ -1,8 +1,7 @@
-import caldav
 from caldav.lib.error import AuthorizationError
-from icalendar import Calendar as iCalendar, Event as iEvent, vText
 from datetime import datetime
 import uuid
+from functools import partial
 import sys
 import os
 import logging
@@ -15,6 +14,10 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from app.models.events import Event, Calendar
+from app.services.caldav_client import caldav_session, CalendarNotFound, create_resource
+from app.services.push_executor import PushExecutor
+from app.services.resilience import ICLOUD_CALDAV, unavailable
+from app.services.two_way_sync import event_to_ical
 from config import settings
 
 logger = logging.getLogger(__name__)
@@ -47,58 +50,46 @@ async def sync_events_up(db: AsyncSession):
                 "message": "CalDAV credentials are not configured. Please set CALDAV_URL, ICLOUD_USERNAME and ICLOUD_PASSWORD in your environment or backend/config.py."
             }
 
-        # 3. Connect to CalDAV server
-        try:
-            client = caldav.DAVClient(
-                url=settings.caldav_url,
-                username=settings.icloud_username,
-                password=settings.icloud_password
-            )
-        except Exception as e:
-            return {"status": "error", "message": f"Failed to create CalDAV client: {e}"}
+        down = unavailable(ICLOUD_CALDAV)
+        if down:
+            return down
 
-        # 4. Find the target calendar (HomeBase calendar)
-        target_calendar_name = "HomeBase"
+        # 3. Find the target calendar (HomeBase calendar) via the shared CalDAV session
         try:
-            principal = client.principal()
-            caldav_calendars = [
-                c for c in principal.calendars()
-                if c.name == target_calendar_name
-            ]
+            target_calendar = await caldav_session.get_calendar(db)
         except AuthorizationError:
             return {"status": "error", "message": "iCloud authorization failed. Check credentials."}
+        except CalendarNotFound as e:
+            return {"status": "error", "message": str(e)}
 
-        if not caldav_calendars:
-            return {"status": "error", "message": f"Calendar '{target_calendar_name}' not found on iCloud."}
-
-        target_calendar = caldav_calendars[0]
-
-        # 5. Loop through and upload events
-        successful_syncs = 0
-        synced_titles = []
-        for event in unsynced_events:
-            new_ievent = iEvent()
-            new_ievent.add('uid', event.uid or str(uuid.uuid4()))
-            new_ievent.add('summary', event.title)
-            new_ievent.add('dtstart', event.start_time)
-            new_ievent.add('dtend', event.end_time)
-            if event.description:
-                new_ievent.add('description', event.description)
-            if event.location:
-                new_ievent.add('location', vText(event.location))
-
-            # Create a new iCalendar object to hold the event
-            new_ical = iCalendar()
-            new_ical.add_component(new_ievent)
+        # 4. Upload the events concurrently
+        async def push(event: Event) -> str:
+            new_ical = event_to_ical(
+                event.uid, event.title, event.start_time, event.end_time, event.description, event.location
+            )
 
             # Save the event to the CalDAV server
-            target_calendar.save_event(new_ical.to_ical())
+            event.remote_href, event.remote_etag = await create_resource(target_calendar, event.uid, new_ical)
 
             # Mark as synced
             event.synced_at = datetime.utcnow()
+            return "added"
+
+        for event in unsynced_events:
+            if not event.uid:
+                event.uid = str(uuid.uuid4())
+        results = await PushExecutor().run((event.uid, partial(push, event)) for event in unsynced_events)
+
+        synced_titles = []
+        failed = []
+        for event, result in zip(unsynced_events, results):
             db.add(event)
-            successful_syncs += 1
-            synced_titles.append(event.title)
+            if result.ok:
+                synced_titles.append(event.title)
+            else:
+                logger.error("Failed to sync %s to iCloud: %s", event.title, result.error)
+                failed.append({"uid": event.uid, "title": event.title, "error": result.error})
+        successful_syncs = len(synced_titles)
 
         await db.commit()
 
@@ -106,8 +97,10 @@ async def sync_events_up(db: AsyncSession):
 
         return {
             "status": "success",
-            "message": f"Successfully synced {successful_syncs} event(s) to iCloud.",
-            "synced_events": synced_titles
+            "message": f"Successfully synced {successful_syncs} event(s) to iCloud."
+                       + (f" {len(failed)} failed." if failed else ""),
+            "synced_events": synced_titles,
+            "failed_events": failed
         }
 
     except Exception as e:
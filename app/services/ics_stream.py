@@ -0,0 +1,169 @@
+"""
+Incremental parsing of iCalendar documents into raw VEVENT and VTIMEZONE blocks.
+"""
+
+import re
+from functools import lru_cache
+from typing import AsyncIterable, AsyncIterator, Iterator, List, Optional, Set, Union
+
+from icalendar import Component
+
+STREAMED_COMPONENTS = ("VEVENT", "VTIMEZONE")
+
+_TZID_PARAM = re.compile(r';TZID=("?)([^";:]+)\1', re.IGNORECASE)
+
+
+@lru_cache(maxsize=None)
+def _known_zone(tzid: str) -> bool:
+    try:
+        from zoneinfo import ZoneInfo
+        ZoneInfo(tzid)
+        return True
+    except Exception:
+        return False
+
+
+def _split_content_line(line: str):
+    """(NAME, value) of a content line; the ':' inside quoted parameters doesn't count."""
+    quoted = False
+    for index, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ':' and not quoted:
+            return re.split(r'[;:]', line[:index], 1)[0].upper(), line[index + 1:]
+    return line.upper(), ''
+
+
+class RawComponent:
+    """One VEVENT or VTIMEZONE block, unparsed."""
+
+    def __init__(self, name: str, lines: List[str]):
+        self.name = name
+        self.lines = lines  # Unfolded, BEGIN through END
+        self._parsed = None
+
+    @property
+    def text(self) -> str:
+        return "\r\n".join(self.lines) + "\r\n"
+
+    def property(self, name: str) -> Optional[str]:
+        """Raw value of a property of this component (not of a nested VALARM), or None."""
+        name = name.upper()
+        depth = 0
+        for line in self.lines[1:-1]:
+            key, value = _split_content_line(line)
+            if key == 'BEGIN':
+                depth += 1
+            elif key == 'END':
+                depth -= 1
+            elif depth == 0 and key == name:
+                return value
+        return None
+
+    def tzids(self) -> Set[str]:
+        return {match.group(2) for line in self.lines for match in _TZID_PARAM.finditer(line)}
+
+    def parse(self):
+        """The icalendar component (an icalendar.Event for a VEVENT)."""
+        if self._parsed is None:
+            self._parsed = Component.from_ical(self.text)
+        return self._parsed
+
+
+class ICSStreamParser:
+    """
+    Splits an iCalendar document fed in byte chunks into RawComponents.
+    Everything outside VEVENT and VTIMEZONE blocks (VCALENDAR properties, VTODO, ...)
+    is skipped. VTIMEZONEs are registered with icalendar as they complete; an event
+    using a TZID not defined yet is held back until its VTIMEZONE or the end.
+    """
+
+    def __init__(self):
+        self.timezones: Set[str] = set()
+        self._partial = b''
+        self._block: Optional[List[str]] = None
+        self._depth = 0
+        self._held: List[RawComponent] = []
+
+    def feed(self, data: bytes) -> List[RawComponent]:
+        """Components completed by this chunk."""
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        ready = []
+        for line in lines:
+            self._line(line, ready)
+        return ready
+
+    def close(self) -> List[RawComponent]:
+        """Components completed by the end of the document, including any held back."""
+        ready = []
+        if self._partial:
+            self._line(self._partial, ready)
+            self._partial = b''
+        ready.extend(self._held)
+        self._held = []
+        self._block = None
+        return ready
+
+    def _line(self, raw: bytes, ready: List[RawComponent]):
+        line = raw.rstrip(b'\r').decode('utf-8', errors='replace')
+        if self._block is None:
+            if line.upper() in ("BEGIN:VEVENT", "BEGIN:VTIMEZONE"):
+                self._block = [line]
+                self._depth = 0
+            return
+        if line[:1] in (' ', '\t'):
+            self._block[-1] += line[1:]
+            return
+        self._block.append(line)
+        key = line[:6].upper()
+        if key == 'BEGIN:':
+            self._depth += 1
+        elif key[:4] == 'END:':
+            if self._depth:
+                self._depth -= 1
+            else:
+                component = RawComponent(self._block[0][6:].upper(), self._block)
+                self._block = None
+                self._complete(component, ready)
+
+    def _resolvable(self, component: RawComponent) -> bool:
+        return all(tzid in self.timezones or _known_zone(tzid) for tzid in component.tzids())
+
+    def _complete(self, component: RawComponent, ready: List[RawComponent]):
+        if component.name != "VTIMEZONE":
+            if self._resolvable(component):
+                ready.append(component)
+            else:
+                self._held.append(component)
+            return
+        component.parse()  # Registers the zone with icalendar
+        tzid = component.property('TZID')
+        if tzid:
+            self.timezones.add(tzid)
+        ready.append(component)
+        held, self._held = self._held, []
+        for event in held:
+            if self._resolvable(event):
+                ready.append(event)
+            else:
+                self._held.append(event)
+
+
+def iter_components(document: Union[str, bytes]) -> Iterator[RawComponent]:
+    """The VEVENTs and VTIMEZONEs of a document already in memory (e.g. one CalDAV resource)."""
+    if isinstance(document, str):
+        document = document.encode('utf-8')
+    parser = ICSStreamParser()
+    yield from parser.feed(document)
+    yield from parser.close()
+
+
+async def stream_components(chunks: AsyncIterable[bytes]) -> AsyncIterator[RawComponent]:
+    """The VEVENTs and VTIMEZONEs of a document arriving in chunks, as each one completes."""
+    parser = ICSStreamParser()
+    async for chunk in chunks:
+        for component in parser.feed(chunk):
+            yield component
+    for component in parser.close():
+        yield component
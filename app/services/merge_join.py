@@ -0,0 +1,101 @@
+"""
+Merge-join of iCloud events (sorted by uid) against the events table, read in
+uid order a page at a time.
+"""
+
+import sys
+import os
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.models.events import Event
+from config import settings
+
+
+@dataclass
+class MergeChunk:
+    remote_only: List[Dict] = field(default_factory=list)  # iCloud events with no local row
+    changed: List[Dict] = field(default_factory=list)  # iCloud events whose local row differs
+    local_only: List[str] = field(default_factory=list)  # uids with no iCloud event
+    unchanged: int = 0  # Events on both sides with equal fingerprints (not listed)
+
+    def __len__(self) -> int:
+        return len(self.remote_only) + len(self.changed) + len(self.local_only)
+
+
+async def local_pages(db: AsyncSession, page_size: int, scope=None) -> AsyncIterator[List[Tuple[str, Optional[str]]]]:
+    """(uid, content_hash) of every local event (matching scope, if given) in UID order, page_size at a time."""
+    last_uid = None
+    while True:
+        query = select(Event.uid, Event.content_hash).order_by(Event.uid).limit(page_size)
+        if scope is not None:
+            query = query.where(scope)
+        if last_uid is not None:
+            query = query.where(Event.uid > last_uid)
+        page = (await db.execute(query)).all()
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last_uid = page[-1][0]
+
+
+async def merge_join(
+    db: AsyncSession,
+    remote: Iterable[Dict],
+    chunk_size: Optional[int] = None,
+    scope=None,
+) -> AsyncIterator[MergeChunk]:
+    """
+    Yield the differences between remote (iCloud event dicts sorted by uid,
+    each with a fingerprint) and the events table, at most chunk_size
+    (default settings.sync_chunk_size) per chunk. Events present on both
+    sides with equal fingerprints are skipped.
+    scope (a WHERE clause on events, e.g. SyncWindow.clause()) limits the local
+    side; remote should then hold only events in the same scope.
+    UIDs are compared in code-point order, which is SQLite's default (BINARY) collation.
+    Pages are keyset queries, so the caller may write each chunk while the merge is
+    suspended; rows it inserts sort before the next page and are not read back.
+    """
+    chunk_size = chunk_size or settings.sync_chunk_size
+    # Pending changes get their content_hash on flush; compare against those
+    await db.flush()
+    remote_iter = iter(remote)
+    current = next(remote_iter, None)
+    chunk = MergeChunk()
+
+    async for page in local_pages(db, chunk_size, scope):
+        for uid, content_hash in page:
+            # Remote events sorting before this local uid have no local row
+            while current is not None and current['uid'] < uid:
+                chunk.remote_only.append(current)
+                current = next(remote_iter, None)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = MergeChunk()
+            if current is not None and current['uid'] == uid:
+                if current['fingerprint'] != content_hash:
+                    chunk.changed.append(current)
+                else:
+                    chunk.unchanged += 1
+                current = next(remote_iter, None)
+            else:
+                chunk.local_only.append(uid)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = MergeChunk()
+
+    while current is not None:
+        chunk.remote_only.append(current)
+        current = next(remote_iter, None)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = MergeChunk()
+    if len(chunk) or chunk.unchanged:
+        yield chunk
@@ -0,0 +1,206 @@
+"""
+Durable outbox for writes made in the dashboard: at most one pending iCloud
+PUT or DELETE per event, delivered in the background with backoff.
+"""
+
+import logging
+import random
+import sys
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set
+
+import httpx
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.models.events import Event
+from app.models.outbox import OutboxOperation
+from app.services.caldav_client import (
+    ServerBusy,
+    caldav_session,
+    create_resource,
+    has_caldav_credentials,
+)
+from app.services import tombstones
+from app.services.resilience import ICLOUD_CALDAV, unavailable
+from app.services.sync_gate import sync_gate
+from app.services.sync_plan import OUTBOX, RemoteChange, SyncPlan
+from config import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+PUT = "put"
+DELETE = "delete"
+
+# iCloud could not be reached (CircuitOpen included) or asked us to slow down: worth waiting for
+TRANSIENT_ERRORS = (httpx.TransportError, ServerBusy)
+
+
+async def enqueue(db: AsyncSession, event_uid: str, operation: str, remote_href: Optional[str] = None):
+    """
+    Record that event_uid has to be PUT to or deleted from iCloud; committed with
+    the caller's local change. An operation already queued for the event is
+    replaced, so it is delivered once.
+    """
+    result = await db.execute(select(OutboxOperation).where(OutboxOperation.event_uid == event_uid))
+    op = result.scalar_one_or_none()
+    if op is None:
+        op = OutboxOperation(event_uid=event_uid)
+        db.add(op)
+    op.operation = operation
+    if remote_href:
+        op.remote_href = remote_href
+    op.status = "pending"
+    op.attempts = 0
+    op.next_attempt_at = datetime.utcnow()
+    op.last_error = None
+    # Sessions don't autoflush: make the operation visible to later queries in this session
+    await db.flush()
+
+
+async def pending_uids(db: AsyncSession) -> Set[str]:
+    """Events with a local write still waiting for delivery (given-up ones are left to the sync)."""
+    result = await db.execute(select(OutboxOperation.event_uid).where(OutboxOperation.status == "pending"))
+    return set(result.scalars().all())
+
+
+async def outbox_status(db: AsyncSession) -> Dict:
+    result = await db.execute(
+        select(OutboxOperation.status, func.count(), func.min(OutboxOperation.created_at))
+        .group_by(OutboxOperation.status)
+    )
+    counts = {status: (count, oldest) for status, count, oldest in result.all()}
+    oldest = counts.get("pending", (0, None))[1]
+    return {
+        "pending": counts.get("pending", (0, None))[0],
+        "failed": counts.get("failed", (0, None))[0],
+        "oldest_pending": oldest.isoformat() if oldest else None,
+    }
+
+
+async def outbox_plan(db: AsyncSession) -> SyncPlan:
+    """The pending operations as remote changes, for a dry run of the sync that delivers them."""
+    result = await db.execute(
+        select(OutboxOperation).where(OutboxOperation.status == "pending").order_by(OutboxOperation.id)
+    )
+    plan = SyncPlan()
+    for op in result.scalars().all():
+        change = RemoteChange(op.event_uid, f"{op.operation} queued from the dashboard", OUTBOX)
+        (plan.remote_deletes if op.operation == DELETE else plan.remote_puts).append(change)
+    return plan
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = min(settings.outbox_max_backoff_seconds, settings.outbox_retry_seconds * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * (0.5 + random.random() / 2))
+
+
+async def _put(calendar, event: Event) -> str:
+    from app.services.two_way_sync import event_to_ical, locate_icloud_resources, put_in_place
+    if not event.remote_href:
+        # Written through an older path or by another device: look it up by UID once
+        await locate_icloud_resources(event)
+    if not event.remote_href:
+        new_ical = event_to_ical(
+            event.uid, event.title, event.start_time, event.end_time,
+            event.description, event.location, event.rrule, event.exdates
+        )
+        event.remote_href, event.remote_etag = await create_resource(calendar, event.uid, new_ical)
+        return "added"
+
+    # Same 412 policy as the export: if iCloud changed since our last pull, it wins
+    if not await put_in_place(calendar, event, event.remote_href, event.remote_etag):
+        return "conflict"
+    return "updated"
+
+
+async def _deliver(db: AsyncSession, op: OutboxOperation) -> str:
+    from app.services.two_way_sync import confirm_from_icloud, delete_icloud_event
+    if op.operation == DELETE:
+        deleted = await caldav_session.run(lambda calendar: delete_icloud_event(calendar, op.event_uid, op.remote_href), db)
+        await tombstones.mark_propagated(db, [op.event_uid])
+        return "deleted" if deleted else "already gone"
+
+    result = await db.execute(select(Event).where(Event.uid == op.event_uid))
+    event = result.scalar_one_or_none()
+    if event is None:
+        return "gone locally"
+    action = await caldav_session.run(lambda calendar: _put(calendar, event), db)
+    event.synced_at = datetime.utcnow()
+    db.add(event)
+    await confirm_from_icloud(db, event)
+    return action
+
+
+async def deliver_outbox(db: AsyncSession) -> Dict:
+    """Deliver every operation that is due, oldest first. Stops early while iCloud is unreachable."""
+    if not has_caldav_credentials():
+        return {"status": "success", "message": "CalDAV credentials are not configured; outbox kept.", "details": {}}
+    if unavailable(ICLOUD_CALDAV):
+        # Nothing is attempted, so no operation is pushed further back
+        return {"status": "success", "message": "iCloud is unavailable; outbox kept.", "details": await outbox_status(db)}
+
+    result = await db.execute(
+        select(OutboxOperation.id)
+        .where(OutboxOperation.status == "pending", OutboxOperation.next_attempt_at <= datetime.utcnow())
+        .order_by(OutboxOperation.id)
+    )
+    due = result.scalars().all()
+    delivered, retrying, failed, items = 0, 0, 0, []
+    for op_id in due:
+        # Loaded one at a time: every outcome is committed before the next delivery
+        op = await db.get(OutboxOperation, op_id)
+        if op is None:
+            continue
+        item = {"uid": op.event_uid, "operation": op.operation}
+        try:
+            action = await _deliver(db, op)
+        except Exception as e:
+            op.attempts += 1
+            op.last_error = str(e)[:1000]
+            transient = isinstance(e, TRANSIENT_ERRORS)
+            if not transient and op.attempts >= settings.max_sync_retries:
+                op.status = "failed"
+                failed += 1
+                logger.error(f"Giving up on {op.operation} of {op.event_uid} after {op.attempts} attempts: {e}")
+            else:
+                op.next_attempt_at = datetime.utcnow() + _backoff(op.attempts)
+                retrying += 1
+                logger.info(f"Delivering {op.operation} of {op.event_uid} failed ({e}); retrying after {op.next_attempt_at}")
+            items.append(dict(item, ok=False, error=op.last_error))
+            await db.commit()
+            if transient:
+                # The rest would fail the same way; they stay due for the next run
+                break
+            continue
+        await db.delete(op)
+        await db.commit()
+        delivered += 1
+        items.append(dict(item, ok=True, action=action))
+
+    return {
+        "status": "success",
+        "message": f"Outbox: delivered {delivered}, retrying {retrying}, failed {failed}",
+        "details": {
+            "delivered": delivered,
+            "retrying": retrying,
+            "failed": failed,
+            "items": items,
+            **await outbox_status(db),
+        }
+    }
+
+
+async def deliver_in_background():
+    """Deliver the outbox through the sync gate, e.g. as a FastAPI background task after a write."""
+    try:
+        result = await sync_gate.run("outbox", deliver_outbox)
+        logger.info(result.get("message"))
+    except Exception as e:
+        logger.error(f"Outbox delivery failed: {e}")
@@ -0,0 +1,83 @@
+"""
+Parsing of large feeds across worker processes, in chunks of whole UID groups
+that each carry the feed's VTIMEZONEs.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.services.ics_stream import RawComponent
+from config import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Chunks per worker, so one slow chunk doesn't leave the other cores idle
+CHUNKS_PER_WORKER = 4
+
+
+def _calendar(zones_text: str, event_texts: Sequence[str]):
+    from icalendar import Calendar
+    return Calendar.from_ical("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n" + zones_text + "".join(event_texts) + "END:VCALENDAR\r\n")
+
+
+def parse_chunk(zones_text: str, event_texts: Sequence[str]) -> List[Dict]:
+    """Worker: one normalized record (two_way_sync.vevent_to_dict) per VEVENT with a DTSTART."""
+    from app.services.two_way_sync import vevent_to_dict
+    records = []
+    for component in _calendar(zones_text, event_texts).walk("VEVENT"):
+        if component.get('dtstart') is None:
+            continue
+        records.append(vevent_to_dict(component))
+    return records
+
+
+def worker_count() -> int:
+    return settings.parse_workers or os.cpu_count() or 1
+
+
+def _chunks(events: List[RawComponent], count: int) -> List[List[str]]:
+    """Split events into about count chunks of whole UID groups."""
+    groups: Dict[str, List[str]] = {}
+    for component in events:
+        groups.setdefault(component.property('UID') or '', []).append(component.text)
+    target = max(1, -(-len(events) // count))
+    chunks, current = [], []
+    for texts in groups.values():
+        current.extend(texts)
+        if len(current) >= target:
+            chunks.append(current)
+            current = []
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _run(worker, components: List[RawComponent], *args) -> List[Dict]:
+    zones_text = "".join(c.text for c in components if c.name == "VTIMEZONE")
+    events = [c for c in components if c.name == "VEVENT"]
+    workers = worker_count()
+    if len(events) < settings.parallel_parse_threshold or workers < 2:
+        return worker(zones_text, [c.text for c in events], *args)
+
+    chunks = _chunks(events, workers * CHUNKS_PER_WORKER)
+    logger.info(f"Parsing {len(events)} VEVENTs in {len(chunks)} chunks across {workers} processes")
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, worker, zones_text, chunk, *args) for chunk in chunks
+        ))
+    return [record for result in results for record in result]
+
+
+async def parse_event_records(components: List[RawComponent]) -> List[Dict]:
+    """Normalized records for the VEVENTs among components (VTIMEZONEs included for their TZIDs)."""
+    return await _run(parse_chunk, components)
+
@@ -0,0 +1,163 @@
+"""
+Cache of normalized iCloud event records, keyed by a digest of the raw VEVENT
+(without DTSTAMP, with the VTIMEZONEs it uses). In-memory LRU, optionally
+backed by a SQLite file.
+"""
+
+import hashlib
+import logging
+import pickle
+import sqlite3
+import sys
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.services.ics_stream import RawComponent
+from config import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Part of every key; bump it when the records vevent_to_dict builds change shape
+RECORD_FORMAT = b"2"
+
+
+def component_key(component: RawComponent, zones: Optional[Dict[str, str]] = None) -> str:
+    """
+    Digest of a VEVENT's unfolded lines without DTSTAMP, plus the text of the
+    VTIMEZONEs (zones: {tzid: text}) its TZIDs refer to.
+    """
+    digest = hashlib.sha1(RECORD_FORMAT)
+    for line in component.lines:
+        if line[:8].upper() not in ('DTSTAMP:', 'DTSTAMP;'):
+            digest.update(line.encode('utf-8'))
+            digest.update(b'\n')
+    for tzid in sorted(component.tzids()):
+        digest.update((zones or {}).get(tzid, tzid).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ComponentCache:
+    def __init__(self, max_entries: int, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._pending: Dict[str, bytes] = {}  # Added since the last save()
+        self._touched: Set[str] = set()  # Looked up since the last save()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._db is None and self.path:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS parsed_vevents "
+                "(digest TEXT PRIMARY KEY, record BLOB NOT NULL, used_at REAL NOT NULL)"
+            )
+        return self._db
+
+    def _remember(self, key: str, record: Dict):
+        self._entries[key] = record
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict]:
+        record = self._entries.get(key)
+        if record is not None:
+            self._entries.move_to_end(key)
+            self._touched.add(key)
+            return record
+        db = self._connection()
+        if db is None:
+            return None
+        row = db.execute("SELECT record FROM parsed_vevents WHERE digest = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            record = pickle.loads(row[0])
+        except Exception:
+            return None
+        self._remember(key, record)
+        self._touched.add(key)
+        return record
+
+    def put(self, key: str, record: Dict):
+        self._remember(key, record)
+        if self.path:
+            try:
+                self._pending[key] = pickle.dumps(record)
+            except Exception:
+                pass  # E.g. a tzinfo built from a custom VTIMEZONE: kept in memory only
+
+    def save(self):
+        """Write new records to the SQLite file (if any), keeping the max_entries most recently used."""
+        db = self._connection()
+        if db is None or not (self._pending or self._touched):
+            return
+        now = time.time()
+        try:
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO parsed_vevents (digest, record, used_at) VALUES (?, ?, ?)",
+                    [(key, blob, now) for key, blob in self._pending.items()]
+                )
+                db.executemany(
+                    "UPDATE parsed_vevents SET used_at = ? WHERE digest = ?",
+                    [(now, key) for key in self._touched - self._pending.keys()]
+                )
+                db.execute(
+                    "DELETE FROM parsed_vevents WHERE digest NOT IN "
+                    "(SELECT digest FROM parsed_vevents ORDER BY used_at DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not save parse cache to {self.path}: {e}")
+        self._pending.clear()
+        self._touched.clear()
+
+
+class CountingCache:
+    """The shared cache as seen by one sync run, counting that run's hits and misses."""
+
+    def __init__(self, cache: ComponentCache):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        record = self.cache.get(key)
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return record
+
+    def put(self, key: str, record: Dict):
+        self.cache.put(key, record)
+
+    def save(self):
+        self.cache.save()
+
+    def report(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None
+        }
+
+
+_shared_cache: Optional[ComponentCache] = None
+
+
+def shared_component_cache() -> ComponentCache:
+    """The process-wide cache, created from settings on first use."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ComponentCache(settings.parse_cache_size, settings.parse_cache_path or None)
+    return _shared_cache
@@ -0,0 +1,119 @@
+"""
+Concurrent export of events to iCloud, with an AIMD-adapted concurrency limit.
+Jobs only talk to CalDAV and set attributes on loaded rows; the caller commits.
+"""
+
+import asyncio
+import logging
+import random
+import sys
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.services.caldav_client import ServerBusy
+from config import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+PushJob = Tuple[str, Callable[[], Awaitable[Any]]]
+
+
+@dataclass
+class PushResult:
+    key: str
+    ok: bool
+    value: Any = None
+    error: Optional[str] = None
+    attempts: int = 1
+    latency: float = 0.0
+
+    def summary(self) -> Dict:
+        item = asdict(self)
+        item['latency'] = round(self.latency, 3)
+        item.pop('value')
+        if isinstance(self.value, str):
+            item['action'] = self.value
+        return item
+
+
+class PushExecutor:
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        initial_concurrency: int = 4,
+        target_latency: Optional[float] = None,
+        max_retries: Optional[int] = None,
+    ):
+        self.max_concurrency = max(1, max_concurrency or settings.icloud_push_concurrency)
+        self.limit = float(min(initial_concurrency, self.max_concurrency))
+        self.target_latency = target_latency or settings.icloud_push_target_latency
+        self.max_retries = settings.max_sync_retries if max_retries is None else max_retries
+        self.throttled = 0
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._slots = asyncio.Condition()
+
+    async def run(self, jobs: Iterable[PushJob]) -> List[PushResult]:
+        """Run every job and return one PushResult per job, in input order."""
+        return list(await asyncio.gather(*(self._run_one(key, job) for key, job in jobs)))
+
+    def stats(self) -> Dict:
+        return {"concurrency": int(self.limit), "throttled": self.throttled}
+
+    async def _acquire(self):
+        async with self._slots:
+            await self._slots.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+
+    async def _release(self):
+        async with self._slots:
+            self._in_flight -= 1
+            self._slots.notify_all()
+
+    def _increase(self):
+        # +1 per full window of successes
+        self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+
+    def _decrease(self):
+        # Several in-flight requests usually see the same overload; halve once per window
+        now = time.monotonic()
+        if now - self._last_decrease < self.target_latency:
+            return
+        self._last_decrease = now
+        self.limit = max(1.0, self.limit / 2)
+        logger.info(f"iCloud push concurrency reduced to {int(self.limit)}")
+
+    async def _run_one(self, key: str, job: Callable[[], Awaitable[Any]]) -> PushResult:
+        attempts = 0
+        while True:
+            attempts += 1
+            await self._acquire()
+            started = time.monotonic()
+            try:
+                value = await job()
+            except ServerBusy as e:
+                latency = time.monotonic() - started
+                self.throttled += 1
+                self._decrease()
+                if attempts > self.max_retries:
+                    return PushResult(key, False, error=str(e), attempts=attempts, latency=latency)
+                delay = e.retry_after if e.retry_after is not None else (2 ** attempts) * (0.5 + random.random())
+                logger.info(f"iCloud busy pushing {key}, retrying in {delay:.1f}s")
+            except Exception as e:
+                return PushResult(key, False, error=str(e), attempts=attempts, latency=time.monotonic() - started)
+            else:
+                latency = time.monotonic() - started
+                if latency > self.target_latency:
+                    self._decrease()
+                else:
+                    self._increase()
+                return PushResult(key, True, value=value, attempts=attempts, latency=latency)
+            finally:
+                await self._release()
+            await asyncio.sleep(delay)
@@ -0,0 +1,148 @@
+"""
+Set-based reconciliation of an incoming event snapshot into the events table,
+through a temporary staging table.
+"""
+
+import logging
+import sys
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable
+
+from sqlalchemy import Column, MetaData, Table, delete, func, or_, select, text, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.models.event_fields import fingerprint, storage_time
+from app.models.events import Event
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+STAGING_TABLE = "event_staging"
+# Compared through content_hash instead, so representation differences don't count
+CONTENT_COLUMNS = ('title', 'description', 'location', 'start_time', 'end_time', 'rrule', 'exdates')
+# Written along with a change but never a reason for one
+UNTRACKED_COLUMNS = (
+    'uid', 'calendar_id', 'category_id', 'synced_at', 'recurrence_id', 'series_uid'
+)
+
+
+@dataclass
+class ReconcileResult:
+    added: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+    @property
+    def writes(self) -> int:
+        return self.added + self.updated + self.deleted
+
+
+def _insert_for(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def _stage(row: Dict) -> Dict:
+    staged = dict(row)
+    staged['start_time'] = storage_time(row.get('start_time'))
+    staged['end_time'] = storage_time(row.get('end_time'))
+    if 'recurrence_id' in staged:
+        staged['recurrence_id'] = storage_time(staged['recurrence_id'])
+    if staged.get('content_hash') is None:
+        staged['content_hash'] = fingerprint(staged)
+    return staged
+
+
+async def reconcile(
+    db: AsyncSession,
+    rows: Iterable[Dict],
+    scope=None,
+    keep_existing: Iterable[str] = (),
+    update: bool = True,
+) -> ReconcileResult:
+    """
+    Apply a snapshot of events to the events table.
+    rows: one dict per event with uid, the content columns, calendar_id and any
+    other Event columns to write; every dict has the same keys. The last row wins
+    when a uid repeats.
+    scope: WHERE clause on events; rows it matches that are not in the snapshot are
+    deleted. None deletes nothing.
+    keep_existing: columns whose current non-NULL value survives an update
+    (e.g. a category picked in the dashboard).
+    update: False only inserts new uids and leaves existing rows alone.
+    Rows are written with Core statements: pending ORM changes are flushed first,
+    loaded Event objects are expired afterwards, and the caller commits.
+    """
+    staged_rows = list({row['uid']: _stage(row) for row in rows}.values())
+    events = Event.__table__
+    columns = list(staged_rows[0]) if staged_rows else ['uid', 'content_hash']
+    staging = Table(
+        STAGING_TABLE, MetaData(),
+        *(Column(name, events.c[name].type) for name in columns),
+        prefixes=['TEMPORARY']
+    )
+    tracked = [c for c in columns if c not in CONTENT_COLUMNS and c not in UNTRACKED_COLUMNS]
+
+    await db.flush()
+    conn = await db.connection()
+    await conn.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+    await conn.run_sync(staging.create)
+    if staged_rows:
+        await conn.execute(staging.insert(), staged_rows)
+
+    result = ReconcileResult()
+    existing = staging.join(events, events.c.uid == staging.c.uid)
+    result.added = await conn.scalar(
+        select(func.count()).select_from(staging.outerjoin(events, events.c.uid == staging.c.uid))
+        .where(events.c.id.is_(None))
+    )
+    if update:
+        result.updated = await conn.scalar(
+            select(func.count()).select_from(existing)
+            .where(or_(*(events.c[c].is_distinct_from(staging.c[c]) for c in tracked)))
+        )
+
+    # WHERE true keeps SQLite from reading ON CONFLICT as a join constraint
+    upsert = _insert_for(conn.dialect.name)(events).from_select(
+        columns, select(*(staging.c[c] for c in columns)).where(true())
+    )
+    if update:
+        excluded = upsert.excluded
+        values = {
+            c: func.coalesce(events.c[c], excluded[c]) if c in keep_existing else excluded[c]
+            for c in columns if c != 'uid'
+        }
+        values['updated_at'] = func.now()
+        upsert = upsert.on_conflict_do_update(
+            index_elements=['uid'],
+            set_=values,
+            where=or_(*(events.c[c].is_distinct_from(excluded[c]) for c in tracked))
+        )
+    else:
+        upsert = upsert.on_conflict_do_nothing(index_elements=['uid'])
+    await conn.execute(upsert)
+
+    if scope is not None:
+        deleted = await conn.execute(
+            delete(events).where(scope, events.c.uid.not_in(select(staging.c.uid)))
+        )
+        result.deleted = deleted.rowcount
+
+    await conn.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, Event):
+            db.expire(obj)
+    result.unchanged = len(staged_rows) - result.added - result.updated
+    logger.info(
+        f"Reconciled {len(staged_rows)} events: {result.added} added, {result.updated} updated, "
+        f"{result.deleted} deleted, {result.unchanged} unchanged"
+    )
+    return result
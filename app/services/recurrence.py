@@ -0,0 +1,144 @@
+"""
+Recurring events: one master row per series plus one row per override,
+expanded into occurrences when read.
+"""
+
+import logging
+import sys
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+from dateutil.rrule import rrulestr
+from icalendar import vRecur
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.models.event_fields import storage_time
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Window of the read API when the client doesn't ask for one
+DEFAULT_PAST = timedelta(days=90)
+DEFAULT_FUTURE = timedelta(days=365)
+
+
+def override_uid(uid: str, recurrence_id: datetime) -> str:
+    """Row key of the override of series uid that replaces the occurrence at recurrence_id."""
+    return f"{uid}::{recurrence_id:%Y%m%dT%H%M%S}"
+
+
+def storage_rrule(rrule: vRecur) -> str:
+    """An RRULE as stored in events.rrule: iCalendar text with UNTIL in storage form."""
+    rule = vRecur(dict(rrule))
+    if 'UNTIL' in rule:
+        rule['UNTIL'] = [storage_time(until) if isinstance(until, datetime) else until for until in rule['UNTIL']]
+    return rule.to_ical().decode()
+
+
+def storage_exdates(exdate) -> Optional[str]:
+    """EXDATE properties (one or a list) as stored in events.exdates: sorted ISO datetimes, comma-separated."""
+    if not exdate:
+        return None
+    properties = exdate if isinstance(exdate, list) else [exdate]
+    values = sorted({storage_time(value.dt).isoformat() for prop in properties for value in prop.dts})
+    return ",".join(values) or None
+
+
+def default_window(now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """The window used when none is given, on day boundaries so repeated reads share cache entries."""
+    today = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - DEFAULT_PAST, today + DEFAULT_FUTURE
+
+
+@lru_cache(maxsize=1024)
+def occurrences(
+    rrule: str,
+    dtstart: datetime,
+    duration: timedelta,
+    exdates: Optional[str],
+    start: datetime,
+    end: datetime,
+) -> Tuple[datetime, ...]:
+    """Start times of the occurrences of a series that overlap [start, end)."""
+    try:
+        rule = rrulestr(rrule, dtstart=dtstart)
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Unreadable RRULE {rrule!r} ({e}); showing only the first occurrence")
+        return (dtstart,) if dtstart < end and dtstart + duration > start else ()
+    excluded = {datetime.fromisoformat(value) for value in exdates.split(",")} if exdates else set()
+    return tuple(
+        begins for begins in rule.between(start - duration, end, inc=True)
+        if begins not in excluded and begins + duration > start and begins < end
+    )
+
+
+@dataclass
+class Occurrence:
+    """One occurrence of a series, in the shape of an Event row (id and uid are the master's)."""
+    id: int
+    uid: str
+    title: str
+    start_time: datetime
+    end_time: datetime
+    location: Optional[str]
+    description: Optional[str]
+    calendar_id: int
+    category_id: Optional[int]
+    category: object
+    recurrence_id: datetime
+
+
+def _overlaps(event, start: datetime, end: datetime) -> bool:
+    return event.start_time < end and event.end_time > start
+
+
+def expand_events(events: Iterable, start: datetime, end: datetime) -> List:
+    """
+    Event rows as the occurrences within [start, end): single events are passed
+    through unchanged (the caller selects them), each series is replaced by its
+    occurrences and overrides that overlap the window.
+    """
+    masters = {}
+    overrides = defaultdict(list)
+    expanded = []
+    for event in events:
+        if event.series_uid:
+            overrides[event.series_uid].append(event)
+        elif event.rrule:
+            masters[event.uid] = event
+        else:
+            expanded.append(event)
+
+    for series_uid, rows in overrides.items():
+        if series_uid not in masters:
+            # Master gone (or outside what was loaded): show the overrides as they are
+            expanded.extend(row for row in rows if _overlaps(row, start, end))
+
+    for uid, master in masters.items():
+        series_overrides = overrides.get(uid, [])
+        replaced = {row.recurrence_id for row in series_overrides}
+        duration = master.end_time - master.start_time
+        for begins in occurrences(master.rrule, master.start_time, duration, master.exdates, start, end):
+            if begins in replaced:
+                continue
+            expanded.append(Occurrence(
+                id=master.id,
+                uid=master.uid,
+                title=master.title,
+                start_time=begins,
+                end_time=begins + duration,
+                location=master.location,
+                description=master.description,
+                calendar_id=master.calendar_id,
+                category_id=master.category_id,
+                category=master.category,
+                recurrence_id=begins,
+            ))
+        expanded.extend(row for row in series_overrides if _overlaps(row, start, end))
+    return expanded
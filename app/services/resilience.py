@@ -0,0 +1,282 @@
+"""
+Timeouts, retries and circuit breakers for the upstreams the dashboard calls
+(iCloud CalDAV, the published feed and the hockey site).
+"""
+
+import asyncio
+import logging
+import random
+import sys
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import httpx
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Only these are retried; a replayed PUT or DELETE that had reached the server
+# ends in a 404 or with the same content stored again
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "PROPFIND", "REPORT"}
+# ...unless it is conditional: a replay of a conditional write that had reached the
+# server gets a 412, which the caller would take for an edit made on another device
+CONDITIONAL_HEADERS = ("If-Match", "If-None-Match")
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS", "PROPFIND", "REPORT"}
+# The upstream is failing (429 only throttles us and carries its own Retry-After)
+FAILURE_STATUSES = {500, 502, 503, 504}
+
+
+def retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After), or None."""
+    # Only the delta-seconds form; iCloud does not send HTTP dates here
+    try:
+        return float(response.headers.get('Retry-After', ''))
+    except ValueError:
+        return None
+
+
+class CircuitOpen(httpx.TransportError):
+    """Raised instead of sending a request while the upstream's breaker is open."""
+
+    def __init__(self, breaker: "CircuitBreaker", request: Optional[httpx.Request] = None):
+        self.upstream = breaker.name
+        self.retry_in = breaker.retry_in()
+        self.circuit = breaker.snapshot()
+        super().__init__(f"{self.upstream} is unavailable (circuit open, next try in {self.retry_in:.0f}s)", request=request)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a cooldown and a single half-open trial."""
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._opened_at: Optional[float] = None
+        self._opened_wall: Optional[datetime] = None
+        self._trial_at: Optional[float] = None
+        # Sync callers (the hockey scraper) run in a worker thread
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        if time.monotonic() - self._opened_at < self.reset_seconds:
+            return OPEN
+        return HALF_OPEN
+
+    def retry_in(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def before_call(self, request: Optional[httpx.Request] = None):
+        """Raise CircuitOpen unless a request may go out now."""
+        with self._lock:
+            state = self.state
+            if state == HALF_OPEN and self._trial_at is not None:
+                # One trial at a time; a trial that never reported back expires
+                if time.monotonic() - self._trial_at < self.reset_seconds:
+                    state = OPEN
+            if state == OPEN:
+                raise CircuitOpen(self, request)
+            if state == HALF_OPEN:
+                self._trial_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"{self.name} is reachable again; circuit closed")
+            self.failures = 0
+            self._opened_at = None
+            self._opened_wall = None
+            self._trial_at = None
+
+    def record_failure(self, error: str):
+        with self._lock:
+            self.failures += 1
+            self.last_error = error[:500]
+            if self._trial_at is not None or self.failures >= self.failure_threshold:
+                logger.warning(f"{self.name} failing ({error}); circuit open for {self.reset_seconds:.0f}s")
+                self._opened_at = time.monotonic()
+                self._opened_wall = datetime.utcnow()
+                self._trial_at = None
+
+    def reset(self):
+        self.record_success()
+        self.last_error = None
+
+    def snapshot(self) -> Dict:
+        state = self.state
+        return {
+            "state": state,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+            "opened_at": self._opened_wall.isoformat() if self._opened_wall else None,
+            "retry_at": (
+                (datetime.utcnow() + timedelta(seconds=self.retry_in())).isoformat()
+                if state == OPEN else None
+            ),
+        }
+
+
+class Upstream:
+    """One external service: its timeouts, retry policy and breaker."""
+
+    def __init__(self, name: str, timeout_setting: str):
+        self.name = name
+        self._timeout_setting = timeout_setting
+        self.breaker = CircuitBreaker(name, settings.circuit_failure_threshold, settings.circuit_reset_seconds)
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(getattr(settings, self._timeout_setting), connect=settings.connect_timeout_seconds)
+
+    def backoff(self, attempt: int, wait: Optional[float] = None) -> float:
+        """Full jitter: a random delay up to retry_backoff_seconds * 2^(attempt-1), or the server's Retry-After if longer."""
+        delay = random.uniform(0, settings.retry_backoff_seconds * 2 ** (attempt - 1))
+        return max(delay, wait) if wait is not None else delay
+
+    def attempts_for(self, request: httpx.Request) -> int:
+        if request.method not in IDEMPOTENT_METHODS:
+            return 1
+        if request.method not in SAFE_METHODS and any(header in request.headers for header in CONDITIONAL_HEADERS):
+            return 1
+        return max(1, settings.max_sync_retries)
+
+    def transport(self, inner: Optional[httpx.AsyncBaseTransport] = None) -> "ResilientTransport":
+        return ResilientTransport(self, inner or httpx.AsyncHTTPTransport())
+
+    def sync_transport(self, inner: Optional[httpx.BaseTransport] = None) -> "ResilientSyncTransport":
+        return ResilientSyncTransport(self, inner or httpx.HTTPTransport())
+
+    def client(self, **kwargs) -> httpx.AsyncClient:
+        """An httpx.AsyncClient whose requests are timed, retried and guarded by this upstream."""
+        kwargs.setdefault('timeout', self.timeout)
+        return httpx.AsyncClient(transport=self.transport(kwargs.pop('transport', None)), **kwargs)
+
+    def sync_client(self, **kwargs) -> httpx.Client:
+        kwargs.setdefault('timeout', self.timeout)
+        return httpx.Client(transport=self.sync_transport(kwargs.pop('transport', None)), **kwargs)
+
+    def _failed(self, request: httpx.Request, attempt: int, attempts: int, error: str) -> bool:
+        """Record a failed attempt; True if it should be retried."""
+        if attempt < attempts:
+            logger.info(f"{self.name}: {request.method} {request.url.path} failed ({error}); retry {attempt}/{attempts - 1}")
+            return True
+        self.breaker.record_failure(f"{request.method} {request.url.path}: {error}")
+        return False
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    def __init__(self, upstream: Upstream, inner: httpx.AsyncBaseTransport):
+        self.upstream = upstream
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        upstream = self.upstream
+        upstream.breaker.before_call(request)
+        attempts = upstream.attempts_for(request)
+        for attempt in range(1, attempts + 1):
+            wait = None
+            try:
+                response = await self.inner.handle_async_request(request)
+            except httpx.TransportError as e:
+                if not upstream._failed(request, attempt, attempts, f"{type(e).__name__}: {e}"):
+                    raise
+            else:
+                if response.status_code not in FAILURE_STATUSES:
+                    upstream.breaker.record_success()
+                    return response
+                wait = retry_after(response)
+                if wait is not None and wait > settings.max_retry_after_seconds:
+                    # Too long to hold the request: the caller's own Retry-After handling takes over
+                    attempts = attempt
+                if not upstream._failed(request, attempt, attempts, f"HTTP {response.status_code}"):
+                    return response
+                await response.aclose()
+            await asyncio.sleep(upstream.backoff(attempt, wait))
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class ResilientSyncTransport(httpx.BaseTransport):
+    """Blocking twin of ResilientTransport, for scripts that scrape synchronously."""
+
+    def __init__(self, upstream: Upstream, inner: httpx.BaseTransport):
+        self.upstream = upstream
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        upstream = self.upstream
+        upstream.breaker.before_call(request)
+        attempts = upstream.attempts_for(request)
+        for attempt in range(1, attempts + 1):
+            wait = None
+            try:
+                response = self.inner.handle_request(request)
+            except httpx.TransportError as e:
+                if not upstream._failed(request, attempt, attempts, f"{type(e).__name__}: {e}"):
+                    raise
+            else:
+                if response.status_code not in FAILURE_STATUSES:
+                    upstream.breaker.record_success()
+                    return response
+                wait = retry_after(response)
+                if wait is not None and wait > settings.max_retry_after_seconds:
+                    # Too long to hold the request: the caller's own Retry-After handling takes over
+                    attempts = attempt
+                if not upstream._failed(request, attempt, attempts, f"HTTP {response.status_code}"):
+                    return response
+                response.close()
+            time.sleep(upstream.backoff(attempt, wait))
+
+    def close(self):
+        self.inner.close()
+
+
+ICLOUD_CALDAV = Upstream("icloud_caldav", "caldav_timeout_seconds")
+ICLOUD_FEED = Upstream("icloud_feed", "feed_timeout_seconds")
+HOCKEY = Upstream("hockey", "hockey_timeout_seconds")
+
+UPSTREAMS = {upstream.name: upstream for upstream in (ICLOUD_CALDAV, ICLOUD_FEED, HOCKEY)}
+
+
+def upstream_status() -> Dict[str, Dict]:
+    return {name: upstream.breaker.snapshot() for name, upstream in UPSTREAMS.items()}
+
+
+def skipped(error: CircuitOpen) -> Dict:
+    """The result of a sync that did not run because its upstream's breaker is open (not an error: local data is served)."""
+    return {
+        "status": "skipped",
+        "message": f"{error}; serving local data",
+        "details": {"unavailable": error.upstream, "circuit": error.circuit},
+    }
+
+
+def unavailable(*upstreams: Upstream) -> Optional[Dict]:
+    """
+    skipped() for the first of upstreams whose breaker is open, or None if they
+    may all be called. Syncs check this before touching anything.
+    """
+    for upstream in upstreams:
+        if upstream.breaker.state == OPEN:
+            return skipped(CircuitOpen(upstream.breaker))
+    return None
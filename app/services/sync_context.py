@@ -0,0 +1,134 @@
+"""
+State shared by the phases of one sync run: what they load or download (at most
+once, kept current as they apply changes), their plans, writes and timings.
+"""
+
+import sys
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.models.calendar import Calendar as CalendarModel
+from app.models.events import Event, Category
+from app.services.caldav_client import CalDAVCalendar, caldav_session
+from app.services.parse_cache import CountingCache, shared_component_cache
+from app.services.sync_plan import SyncPlan
+from app.services.sync_window import SyncWindow, active_window
+
+
+class CategoryMatcher:
+    """Category whose name appears in an event's title or description (first match wins)."""
+
+    def __init__(self, categories: List[Category]):
+        self._names = [(category.name.lower(), category) for category in categories]
+
+    def match(self, title: Optional[str], description: Optional[str]) -> Optional[Category]:
+        search_text = f"{title} {description}".lower()
+        for name, category in self._names:
+            if name in search_text:
+                return category
+        return None
+
+
+class SyncContext:
+    def __init__(self, db: AsyncSession, calendar_name: str = "HomeBase", audit: bool = False, dry_run: bool = False):
+        self.db = db
+        self.calendar_name = calendar_name
+        self.audit = audit
+        self.dry_run = dry_run  # A preview: fetch unconditionally and leave caches, validators and sessions alone
+        self.window: Optional[SyncWindow] = None if audit else active_window()
+        self.remote: Optional[Dict[str, Dict]] = None  # iCloud snapshot in the window {uid: event_data}, once fetched
+        self.local: Optional[Dict[str, Event]] = None  # Local snapshot in the window {uid: Event}, once loaded
+        self.feed_uids: Optional[Set[str]] = None  # Every uid in the downloaded feed, once fetched
+        self.unparsed: Optional[Tuple] = None  # (digest, VEVENTs, zones) of an unchanged feed not parsed yet
+        self._calendar_row: Optional[CalendarModel] = None
+        self._matcher: Optional[CategoryMatcher] = None
+        self._caldav: Optional[CalDAVCalendar] = None
+        self._parse_cache: Optional[CountingCache] = None
+        self.writes: Dict[str, int] = {"db": 0, "icloud": 0}
+        self.timings: Dict[str, float] = {}  # Seconds per phase, e.g. "import.plan"
+        self.plans: Dict[str, SyncPlan] = {}  # The plan of each phase that has planned, e.g. "import"
+
+    async def calendar_row(self) -> Optional[CalendarModel]:
+        if self._calendar_row is None:
+            result = await self.db.execute(select(CalendarModel).where(CalendarModel.name == self.calendar_name))
+            self._calendar_row = result.scalar_one_or_none()
+        elif inspect(self._calendar_row).expired:
+            # A phase committed since (sessions expire on commit): reload it here, not by a lazy load
+            await self.db.refresh(self._calendar_row)
+        return self._calendar_row
+
+    async def local_events(self) -> Dict[str, Event]:
+        if self.local is None:
+            query = select(Event)
+            if self.window is not None:
+                query = query.where(self.window.clause())
+            result = await self.db.execute(query)
+            self.local = {event.uid: event for event in result.scalars().all()}
+        return self.local
+
+    async def events(self, uids: List[str]) -> Dict[str, Event]:
+        """The local rows for just these uids (from the full snapshot if it is loaded)."""
+        if self.local is not None:
+            return {uid: self.local[uid] for uid in uids if uid in self.local}
+        if not uids:
+            return {}
+        result = await self.db.execute(select(Event).where(Event.uid.in_(uids)))
+        return {event.uid: event for event in result.scalars().all()}
+
+    async def categories(self) -> CategoryMatcher:
+        if self._matcher is None:
+            result = await self.db.execute(select(Category))
+            self._matcher = CategoryMatcher(result.scalars().all())
+        return self._matcher
+
+    async def caldav(self) -> CalDAVCalendar:
+        if self._caldav is None:
+            self._caldav = await caldav_session.get_calendar(self.db)
+        return self._caldav
+
+    def parse_cache(self) -> CountingCache:
+        """The shared VEVENT parse cache, counting this run's hits and misses."""
+        if self._parse_cache is None:
+            self._parse_cache = CountingCache(shared_component_cache())
+        return self._parse_cache
+
+    def record_local(self, event: Event):
+        """A phase added (or re-keyed) a local event."""
+        if self.local is not None:
+            self.local[event.uid] = event
+
+    def forget_local(self, uid: str):
+        """A phase deleted a local event."""
+        if self.local is not None:
+            self.local.pop(uid, None)
+
+    def reset_local(self):
+        """Local rows were rewritten in bulk; reload the snapshot when it is next needed."""
+        self.local = None
+
+    def record_remote(self, uid: str, event_data: Dict):
+        """A phase wrote an event to iCloud."""
+        if self.remote is not None:
+            self.remote[uid] = event_data
+
+    def wrote(self, target: str, count: int = 1):
+        """A phase wrote count event rows ("db") or sent count PUT/DELETE requests ("icloud")."""
+        self.writes[target] += count
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a step of the run into timings[name] (added up if it runs more than once)."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(self.timings.get(name, 0.0) + time.monotonic() - started, 3)
@@ -0,0 +1,82 @@
+"""
+Single-flight gate for sync operations: one sync runs at a time, and callers
+asking for one already in flight share its result.
+"""
+
+import asyncio
+import logging
+import sys
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.utils.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SyncFunc = Callable[[AsyncSession], Awaitable[Dict]]
+
+
+class SyncGate:
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._last: Dict[str, Tuple[float, Dict]] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def run(self, key: str, func: SyncFunc, max_age: Optional[float] = None,
+                  timeout: Optional[float] = None) -> Dict:
+        """
+        Run func(db) as the sync named key, or join the run already in flight.
+        If max_age (seconds) is given and the last successful run of key is
+        younger than that, its result is returned without syncing.
+        If timeout (seconds) passes first, the run itself is cancelled and
+        asyncio.TimeoutError raised.
+        """
+        if max_age is not None and key in self._last:
+            finished, result = self._last[key]
+            age = time.monotonic() - finished
+            if age <= max_age:
+                return dict(result, cached=True, age_seconds=round(age, 1))
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._execute(key, func))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            logger.info(f"Joining in-flight {key} sync")
+        # A caller that goes away (closed tab) must not cancel the run for the others
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"{key} sync exceeded {timeout}s, cancelling it")
+            task.cancel()
+            raise
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def last_result(self, key: str) -> Optional[Dict]:
+        entry = self._last.get(key)
+        return entry[1] if entry else None
+
+    async def _execute(self, key: str, func: SyncFunc) -> Dict:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Different kinds of sync touch the same rows, so they take turns
+        async with self._lock:
+            async with AsyncSessionLocal() as db:
+                result = await func(db)
+        if isinstance(result, dict) and result.get("status") == "success":
+            self._last[key] = (time.monotonic(), result)
+        return result
+
+
+sync_gate = SyncGate()
@@ -0,0 +1,79 @@
+"""
+Explicit plans for the iCloud syncs: every local and remote change a sync would
+make, with its reason, built without side effects and applied by two_way_sync.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+# Remote actions
+ADD = "add"  # Replace any copies of the UID with a new <uid>.ics
+CREATE = "create"  # New <uid>.ics, nothing to replace
+UPDATE = "update"  # PUT in place, conditional on the indexed ETag
+DELETE = "delete"
+OUTBOX = "outbox"  # Queued dashboard write, delivered by the outbox
+
+
+@dataclass
+class LocalChange:
+    uid: str
+    reason: str
+    row: Optional[Dict] = None  # Event columns to reconcile (inserts and updates)
+    tombstone: bool = False  # Deletes: record it, so the event isn't brought back (see tombstones)
+
+    def summary(self) -> Dict:
+        return {"uid": self.uid, "reason": self.reason}
+
+
+@dataclass
+class RemoteChange:
+    uid: str
+    reason: str
+    action: str
+    event: Any = None  # The local Event to send (puts)
+    href: Optional[str] = None  # The resource to remove, if known (deletes)
+
+    def summary(self) -> Dict:
+        return {"uid": self.uid, "reason": self.reason, "action": self.action}
+
+
+@dataclass
+class SyncPlan:
+    local_inserts: List[LocalChange] = field(default_factory=list)
+    local_updates: List[LocalChange] = field(default_factory=list)
+    local_deletes: List[LocalChange] = field(default_factory=list)
+    remote_puts: List[RemoteChange] = field(default_factory=list)
+    remote_deletes: List[RemoteChange] = field(default_factory=list)
+    skipped: int = 0  # Events compared and found equal, or left to the outbox
+
+    def __len__(self) -> int:
+        return (len(self.local_inserts) + len(self.local_updates) + len(self.local_deletes)
+                + len(self.remote_puts) + len(self.remote_deletes))
+
+    def local_rows(self) -> List[Dict]:
+        return [change.row for change in self.local_inserts + self.local_updates]
+
+    def local_uids(self) -> Set[str]:
+        """Events the local side of the plan writes or removes."""
+        return {change.uid for change in self.local_inserts + self.local_updates + self.local_deletes}
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "local_inserts": len(self.local_inserts),
+            "local_updates": len(self.local_updates),
+            "local_deletes": len(self.local_deletes),
+            "remote_puts": len(self.remote_puts),
+            "remote_deletes": len(self.remote_deletes),
+            "skipped": self.skipped,
+        }
+
+    def report(self) -> Dict:
+        """Every planned change with its reason, for a dry run."""
+        return {
+            "counts": self.counts(),
+            "local_inserts": [change.summary() for change in self.local_inserts],
+            "local_updates": [change.summary() for change in self.local_updates],
+            "local_deletes": [change.summary() for change in self.local_deletes],
+            "remote_puts": [change.summary() for change in self.remote_puts],
+            "remote_deletes": [change.summary() for change in self.remote_deletes],
+        }
@@ -0,0 +1,230 @@
+"""
+In-process scheduler (APScheduler, started from the FastAPI lifespan) for the
+background syncs, cleanup and outbox delivery, with the last result of each job.
+"""
+
+import asyncio
+import logging
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.models.events import Event
+from app.services.adaptive_interval import AdaptiveInterval
+from app.services.outbox import deliver_outbox
+from app.services.recurrence import expand_events
+from app.services.resilience import HOCKEY, unavailable
+from app.services.sync_gate import sync_gate
+from app.services.tombstones import collect_garbage
+from app.services.two_way_sync import HOCKEY_EVENTS, audit_two_way_sync, full_two_way_sync
+from app.utils.database import AsyncSessionLocal
+from config import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+async def hockey_sync_job(db: Optional[AsyncSession] = None) -> Dict:
+    """Create the hockey category, drop old games and sync the schedule (uses its own sessions)."""
+    from scripts.hockey_schedule_sync import cleanup_old_hockey_events, create_hockey_category, sync_hockey_events
+    down = unavailable(HOCKEY)
+    if down:
+        return down
+    await create_hockey_category()
+    cleaned_count = await cleanup_old_hockey_events()
+    sync_result = await sync_hockey_events()
+    if sync_result is None:
+        return {"status": "error", "message": "Failed to sync hockey schedule"}
+    return {
+        "status": "success",
+        "message": "Hockey schedule synced successfully",
+        "details": {
+            "added": sync_result["added"],
+            "updated": sync_result["updated"],
+            "deleted": sync_result["deleted"],
+            "cleaned_up_old": cleaned_count,
+            "total_website_events": sync_result["total_website_events"],
+            "total_db_events": sync_result["total_db_events"],
+            "user": sync_result["user"]
+        }
+    }
+
+
+async def cleanup_job(db: Optional[AsyncSession] = None) -> Dict:
+    """Drop old hockey games and tombstones past settings.tombstone_retention_days."""
+    from scripts.hockey_schedule_sync import cleanup_old_hockey_events
+    if db is None:
+        async with AsyncSessionLocal() as db:
+            return await cleanup_job(db)
+    cleaned = await cleanup_old_hockey_events()
+    collected = await collect_garbage(db)
+    await db.commit()
+    return {
+        "status": "success",
+        "message": f"Cleaned up {cleaned} old events and {collected} tombstones",
+        "details": {"cleaned_up_old": cleaned, "tombstones_collected": collected}
+    }
+
+
+def two_way_changed(result: Dict) -> bool:
+    """Whether a two-way sync wrote anything, locally or to iCloud (an unchanged feed writes nothing)."""
+    details = result.get("details") or {}
+    delivered = (details.get("outbox") or {}).get("delivered", 0)
+    return bool(delivered or any((details.get("writes") or {}).values()))
+
+
+def hockey_changed(result: Dict) -> bool:
+    details = result.get("details") or {}
+    return any(details.get(key) for key in ("added", "updated", "deleted"))
+
+
+async def events_starting_soon(scope=None, now: Optional[datetime] = None) -> bool:
+    """Whether an event (among scope, if given) starts within settings.sync_soon_hours."""
+    now = now or datetime.now()
+    end = now + timedelta(hours=settings.sync_soon_hours)
+    query = select(Event).where(or_(
+        Event.rrule.isnot(None),
+        Event.series_uid.isnot(None),
+        and_(Event.start_time >= now, Event.start_time < end)
+    ))
+    if scope is not None:
+        query = query.where(scope)
+    async with AsyncSessionLocal() as db:
+        events = (await db.execute(query)).scalars().all()
+        return any(now <= event.start_time < end for event in expand_events(events, now, end))
+
+
+def _gated(key: str, func: Callable[[AsyncSession], Awaitable[Dict]]) -> Callable[[], Awaitable[Dict]]:
+    # Scheduled runs share the single-flight gate with the API endpoints
+    return lambda: sync_gate.run(key, func, timeout=settings.sync_job_timeout_seconds)
+
+
+class SyncScheduler:
+    def __init__(self):
+        self._scheduler: Optional[AsyncIOScheduler] = None
+        self.status: Dict[str, Dict] = {}
+        # job id -> (its interval, whether a result changed anything, scope of its events)
+        self.adaptive: Dict[str, Tuple[AdaptiveInterval, Callable[[Dict], bool], object]] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._scheduler is not None and self._scheduler.running
+
+    def start(self):
+        if self.running:
+            return
+        scheduler = AsyncIOScheduler(job_defaults={
+            "coalesce": True,  # After downtime, run once instead of once per missed slot
+            "max_instances": 1,
+            "misfire_grace_time": 60 * settings.sync_interval_minutes,
+        })
+        jitter = settings.sync_jitter_seconds
+        first_run = datetime.now() + timedelta(seconds=10)  # Let startup finish first
+        if settings.adaptive_sync_enabled:
+            self.adaptive = {
+                "icloud_sync": (AdaptiveInterval(
+                    timedelta(minutes=settings.sync_interval_minutes),
+                    timedelta(minutes=settings.sync_interval_min_minutes),
+                    timedelta(minutes=settings.sync_interval_max_minutes),
+                    settings.sync_idle_runs,
+                ), two_way_changed, ~HOCKEY_EVENTS),
+                "hockey_sync": (AdaptiveInterval(
+                    timedelta(minutes=settings.hockey_sync_interval_minutes),
+                    timedelta(minutes=settings.hockey_sync_interval_min_minutes),
+                    timedelta(minutes=settings.hockey_sync_interval_max_minutes),
+                    settings.sync_idle_runs,
+                ), hockey_changed, HOCKEY_EVENTS),
+            }
+        self._add(scheduler, "icloud_sync", _gated("two_way", full_two_way_sync),
+                  IntervalTrigger(minutes=settings.sync_interval_minutes, jitter=jitter), first_run)
+        if settings.sync_window_enabled:
+            # Not at startup: the routine sync goes first, and the gate keeps them apart
+            self._add(scheduler, "icloud_audit", _gated("audit", audit_two_way_sync),
+                      IntervalTrigger(hours=settings.sync_audit_interval_hours, jitter=jitter))
+        self._add(scheduler, "outbox", _gated("outbox", deliver_outbox),
+                  IntervalTrigger(seconds=settings.outbox_retry_seconds), first_run)
+        self._add(scheduler, "hockey_sync", _gated("hockey", hockey_sync_job),
+                  IntervalTrigger(minutes=settings.hockey_sync_interval_minutes, jitter=jitter), first_run)
+        self._add(scheduler, "cleanup", _gated("cleanup", cleanup_job),
+                  IntervalTrigger(hours=settings.cleanup_interval_hours, jitter=jitter))
+        scheduler.start()
+        self._scheduler = scheduler
+        logger.info("Background sync scheduler started")
+
+    def shutdown(self):
+        if self.running:
+            self._scheduler.shutdown(wait=False)
+        self._scheduler = None
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Last run of every job plus when it runs next."""
+        jobs = {}
+        for job_id, state in self.status.items():
+            jobs[job_id] = dict(state)
+        for job_id, (interval, _changed, _scope) in self.adaptive.items():
+            jobs.setdefault(job_id, {"status": "pending"})["adaptive"] = interval.report()
+        if self.running:
+            for job in self._scheduler.get_jobs():
+                entry = jobs.setdefault(job.id, {"status": "pending"})
+                entry["next_run"] = job.next_run_time.isoformat() if job.next_run_time else None
+        return {"enabled": self.running, "jobs": jobs}
+
+    def _add(self, scheduler: AsyncIOScheduler, job_id: str, func: Callable[[], Awaitable[Dict]],
+             trigger: IntervalTrigger, next_run_time: Optional[datetime] = None):
+        kwargs = {"next_run_time": next_run_time} if next_run_time else {}
+        scheduler.add_job(self.run_job, trigger, args=[job_id, func], id=job_id, replace_existing=True, **kwargs)
+
+    async def run_job(self, job_id: str, func: Callable[[], Awaitable[Dict]], timeout: Optional[float] = None):
+        """Run one job with a timeout and record its outcome; never raises."""
+        timeout = timeout or settings.sync_job_timeout_seconds
+        started = time.monotonic()
+        self.status.setdefault(job_id, {})["running"] = True
+        result = None
+        try:
+            result = await asyncio.wait_for(func(), timeout)
+            status = result.get("status", "success") if isinstance(result, dict) else "success"
+            message = result.get("message", "") if isinstance(result, dict) else ""
+        except asyncio.TimeoutError:
+            status, message = "error", f"Timed out after {timeout}s"
+        except Exception as e:
+            status, message = "error", str(e)
+        if status == "error":
+            logger.error(f"Scheduled {job_id} failed: {message}")
+        self.status[job_id] = {
+            "running": False,
+            "status": status,
+            "message": message,
+            "last_run": datetime.utcnow().isoformat(),
+            "duration": round(time.monotonic() - started, 2),
+        }
+        if job_id in self.adaptive and status == "success" and isinstance(result, dict):
+            try:
+                await self.adapt(job_id, result)
+            except Exception as e:
+                logger.error(f"Could not adapt the {job_id} interval: {e}")
+
+    async def adapt(self, job_id: str, result: Dict) -> timedelta:
+        """Fold a successful run into the job's interval and schedule its next run accordingly."""
+        interval, changed, scope = self.adaptive[job_id]
+        interval.record(changed(result))
+        delay = interval.next_interval(await events_starting_soon(scope))
+        if self.running and self._scheduler.get_job(job_id) is not None:
+            self._scheduler.reschedule_job(
+                job_id, trigger=IntervalTrigger(seconds=delay.total_seconds(), jitter=settings.sync_jitter_seconds)
+            )
+        logger.info(f"Next {job_id} in {delay.total_seconds() / 60:.1f} min")
+        return delay
+
+
+sync_scheduler = SyncScheduler()
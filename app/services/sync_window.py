@@ -0,0 +1,80 @@
+"""
+The active sync window: the part of the calendar a routine sync compares.
+Recurring series always count as inside; audit runs have no window.
+"""
+
+import sys
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import and_, or_
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.models.event_fields import storage_time
+from app.models.events import Event
+from app.services.ics_stream import RawComponent
+from config import settings
+
+# Slack for the raw-line check, which reads dates without their time zone
+RAW_MARGIN = timedelta(days=2)
+
+
+def _raw_date(value: Optional[str]) -> Optional[date]:
+    try:
+        return datetime.strptime(value[:8], "%Y%m%d").date() if value else None
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class SyncWindow:
+    start: datetime  # Naive local wall-clock time, like events.start_time
+    end: datetime
+
+    def contains(self, event_data: Dict) -> bool:
+        """Whether an event dict (iCloud or local shape) belongs to the window."""
+        if event_data.get('rrule') or event_data.get('series_uid'):
+            return True
+        return storage_time(event_data['start_time']) < self.end and storage_time(event_data['end_time']) > self.start
+
+    def keeps(self, component: RawComponent) -> bool:
+        """
+        Cheap check on an unparsed VEVENT: False only if it is certainly outside
+        the window. contains() decides once it is parsed.
+        """
+        if component.property('RRULE') is not None or component.property('RECURRENCE-ID') is not None:
+            return True
+        start = _raw_date(component.property('DTSTART'))
+        if start is None:
+            return True
+        end = _raw_date(component.property('DTEND'))
+        if end is None:
+            # DURATION or no end: only the start bounds it
+            return start <= (self.end + RAW_MARGIN).date()
+        return start <= (self.end + RAW_MARGIN).date() and end >= (self.start - RAW_MARGIN).date()
+
+    def report(self) -> Dict:
+        return {"start": self.start.isoformat(), "end": self.end.isoformat()}
+
+    def clause(self):
+        """WHERE clause on events for the rows inside the window."""
+        return or_(
+            Event.rrule.isnot(None),
+            Event.series_uid.isnot(None),
+            and_(Event.start_time < self.end, Event.end_time > self.start)
+        )
+
+
+def active_window(now: Optional[datetime] = None) -> Optional[SyncWindow]:
+    """The window for a routine sync, on day boundaries; None when windowing is off."""
+    if not settings.sync_window_enabled:
+        return None
+    today = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return SyncWindow(
+        today - timedelta(days=settings.sync_window_past_days),
+        today + timedelta(days=settings.sync_window_future_days)
+    )
@@ -0,0 +1,108 @@
+"""
+Tombstones for deleted events: one row per uid deleted in iCloud or in the
+dashboard, so a sync can tell "deleted here" from "new there".
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+# Add the project's root directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.models.tombstone import Tombstone
+from config import settings
+
+# Where an event was deleted
+ICLOUD = "icloud"
+LOCAL = "local"
+
+
+def _chunks(uids: Iterable[str]) -> Iterable[List[str]]:
+    uids = list(uids)
+    for start in range(0, len(uids), settings.sync_chunk_size):
+        yield uids[start:start + settings.sync_chunk_size]
+
+
+async def record(db: AsyncSession, deletions: Iterable[Tuple[str, Optional[str]]], origin: str,
+                 propagated: bool = False):
+    """
+    Record (uid, remote_href) deletions from origin; committed with the caller's
+    delete. propagated means the other side is already rid of the events too.
+    A uid that already has a tombstone gets it renewed.
+    """
+    deletions = dict(deletions)
+    now = datetime.utcnow()
+    existing = {}
+    for chunk in _chunks(deletions):
+        result = await db.execute(select(Tombstone).where(Tombstone.uid.in_(chunk)))
+        existing.update({tombstone.uid: tombstone for tombstone in result.scalars().all()})
+    for uid, remote_href in deletions.items():
+        tombstone = existing.get(uid)
+        if tombstone is None:
+            tombstone = Tombstone(uid=uid)
+            db.add(tombstone)
+        tombstone.origin = origin
+        tombstone.remote_href = remote_href or tombstone.remote_href
+        tombstone.deleted_at = now
+        tombstone.propagated_at = now if propagated else None
+
+
+async def tombstoned(db: AsyncSession, uids: Iterable[str]) -> Dict[str, Tombstone]:
+    """The tombstones of those uids that have one."""
+    found = {}
+    for chunk in _chunks(set(uids)):
+        result = await db.execute(select(Tombstone).where(Tombstone.uid.in_(chunk)))
+        found.update({tombstone.uid: tombstone for tombstone in result.scalars().all()})
+    return found
+
+
+async def unpropagated(db: AsyncSession) -> Dict[str, Optional[str]]:
+    """{uid: remote_href} of dashboard deletions not yet known to have reached iCloud."""
+    result = await db.execute(
+        select(Tombstone.uid, Tombstone.remote_href)
+        .where(Tombstone.origin == LOCAL, Tombstone.propagated_at.is_(None))
+    )
+    return dict(result.all())
+
+
+async def mark_propagated(db: AsyncSession, uids: Iterable[str]):
+    for chunk in _chunks(uids):
+        await db.execute(
+            update(Tombstone).where(Tombstone.uid.in_(chunk), Tombstone.propagated_at.is_(None))
+            .values(propagated_at=datetime.utcnow())
+        )
+
+
+async def clear(db: AsyncSession, uids: Iterable[str]) -> int:
+    """The events were written again: drop their tombstones. Returns how many there were."""
+    cleared = 0
+    for chunk in _chunks(uids):
+        result = await db.execute(delete(Tombstone).where(Tombstone.uid.in_(chunk)))
+        cleared += result.rowcount
+    return cleared
+
+
+async def collect_garbage(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """Drop tombstones older than settings.tombstone_retention_days. The caller commits."""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=settings.tombstone_retention_days)
+    result = await db.execute(delete(Tombstone).where(Tombstone.deleted_at < cutoff))
+    return result.rowcount
+
+
+async def tombstone_status(db: AsyncSession) -> Dict:
+    result = await db.execute(
+        select(Tombstone.origin, func.count(), func.count(Tombstone.propagated_at)).group_by(Tombstone.origin)
+    )
+    counts = {origin: (total, propagated) for origin, total, propagated in result.all()}
+    return {
+        "icloud": counts.get(ICLOUD, (0, 0))[0],
+        "local": counts.get(LOCAL, (0, 0))[0],
+        "unpropagated": sum(total - propagated for total, propagated in counts.values()),
+        "retention_days": settings.tombstone_retention_days,
+    }
@@ -1,6 +1,6 @@
-import caldav
 from caldav.lib.error import AuthorizationError, NotFoundError
-from icalendar import Calendar as iCalendar, Event as iEvent, vText
+from icalendar import Calendar as iCalendar, Event as iEvent, vRecur, vText
+from sqlalchemy import and_, delete, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from datetime import datetime, timedelta
@@ -8,7 +8,9 @@ import pytz
 import sys
 import os
 import httpx
-from typing import Union, Dict, List, Tuple
+import asyncio
+from functools import partial
+from typing import Union, Dict, List, Tuple, Optional
 import recurring_ical_events
 import logging
 from rapidfuzz import fuzz
@@ -18,12 +20,56 @@ import re
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from app.models.calendar import Calendar as CalendarModel
+from app.models.event_fields import fields_differ, fingerprint, storage_time
 from app.models.events import Event, Category
+from app.models.tombstone import Tombstone
+from app.services.caldav_client import (
+    CalendarNotFound,
+    SyncCollectionUnsupported,
+    SyncTokenInvalid,
+    caldav_session,
+    calendar_multiget,
+    calendar_query_uid,
+    create_resource,
+    delete_resource,
+    get_resource,
+    has_caldav_credentials,
+    put_resource,
+    PreconditionFailed,
+    ServerBusy,
+    sync_collection,
+)
+from app.services.ics_stream import RawComponent, iter_components, stream_components
+from app.services.merge_join import merge_join
+from app.services.outbox import deliver_outbox, outbox_plan, pending_uids
+from app.services.parse_cache import CountingCache, component_key, shared_component_cache
+from app.services.push_executor import PushExecutor, PushResult
+from app.services.recurrence import override_uid, storage_exdates, storage_rrule
+from app.services.reconciler import reconcile
+from app.services.resilience import ICLOUD_CALDAV, ICLOUD_FEED, CircuitOpen, skipped, unavailable
+from app.services.sync_context import SyncContext
+from app.services.sync_gate import sync_gate
+from app.services.sync_plan import ADD, CREATE, DELETE, UPDATE, LocalChange, RemoteChange, SyncPlan
+from app.services.sync_window import SyncWindow
+from app.services import tombstones
+from app.services.webcal_feed import get_feed_validators, open_feed, set_feed_validators
 from config import settings
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Keys for this module's validators in Calendar.feed_state: the full import, and the
+# snapshot later phases fetch when the import didn't (an incremental run)
+FEED_CONSUMER = "two_way"
+SNAPSHOT_CONSUMER = "two_way_snapshot"
+
+# Games from the hockey site: local-only, never taken for deleted in iCloud
+HOCKEY_EVENTS = Event.uid.like("hockey_%")
+
+def had_icloud_copy(event: Event) -> bool:
+    """Whether the row was indexed to an iCloud resource or taken from one (synced_at alone isn't enough: the hockey sync sets it)."""
+    return event.remote_href is not None or event.remote_sequence is not None
+
 def find_matching_category(title: str, description: str, categories: list[Category]) -> Union[Category, None]:
     """
     Find a matching category based on name appearing in event title or description.
@@ -53,154 +99,676 @@ def normalize_uid(uid: str) -> str:
     
     return normalized
 
-async def fetch_icloud_events() -> Dict[str, Dict]:
+def vevent_to_dict(component) -> Dict:
+    """
+    Convert a VEVENT component into the plain dict used by the sync code.
+    A recurring master keeps its RRULE and EXDATEs; an override (RECURRENCE-ID)
+    gets its own uid, see recurrence.
+    """
+    uid = normalize_uid(str(component.get('uid')))
+    start = component.get('dtstart').dt
+    end = component.get('dtend')
+    if end:
+        end = end.dt
+    else:
+        if hasattr(start, 'hour'):
+            end = start + timedelta(hours=1)
+        else:
+            end = start + timedelta(days=1)
+    rrule = component.get('rrule')
+    recurrence_id = component.get('recurrence-id')
+    event_data = {
+        'uid': uid,
+        'title': str(component.get('summary', '')),
+        'description': str(component.get('description', '')),
+        'location': str(component.get('location', '')),
+        'start_time': start,
+        'end_time': end,
+        'rrule': storage_rrule(rrule) if rrule else None,
+        'exdates': storage_exdates(component.get('exdate')) if rrule else None,
+        'recurrence_id': storage_time(recurrence_id.dt) if recurrence_id else None,
+        'series_uid': None,
+        'source': 'icloud',
+        'sequence': int(component.get('sequence', 0))
+    }
+    if recurrence_id:
+        # An override is its own row, keyed apart from the master it belongs to
+        event_data['series_uid'] = uid
+        event_data['uid'] = override_uid(uid, event_data['recurrence_id'])
+    event_data['fingerprint'] = fingerprint(event_data)
+    return event_data
+
+def icloud_event_data(
+    component: RawComponent,
+    cache: Optional[CountingCache] = None,
+    zones: Optional[Dict[str, str]] = None,
+) -> Dict:
+    """
+    event_data for one streamed VEVENT.
+    cache maps the digest of the raw VEVENT (see parse_cache) to event_data; a hit
+    returns a copy, and the VEVENT is never parsed.
+    zones: {tzid: VTIMEZONE text} seen so far in the same document.
+    """
+    if cache is None:
+        return vevent_to_dict(component.parse())
+    key = component_key(component, zones)
+    record = cache.get(key)
+    if record is None:
+        record = vevent_to_dict(component.parse())
+        cache.put(key, record)
+    return dict(record)
+
+def parse_icloud_events(
+    cal_data: Union[str, bytes],
+    cache: Optional[CountingCache] = None,
+) -> Dict[str, Dict]:
+    """
+    Parse an iCalendar document into {uid: event_data}, one VEVENT at a time.
+    cache is passed on to icloud_event_data; the caller saves the cache.
+    """
+    icloud_events = {}
+    zones = {}
+    for component in iter_components(cal_data):
+        if component.name == "VTIMEZONE":
+            zones[component.property('TZID')] = component.text
+        elif component.name == "VEVENT":
+            event_data = icloud_event_data(component, cache, zones)
+            icloud_events[event_data['uid']] = event_data
+    return icloud_events
+
+# Last feed parsed in this process (one window's events), so a run whose feed
+# came back unchanged can still hand the later phases a snapshot without
+# downloading it again
+_feed_cache: Dict[str, object] = {}
+
+async def fetch_icloud_events(calendar_row: Optional[CalendarModel] = None, ctx: Optional[SyncContext] = None,
+                              consumer: str = FEED_CONSUMER) -> Optional[Dict[str, Dict]]:
     """
     Fetch all events from iCloud calendar and return them as a dictionary keyed by UID.
     Only store master recurring events (with RRULE), single events, and overrides/exceptions (with RECURRENCE-ID).
+    If calendar_row is given the request is conditional on the feed validators stored on it
+    for consumer (unless ctx is an audit run or a dry run): None is returned when the feed
+    is unchanged, and fresh validators are set on the row (the caller commits them).
+    A dry run leaves the validators, the parse cache file and the in-process copy alone.
+    If ctx is given only events in ctx.window are returned, and the parsed snapshot is
+    also stored as ctx.remote (even when the feed was unchanged, as long as this process
+    still holds that version), and the uids of every event in a downloaded feed as ctx.feed_uids.
+    VEVENTs are only parsed once the digest shows the feed changed; an unchanged feed
+    this process hasn't parsed yet is left in ctx.unparsed for remote_snapshot.
+    Errors are raised: an unreachable feed must not look like an empty calendar.
     Returns: {uid: {event_data}}
     """
-    icloud_events = {}
+    global _feed_cache
+    window = ctx.window if ctx is not None else None
+    dry_run = ctx is not None and ctx.dry_run
+    frozen = 0
     try:
-        # Convert webcal:// URL to https:// URL
-        webcal_url = settings.icloud_calendar_url
-        if webcal_url.startswith('webcal://'):
-            https_url = webcal_url.replace('webcal://', 'https://')
-        else:
-            https_url = webcal_url
-
-        # Fetch the calendar data using HTTP
-        async with httpx.AsyncClient() as client:
-            response = await client.get(https_url)
-            response.raise_for_status()
-        cal_data = response.text
-        cal = iCalendar.from_ical(cal_data)
-
-        for component in cal.walk():
-            if component.name == "VEVENT":
-                uid = str(component.get('uid'))
-                summary = str(component.get('summary', ''))
-                description = str(component.get('description', ''))
-                location = str(component.get('location', ''))
-                start = component.get('dtstart').dt
-                end = component.get('dtend')
-                if end:
-                    end = end.dt
-                else:
-                    if hasattr(start, 'hour'):
-                        end = start + timedelta(hours=1)
-                    else:
-                        end = start + timedelta(days=1)
-                rrule = component.get('rrule')
-                recurrence_id = component.get('recurrence-id')
-                icloud_events[normalize_uid(uid)] = {
-                    'uid': normalize_uid(uid),
-                    'title': summary,
-                    'description': description,
-                    'location': location,
-                    'start_time': start,
-                    'end_time': end,
-                    'rrule': rrule,
-                    'recurrence_id': recurrence_id,
-                    'source': 'icloud'
-                }
+        conditional = calendar_row is not None and not dry_run and not (ctx is not None and ctx.audit)
+        previous = get_feed_validators(calendar_row, consumer) if conditional else None
+        cache = ctx.parse_cache() if ctx is not None else CountingCache(shared_component_cache())
+        zones = {}
+        feed_uids = set()
+        components = []
+        # Whether the feed changed is only known from the digest once the whole
+        # body has been read, so the VEVENTs are kept raw until then
+        async with open_feed(settings.icloud_calendar_url, previous) as feed:
+            async for component in stream_components(feed.iter_bytes()):
+                if component.name == "VTIMEZONE":
+                    zones[component.property('TZID')] = component.text
+                elif component.name == "VEVENT":
+                    feed_uids.add(normalize_uid(component.property('UID') or ''))
+                    # Events outside the sync window are dropped without being kept
+                    if window is not None and not window.keeps(component):
+                        frozen += 1
+                        continue
+                    components.append(component)
+        if ctx is not None and not feed.not_modified:
+            ctx.feed_uids = feed_uids
+        if calendar_row is not None and not dry_run:
+            set_feed_validators(calendar_row, consumer, feed.validators)
+        digest = feed.validators.get('digest')
+        if feed.unchanged:
+            logger.info("iCloud feed unchanged since last sync")
+            if ctx is not None:
+                if _feed_cache.get('digest') == digest and _covers(_feed_cache.get('window'), window):
+                    ctx.remote = {
+                        uid: event for uid, event in _feed_cache['events'].items()
+                        if window is None or window.contains(event)
+                    }
+                elif not feed.not_modified:
+                    ctx.unparsed = (digest, components, zones)
+            return None
+        icloud_events, outside = _parse_components(components, zones, cache, window)
+        frozen += outside
+        if not dry_run:
+            cache.save()
+            _feed_cache = {'digest': digest, 'window': window, 'events': icloud_events}
+    except CircuitOpen:
+        # Not an empty calendar: the caller must not act on a missing snapshot
+        raise
     except Exception as e:
+        # Nor is an error (the import would take every event for deleted)
         logger.error(f"Error fetching iCloud events: {e}")
-        return {}
-    logger.info(f"Fetched {len(icloud_events)} events from iCloud (masters, singles, exceptions only)")
+        raise
+    logger.info(
+        f"Fetched {len(icloud_events)} events from iCloud (masters, singles, exceptions only); "
+        f"{frozen} outside the sync window"
+    )
+    if ctx is not None:
+        ctx.remote = dict(icloud_events)
     return icloud_events
 
-async def get_homebase_events(db: AsyncSession) -> Dict[str, Event]:
+def _parse_components(components, zones: Dict[str, str], cache, window: Optional[SyncWindow]) -> Tuple[Dict[str, Dict], int]:
+    """Parse raw VEVENTs into {uid: event_data}, leaving out those outside window; also returns how many were."""
+    events = {}
+    outside = 0
+    for component in components:
+        event_data = icloud_event_data(component, cache=cache, zones=zones)
+        if window is not None and not window.contains(event_data):
+            outside += 1
+            continue
+        events[event_data['uid']] = event_data
+    return events, outside
+
+def _covers(parsed: Optional[SyncWindow], window: Optional[SyncWindow]) -> bool:
+    """Whether events parsed for window parsed include every event in window."""
+    if parsed is None:
+        return True
+    return window is not None and parsed.start <= window.start and parsed.end >= window.end
+
+async def remote_snapshot(ctx: SyncContext) -> Dict[str, Dict]:
+    """
+    The iCloud snapshot for this run (in its window), downloading the feed only if no
+    phase has yet. That download is conditional, and only repeated in full when the
+    feed is unchanged but this process no longer holds its events.
+    """
+    global _feed_cache
+    if ctx.remote is None and ctx.unparsed is None:
+        await fetch_icloud_events(await ctx.calendar_row(), ctx, consumer=SNAPSHOT_CONSUMER)
+    if ctx.remote is None and ctx.unparsed is not None:
+        digest, components, zones = ctx.unparsed
+        cache = ctx.parse_cache()
+        events, _ = _parse_components(components, zones, cache, ctx.window)
+        cache.save()
+        _feed_cache = {'digest': digest, 'window': ctx.window, 'events': events}
+        ctx.remote, ctx.unparsed = dict(events), None
+    if ctx.remote is None:
+        ctx.remote = dict(await fetch_icloud_events(ctx=ctx) or {})
+    return ctx.remote
+
+async def fetch_icloud_changes(db: AsyncSession, calendar_row: CalendarModel, ctx: Optional[SyncContext] = None) -> Optional[Dict]:
+    """
+    Incremental pull: ask CalDAV for what changed since calendar_row.sync_token
+    (RFC 6578 sync-collection) and download only those resources with one
+    calendar-multiget REPORT.
+    Returns {'events': {uid: event_data}, 'deleted_hrefs': [...], 'sync_token': str},
+    or None when incremental sync is unavailable and the caller should do a full fetch.
+    If a resource fails to parse, sync_token is the one the pull started from, so the
+    next pull reports that resource again.
+    ctx, if given, counts the parse cache hits.
+    """
+    if not has_caldav_credentials():
+        return None
+
+    try:
+        calendar = await caldav_session.get_calendar(db)
+        calendar_url = calendar.url
+        client = calendar.http
+        start_token = calendar_row.sync_token
+        try:
+            delta = await sync_collection(client, calendar_url, start_token)
+        except SyncTokenInvalid:
+            # Token expired server-side: start over with an initial sync
+            logger.info("Sync token rejected by iCloud, restarting incremental sync from scratch")
+            start_token = None
+            delta = await sync_collection(client, calendar_url, None)
+
+        resources = await calendar_multiget(client, calendar_url, list(delta.changed))
+    except SyncCollectionUnsupported as e:
+        if e.status_code in (401, 404):
+            # Stored calendar URL or credentials went stale; re-discover next time
+            caldav_session.invalidate()
+            await caldav_session.get_calendar(db, rediscover=True)
+        logger.info(f"Incremental sync unavailable ({e}); using full fetch")
+        return None
+    except Exception as e:
+        logger.error(f"Error fetching iCloud changes: {e}")
+        return None
+
+    icloud_events = {}
+    failed = []
+    cache = ctx.parse_cache() if ctx is not None else CountingCache(shared_component_cache())
+    for href, etag, ical_text in resources:
+        try:
+            for uid, event_data in parse_icloud_events(ical_text, cache=cache).items():
+                event_data['href'] = href
+                event_data['etag'] = etag
+                icloud_events[uid] = event_data
+        except Exception as e:
+            failed.append(href)
+            logger.warning(f"Failed to parse iCloud resource {href}: {e}")
+    cache.save()
+    sync_token = delta.sync_token
+    if failed:
+        # Keep the old token: a new one would never report these resources again
+        logger.warning(f"Not advancing the sync token: {len(failed)} resources failed to parse")
+        sync_token = start_token
+
+    logger.info(
+        f"Fetched {len(icloud_events)} changed events from iCloud "
+        f"({len(delta.deleted)} deleted resources) via sync token"
+    )
+    return {
+        'events': icloud_events,
+        'deleted_hrefs': delta.deleted,
+        'sync_token': sync_token
+    }
+
+def local_event_dict(event: Event) -> Dict:
+    """A local event in the shape vevent_to_dict produces for iCloud events."""
+    return {
+        'uid': event.uid,
+        'title': event.title,
+        'description': event.description,
+        'location': event.location,
+        'start_time': event.start_time,
+        'end_time': event.end_time,
+        'rrule': event.rrule,
+        'exdates': event.exdates,
+        'recurrence_id': event.recurrence_id,
+        'series_uid': event.series_uid,
+        'source': 'icloud',
+        'href': event.remote_href,
+        'etag': event.remote_etag,
+        'sequence': event.remote_sequence,
+        'fingerprint': fingerprint(event)
+    }
+
+def icloud_row(icloud_event: Dict, calendar_id: int, category_id: Optional[int], synced_at: datetime) -> Dict:
+    """An iCloud event as a row for the reconciler."""
+    return {
+        'uid': icloud_event['uid'],
+        'title': icloud_event['title'],
+        'description': icloud_event['description'],
+        'location': icloud_event['location'],
+        'start_time': icloud_event['start_time'],
+        'end_time': icloud_event['end_time'],
+        'rrule': icloud_event.get('rrule'),
+        'exdates': icloud_event.get('exdates'),
+        'recurrence_id': icloud_event.get('recurrence_id'),
+        'series_uid': icloud_event.get('series_uid'),
+        'calendar_id': calendar_id,
+        'category_id': category_id,
+        'synced_at': synced_at,  # Mark as synced since it came from iCloud
+        'content_hash': icloud_event['fingerprint'],
+        'remote_sequence': icloud_event.get('sequence')
+    }
+
+def apply_icloud_fields(event: Event, icloud_event: Dict):
+    """Copy the synced fields and version of an iCloud event onto a local row, times in storage form."""
+    event.title = icloud_event['title']
+    event.description = icloud_event['description']
+    event.location = icloud_event['location']
+    event.start_time = storage_time(icloud_event['start_time'])
+    event.end_time = storage_time(icloud_event['end_time'])
+    event.rrule = icloud_event.get('rrule')
+    event.exdates = icloud_event.get('exdates')
+    event.recurrence_id = icloud_event.get('recurrence_id')
+    event.series_uid = icloud_event.get('series_uid')
+    event.content_hash = icloud_event['fingerprint']
+    event.remote_sequence = icloud_event.get('sequence')
+
+def event_to_ical(
+    uid: str,
+    title: str,
+    start_time,
+    end_time,
+    description: Optional[str],
+    location: Optional[str],
+    rrule: Optional[str] = None,
+    exdates: Optional[str] = None,
+) -> bytes:
+    """
+    Build a one-event VCALENDAR for pushing to iCloud.
+    rrule and exdates are a series' stored RRULE and EXDATEs (see recurrence).
+    """
+    new_ievent = iEvent()
+    new_ievent.add('uid', uid)
+    new_ievent.add('summary', title)
+    new_ievent.add('dtstart', start_time)
+    new_ievent.add('dtend', end_time)
+    if description:
+        new_ievent.add('description', description)
+    if location:
+        new_ievent.add('location', vText(location))
+    if rrule:
+        new_ievent.add('rrule', vRecur.from_ical(rrule))
+        if exdates:
+            new_ievent.add('exdate', [datetime.fromisoformat(value) for value in exdates.split(',')])
+    new_ical = iCalendar()
+    new_ical.add_component(new_ievent)
+    return new_ical.to_ical()
+
+def patch_ical(ical_text: str, title: str, start_time, end_time, description: Optional[str], location: Optional[str]) -> bytes:
+    """
+    Apply our fields to the master VEVENT of an existing resource, keeping
+    everything else iCloud stored on it (alarms, attendees, RRULE, overrides...).
+    """
+    cal = iCalendar.from_ical(ical_text)
+    for component in cal.walk():
+        if component.name == "VEVENT" and component.get('recurrence-id') is None:
+            for prop in ('summary', 'dtstart', 'dtend', 'duration', 'description', 'location'):
+                if prop in component:
+                    del component[prop]
+            component.add('summary', title)
+            component.add('dtstart', start_time)
+            component.add('dtend', end_time)
+            if description:
+                component.add('description', description)
+            if location:
+                component.add('location', vText(location))
+            break
+    return cal.to_ical()
+
+def resource_uids(ical_text: str) -> set:
+    """Raw (un-normalized) UIDs of the VEVENTs in one calendar resource."""
+    cal = iCalendar.from_ical(ical_text)
+    return {str(component.get('uid')) for component in cal.walk() if component.name == "VEVENT"}
+
+async def locate_icloud_resources(event: Event, db: Optional[AsyncSession] = None) -> List[Tuple[str, str]]:
+    """
+    Return the iCloud resources [(href, etag)] holding a local event.
+    Uses the href/ETag stored on the event; only on an index miss does it run a
+    UID calendar-query REPORT, and the first hit is stored back on the event
+    (persisted with the caller's next commit).
+    Matching is on normalized UIDs so copies with corrupted UIDs are found too.
+    """
+    if event.remote_href:
+        return [(event.remote_href, event.remote_etag or '')]
+
+    calendar = await caldav_session.get_calendar(db)
+    target_uid = normalize_uid(event.uid)
+    matches = []
+    for href, etag, ical_text in await calendar_query_uid(calendar.http, calendar.url, target_uid):
+        try:
+            if any(normalize_uid(uid) == target_uid for uid in resource_uids(ical_text)):
+                matches.append((href, etag))
+        except Exception as e:
+            logger.warning(f"Failed to parse iCloud resource {href}: {e}")
+
+    if matches:
+        event.remote_href, event.remote_etag = matches[0]
+    return matches
+
+async def get_homebase_events(db: AsyncSession, uids: Optional[List[str]] = None) -> Dict[str, Event]:
     """
     Get all events from HomeBase database and return them as a dictionary keyed by UID.
+    If uids is given, only those events are loaded.
     Returns: {uid: Event}
     """
-    result = await db.execute(select(Event))
+    query = select(Event)
+    if uids is not None:
+        query = query.where(Event.uid.in_(uids))
+    result = await db.execute(query)
     events = result.scalars().all()
     
     homebase_events = {event.uid: event for event in events}
     logger.info(f"Fetched {len(homebase_events)} events from HomeBase database")
     return homebase_events
 
-async def sync_icloud_to_homebase(db: AsyncSession) -> Dict:
+async def plan_import(db: AsyncSession, ctx: SyncContext, icloud_events: Dict[str, Dict], changes: Optional[Dict] = None) -> SyncPlan:
+    """
+    Diff iCloud events against the events table into local inserts, updates
+    and deletes; nothing is written. changes is the incremental delta the
+    events came from, or None for the full feed. Deletes that iCloud made are
+    marked for a tombstone, and tombstoned events are not brought back (see tombstones).
+    """
+    plan = SyncPlan()
+    calendar_id = (await ctx.calendar_row()).id
+    categories = await ctx.categories()
+    synced_at = datetime.utcnow()
+    # Local edits still in the outbox win until they are delivered
+    held = await pending_uids(db)
+    dead: Dict[str, Tombstone] = {}
+
+    async def load_tombstones(events: List[Dict]):
+        # Tombstones of just these events (and of the series of overrides among them)
+        uids = [event['uid'] for event in events] + [event['series_uid'] for event in events if event['series_uid']]
+        dead.update(await tombstones.tombstoned(db, uids))
+
+    def buried(icloud_event: Dict) -> bool:
+        tombstone = dead.get(icloud_event['uid']) or dead.get(icloud_event['series_uid'])
+        if tombstone is None:
+            return False
+        if changes is None:
+            # The published feed can still list an event deleted minutes ago
+            return True
+        # CalDAV itself has it; only a dashboard delete that hasn't reached iCloud yet outranks that
+        return tombstone.origin == tombstones.LOCAL and tombstone.propagated_at is None
+
+    def stage(icloud_event: Dict, target: List[LocalChange], reason: str):
+        if icloud_event['uid'] in held or buried(icloud_event):
+            plan.skipped += 1
+            return
+        category = categories.match(icloud_event['title'], icloud_event['description'])
+        row = icloud_row(icloud_event, calendar_id, category.id if category else None, synced_at)
+        if changes is not None:
+            row['remote_href'] = icloud_event['href']
+            row['remote_etag'] = icloud_event['etag']
+        target.append(LocalChange(icloud_event['uid'], reason, row))
+
+    if changes is not None:
+        # A delta is all changed resources; their rows are re-indexed to the new href/ETag too
+        uids = list(icloud_events)
+        local = {}
+        for start in range(0, len(uids), settings.sync_chunk_size):
+            result = await db.execute(
+                select(Event.uid, Event.content_hash, Event.remote_href, Event.remote_etag)
+                .where(Event.uid.in_(uids[start:start + settings.sync_chunk_size]))
+            )
+            local.update({uid: rest for uid, *rest in result.all()})
+        await load_tombstones(list(icloud_events.values()))
+        for uid, icloud_event in icloud_events.items():
+            if uid not in local:
+                stage(icloud_event, plan.local_inserts, "new in iCloud")
+            elif local[uid][0] != icloud_event['fingerprint']:
+                stage(icloud_event, plan.local_updates, "changed in iCloud")
+            elif local[uid][1:] != [icloud_event['href'], icloud_event['etag']]:
+                stage(icloud_event, plan.local_updates, "iCloud resource rewritten")
+            else:
+                plan.skipped += 1
+
+        # Resources removed from iCloud (iCloud is canonical): rows still pointing at a
+        # deleted href go, unless the delta re-pointed them at a new resource. So do
+        # overrides no longer in a changed resource
+        deleted_hrefs = set(changes['deleted_hrefs'])
+        scopes = []
+        if deleted_hrefs:
+            scopes.append(Event.remote_href.in_(deleted_hrefs))
+        changed_hrefs = {event['href'] for event in icloud_events.values()}
+        if changed_hrefs:
+            scopes.append(and_(Event.series_uid.isnot(None), Event.remote_href.in_(changed_hrefs)))
+        if scopes:
+            result = await db.execute(
+                select(Event.uid, Event.remote_href).where(or_(*scopes), Event.uid.not_in(uids))
+            )
+            for uid, href in result.all():
+                if uid in held:
+                    plan.skipped += 1
+                elif href in deleted_hrefs:
+                    plan.local_deletes.append(LocalChange(uid, "deleted in iCloud", tombstone=True))
+                else:
+                    plan.local_deletes.append(LocalChange(uid, "override removed from its series"))
+    else:
+        # Merge-join against the events table in uid order; only events that differ are
+        # planned. The feed isn't in uid order, so the window's events are sorted here
+        remote = sorted(icloud_events.values(), key=lambda event: event['uid'])
+        scope = ctx.window.clause() if ctx.window is not None else None
+        candidates, gone = [], []
+        async for chunk in merge_join(db, remote, scope=scope):
+            await load_tombstones(chunk.remote_only + chunk.changed)
+            for icloud_event in chunk.remote_only:
+                stage(icloud_event, plan.local_inserts, "new in iCloud")
+            for icloud_event in chunk.changed:
+                stage(icloud_event, plan.local_updates, "changed in iCloud")
+            plan.skipped += chunk.unchanged
+            candidates += [uid for uid in chunk.local_only if '::' in uid]
+            if ctx.feed_uids is not None:
+                # Nowhere in the feed, not merely outside the window
+                gone += [uid for uid in chunk.local_only if '::' not in uid and uid not in ctx.feed_uids]
+        if candidates:
+            # Overrides only come from iCloud, so one the feed no longer has is gone
+            result = await db.execute(
+                select(Event.uid).where(Event.uid.in_(candidates), Event.series_uid.isnot(None))
+            )
+            plan.local_deletes += [
+                LocalChange(uid, "override removed from its series") for uid in result.scalars().all()
+            ]
+        # An event that had been in iCloud and is gone from the feed was deleted there;
+        # one that never was (hockey games included) is the export's to send. Rows written
+        # within settings.feed_lag_minutes are left for later: the feed may not show them yet
+        cutoff = datetime.utcnow() - timedelta(minutes=settings.feed_lag_minutes)
+        for start in range(0, len(gone), settings.sync_chunk_size):
+            result = await db.execute(
+                select(Event.uid).where(
+                    Event.uid.in_(gone[start:start + settings.sync_chunk_size]),
+                    Event.series_uid.is_(None),
+                    ~HOCKEY_EVENTS,
+                    or_(Event.remote_href.isnot(None), Event.remote_sequence.isnot(None)),
+                    or_(Event.synced_at.is_(None), Event.synced_at < cutoff),
+                    or_(Event.updated_at.is_(None), Event.updated_at < cutoff),
+                )
+            )
+            for uid in result.scalars().all():
+                if uid in held:
+                    plan.skipped += 1
+                else:
+                    plan.local_deletes.append(LocalChange(uid, "deleted in iCloud", tombstone=True))
+    return plan
+
+async def apply_local_plan(db: AsyncSession, ctx: SyncContext, plan: SyncPlan) -> Dict[str, int]:
+    """
+    Apply the local side of plan: inserts and updates through the reconciler
+    in batches of settings.sync_chunk_size, then the deletes, with their
+    tombstones. The caller commits.
+    """
+    totals = {"added": 0, "updated": 0, "deleted": 0}
+    size = settings.sync_chunk_size
+    rows = plan.local_rows()
+    for start in range(0, len(rows), size):
+        reconciled = await reconcile(db, rows[start:start + size])
+        ctx.wrote("db", reconciled.writes)
+        totals["added"] += reconciled.added
+        totals["updated"] += reconciled.updated
+    uids = [change.uid for change in plan.local_deletes]
+    for start in range(0, len(uids), size):
+        removed = await db.execute(delete(Event).where(Event.uid.in_(uids[start:start + size])))
+        ctx.wrote("db", removed.rowcount)
+        totals["deleted"] += removed.rowcount
+    # Deleted in iCloud, now gone here too; a re-imported event is alive again
+    await tombstones.record(
+        db, [(change.uid, None) for change in plan.local_deletes if change.tombstone], tombstones.ICLOUD, propagated=True
+    )
+    await tombstones.clear(db, [change.uid for change in plan.local_inserts])
+    ctx.reset_local()
+    return totals
+
+async def sync_icloud_to_homebase(db: AsyncSession, incremental: Optional[bool] = None, ctx: Optional[SyncContext] = None,
+                                  dry_run: bool = False) -> Dict:
     """
     Sync events from iCloud to HomeBase (import).
-    Only adds new events or updates existing ones.
+    Adds new events, updates existing ones and removes the ones deleted in
+    iCloud: resources a delta reports deleted, or events gone from the whole
+    feed, leaving a tombstone for each (see tombstones).
+    When incremental (default: settings.icloud_incremental_sync), only the delta since
+    the stored sync token is pulled; otherwise the whole published feed is fetched.
+    ctx carries state shared with the other phases of the same run.
+    With dry_run the plan is returned (details.plan) and nothing is written or committed.
     """
+    if incremental is None:
+        incremental = settings.icloud_incremental_sync
+    if ctx is None:
+        ctx = SyncContext(db, dry_run=dry_run)
+    if dry_run:
+        # The delta would advance against the stored sync token and may rediscover the
+        # CalDAV session; a preview compares the whole feed instead
+        incremental = False
+
     # Get HomeBase calendar
-    result = await db.execute(select(CalendarModel).where(CalendarModel.name == "HomeBase"))
-    calendar_to_sync = result.scalar_one_or_none()
+    calendar_to_sync = await ctx.calendar_row()
 
     if not calendar_to_sync:
         return {"status": "error", "message": "HomeBase calendar not found in database."}
 
-    # Get all categories for name matching
-    result = await db.execute(select(Category))
-    categories = result.scalars().all()
-
-    # Fetch events from both sources
-    icloud_events = await fetch_icloud_events()
-    homebase_events = await get_homebase_events(db)
-    
-    events_added = 0
-    events_updated = 0
-    events_skipped = 0
-
-    # Process each iCloud event
-    for uid, icloud_event in icloud_events.items():
-        homebase_event = homebase_events.get(uid)
-        
-        if not homebase_event:
-            # New event - add to HomeBase
+    with ctx.phase("import.fetch"):
+        changes = await fetch_icloud_changes(db, calendar_to_sync, ctx) if incremental else None
+        if changes is not None:
+            icloud_events = changes['events']
+            unchanged = not icloud_events and not changes['deleted_hrefs']
+        else:
             try:
-                # Find matching category
-                category = find_matching_category(icloud_event['title'], icloud_event['description'], categories)
-                
-                new_event = Event(
-                    uid=uid,
-                    title=icloud_event['title'],
-                    description=icloud_event['description'],
-                    location=icloud_event['location'],
-                    start_time=icloud_event['start_time'],
-                    end_time=icloud_event['end_time'],
-                    calendar_id=calendar_to_sync.id,
-                    category_id=category.id if category else None,
-                    synced_at=datetime.utcnow()  # Mark as synced since it came from iCloud
-                )
-                db.add(new_event)
-                events_added += 1
-                logger.info(f"Added new event from iCloud: {icloud_event['title']}")
-                
+                icloud_events = await fetch_icloud_events(calendar_to_sync, ctx)
+            except CircuitOpen as e:
+                return skipped(e)
             except Exception as e:
-                logger.error(f"Failed to add event {uid}: {e}")
-                events_skipped += 1
-        else:
-            # Event exists - check if it needs updating
-            needs_update = (
-                homebase_event.title != icloud_event['title'] or
-                homebase_event.description != icloud_event['description'] or
-                homebase_event.location != icloud_event['location'] or
-                homebase_event.start_time != icloud_event['start_time'] or
-                homebase_event.end_time != icloud_event['end_time']
-            )
-            
-            if needs_update:
-                # Update the event
-                homebase_event.title = icloud_event['title']
-                homebase_event.description = icloud_event['description']
-                homebase_event.location = icloud_event['location']
-                homebase_event.start_time = icloud_event['start_time']
-                homebase_event.end_time = icloud_event['end_time']
-                homebase_event.updated_at = datetime.utcnow()
-                
-                # Update category if needed
-                category = find_matching_category(icloud_event['title'], icloud_event['description'], categories)
-                homebase_event.category_id = category.id if category else None
-                
-                db.add(homebase_event)
-                events_updated += 1
-                logger.info(f"Updated event from iCloud: {icloud_event['title']}")
-            else:
-                events_skipped += 1
+                return {"status": "error", "message": f"Could not fetch the iCloud feed: {e}"}
+            unchanged = icloud_events is None
+    mode = "incremental" if changes is not None else "full"
+
+    if unchanged:
+        # Nothing to parse or reconcile; only persist refreshed validators / token
+        if not dry_run:
+            if changes is not None:
+                calendar_to_sync.sync_token = changes['sync_token']
+            await db.commit()
+        plan = SyncPlan()
+        ctx.plans["import"] = plan
+        return {
+            "status": "success",
+            "message": "iCloud → HomeBase sync complete. iCloud calendar unchanged.",
+            "details": {
+                "added": 0,
+                "updated": 0,
+                "skipped": 0,
+                "unchanged": True,
+                "mode": mode,
+                "deleted_remote": 0,
+                "deleted": 0,
+                "plan": plan.report() if dry_run else plan.counts(),
+                "writes": dict(ctx.writes),
+                "parse_cache": ctx.parse_cache().report(),
+                "window": ctx.window.report() if ctx.window is not None else None
+            }
+        }
+
+    with ctx.phase("import.plan"):
+        plan = await plan_import(db, ctx, icloud_events, changes)
+    ctx.plans["import"] = plan
+    if dry_run:
+        return {
+            "status": "success",
+            "message": f"iCloud → HomeBase dry run: {len(plan)} changes planned",
+            "details": {
+                "dry_run": True,
+                "unchanged": False,
+                "mode": mode,
+                "plan": plan.report(),
+                "parse_cache": ctx.parse_cache().report(),
+                "window": ctx.window.report() if ctx.window is not None else None
+            }
+        }
+
+    with ctx.phase("import.apply"):
+        totals = await apply_local_plan(db, ctx, plan)
+    events_added = totals["added"]
+    events_updated = totals["updated"]
+    events_deleted = totals["deleted"]
+    events_skipped = len(icloud_events) - events_added - events_updated
+
+    if changes is not None:
+        # Persist the new token in the same commit as the changes it covers
+        calendar_to_sync.sync_token = changes['sync_token']
+        db.add(calendar_to_sync)
 
     await db.commit()
     
@@ -210,152 +778,300 @@ async def sync_icloud_to_homebase(db: AsyncSession) -> Dict:
         "details": {
             "added": events_added,
             "updated": events_updated,
-            "skipped": events_skipped
+            "skipped": events_skipped,
+            "unchanged": False,
+            "mode": mode,
+            "deleted_remote": len(changes['deleted_hrefs']) if changes is not None else 0,
+            "deleted": events_deleted,
+            "plan": plan.counts(),
+            "writes": dict(ctx.writes),
+            "parse_cache": ctx.parse_cache().report(),
+            "window": ctx.window.report() if ctx.window is not None else None
         }
     }
 
-async def sync_homebase_to_icloud(db: AsyncSession) -> Dict:
+async def confirm_from_icloud(db: AsyncSession, event: Event) -> bool:
+    """
+    Re-read the event's own iCloud resource (one GET by href) and apply what
+    iCloud stored to the local row, so a write-through change matches iCloud
+    without reconciling the whole calendar. Changes are left for the caller to commit.
+    Returns False if the resource could not be fetched.
+    """
+    if not event.remote_href:
+        return False
+    href = event.remote_href
+    try:
+        ical_text, etag = await caldav_session.run(lambda calendar: get_resource(calendar, href), db)
+        remote = parse_icloud_events(ical_text).get(normalize_uid(event.uid))
+    except Exception as e:
+        logger.warning(f"Could not confirm {event.uid} from iCloud: {e}")
+        return False
+
+    if remote:
+        apply_icloud_fields(event, remote)
+    if etag:
+        event.remote_etag = etag
+    event.synced_at = datetime.utcnow()
+    db.add(event)
+    return True
+
+async def put_in_place(calendar, event: Event, href: str, etag: Optional[str]) -> bool:
+    """
+    Patch our fields into the event's stored iCloud resource and PUT it back, so
+    what we don't model survives: alarms, attendees, X-APPLE-* properties and, for
+    a series, its RRULE, EXDATEs and overrides. The PUT is conditional on etag,
+    the version we last pulled (the one just fetched if none is stored).
+    If the resource changed on another device since (412), iCloud wins: its
+    current fields are taken locally and False is returned.
+    Used for every update, from the export and the dashboard outbox alike.
+    """
+    current_text, current_etag = await get_resource(calendar, href)
+    new_ical = patch_ical(current_text, event.title, event.start_time, event.end_time,
+                          event.description, event.location)
+    try:
+        event.remote_etag = await put_resource(calendar, href, new_ical, etag or current_etag or None)
+        return True
+    except PreconditionFailed:
+        ical_text, current_etag = await get_resource(calendar, href)
+        remote = parse_icloud_events(ical_text).get(normalize_uid(event.uid))
+        if remote:
+            apply_icloud_fields(event, remote)
+        event.remote_etag = current_etag
+        logger.info(f"iCloud copy of {event.uid} changed since last pull; kept the iCloud version")
+        return False
+
+async def reconcile_in_background():
+    """
+    Full iCloud → HomeBase import, queued (e.g. as a FastAPI background task)
+    after a write-through change. Goes through the sync gate, so it joins an
+    import already in flight instead of starting a second one.
+    """
+    try:
+        result = await sync_gate.run("import", sync_icloud_to_homebase)
+        logger.info(f"Background reconcile: {result.get('message')}")
+    except Exception as e:
+        logger.error(f"Background reconcile failed: {e}")
+
+async def add_to_icloud(ctx: SyncContext, calendar, uid: str, homebase_event: Event) -> str:
+    new_ical = event_to_ical(
+        uid, homebase_event.title, homebase_event.start_time, homebase_event.end_time,
+        homebase_event.description, homebase_event.location,
+        homebase_event.rrule, homebase_event.exdates
+    )
+
+    # Delete any existing events with this UID to prevent corruption
+    for href, _etag in await locate_icloud_resources(homebase_event):
+        try:
+            deleted = await delete_resource(calendar, href)
+            ctx.wrote("icloud")
+            if deleted:
+                logger.info(f"Deleted existing event with UID: {uid} ({href})")
+        except ServerBusy:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to check/delete event: {e}")
+
+    href, etag = await create_resource(calendar, uid, new_ical)
+    ctx.wrote("icloud")
+
+    # Mark as synced and index the new resource
+    homebase_event.remote_href = href
+    homebase_event.remote_etag = etag
+    homebase_event.synced_at = datetime.utcnow()
+    logger.info(f"Added event to iCloud: {homebase_event.title}")
+    return "added"
+
+async def create_in_icloud(ctx: SyncContext, calendar, uid: str, local_event: Event) -> str:
+    new_ical = event_to_ical(
+        uid, local_event.title, local_event.start_time, local_event.end_time,
+        local_event.description, local_event.location,
+        local_event.rrule, local_event.exdates
+    )
+    local_event.remote_href, local_event.remote_etag = await create_resource(calendar, uid, new_ical)
+    ctx.wrote("icloud")
+    logger.info(f"Pushed new local event to iCloud: {local_event.title} {local_event.start_time}")
+    return "added"
+
+async def update_in_icloud(ctx: SyncContext, calendar, uid: str, homebase_event: Event) -> str:
+    # Update the event in iCloud in place, conditional on the ETag of the version we last pulled
+    resources = await locate_icloud_resources(homebase_event)
+    if resources:
+        href, etag = resources[0]
+        if not await put_in_place(calendar, homebase_event, href, etag):
+            return "conflict"
+        ctx.wrote("icloud")
+    else:
+        new_ical = event_to_ical(
+            uid, homebase_event.title, homebase_event.start_time, homebase_event.end_time,
+            homebase_event.description, homebase_event.location,
+            homebase_event.rrule, homebase_event.exdates
+        )
+        href, etag = await create_resource(calendar, uid, new_ical)
+        ctx.wrote("icloud")
+        homebase_event.remote_href = href
+        homebase_event.remote_etag = etag
+
+    # Mark as synced
+    homebase_event.synced_at = datetime.utcnow()
+    logger.info(f"Updated event in iCloud: {homebase_event.title}")
+    return "updated"
+
+async def remove_from_icloud(ctx: SyncContext, calendar, uid: str, href: Optional[str]) -> str:
+    deleted = await delete_icloud_event(calendar, uid, href)
+    ctx.wrote("icloud")
+    logger.info(f"Deleted event from iCloud: {uid}" if deleted else f"Event already gone from iCloud: {uid}")
+    return "deleted" if deleted else "already gone"
+
+# Puts are given the local Event, deletes the href to remove
+REMOTE_ACTIONS = {ADD: add_to_icloud, CREATE: create_in_icloud, UPDATE: update_in_icloud, DELETE: remove_from_icloud}
+
+async def plan_export(db: AsyncSession, ctx: SyncContext, icloud_events: Dict[str, Dict]) -> SyncPlan:
+    """
+    Diff the events table against the iCloud snapshot into remote puts and
+    deletes; nothing is sent. Events the import of the same run plans to change
+    are left out: once it has run they match iCloud. Deletes come from the
+    dashboard deletions still in iCloud (see tombstones).
+    """
+    plan = SyncPlan()
+    imported = ctx.plans["import"].local_uids() if "import" in ctx.plans else set()
+    held = await pending_uids(db)
+
+    # Merge-join against the events table in uid order: only events missing from
+    # iCloud or with a different fingerprint are loaded, a chunk at a time. Both
+    # sides are limited to the sync window, so rows outside it are left alone
+    remote = sorted(icloud_events.values(), key=lambda event: event['uid'])
+    scope = ctx.window.clause() if ctx.window is not None else None
+    async for chunk in merge_join(db, remote, scope=scope):
+        candidates = [uid for uid in chunk.local_only + [event['uid'] for event in chunk.changed] if uid not in imported]
+        plan.skipped += chunk.unchanged + len(chunk.local_only) + len(chunk.changed) - len(candidates)
+        for uid, homebase_event in (await ctx.events(candidates)).items():
+            icloud_event = icloud_events.get(uid)
+            if uid in held:
+                # Delivered by the outbox
+                plan.skipped += 1
+            elif homebase_event.series_uid:
+                # Overrides only come from iCloud; they are pushed as part of their series
+                plan.skipped += 1
+            elif not icloud_event and ctx.feed_uids is not None and uid in ctx.feed_uids:
+                # Still in iCloud, only outside the window there; the audit compares it
+                plan.skipped += 1
+            elif not icloud_event and had_icloud_copy(homebase_event):
+                # Had been in iCloud, so it was deleted there (or the feed doesn't show it
+                # yet): the import removes it, pushing it back would undo the delete
+                plan.skipped += 1
+            elif not icloud_event:
+                plan.remote_puts.append(RemoteChange(uid, "missing in iCloud", ADD, homebase_event))
+            elif fields_differ(icloud_event, homebase_event):
+                plan.remote_puts.append(RemoteChange(uid, "changed locally", UPDATE, homebase_event))
+            else:
+                plan.skipped += 1
+
+    # Dashboard deletions the outbox gave up on: only the tombstones, not the events table
+    for uid, href in (await tombstones.unpropagated(db)).items():
+        if uid in icloud_events and uid not in held:
+            plan.remote_deletes.append(RemoteChange(uid, "deleted locally", DELETE, href=href))
+    return plan
+
+async def apply_remote_plan(db: AsyncSession, ctx: SyncContext, plan: SyncPlan) -> Tuple[List[PushResult], PushExecutor]:
+    """
+    Send the remote puts and deletes of plan concurrently through a PushExecutor,
+    index what iCloud stored on the local rows and settle the tombstones. The
+    caller commits.
+    """
+    executor = PushExecutor()
+    changes = [change for change in plan.remote_puts + plan.remote_deletes if change.action in REMOTE_ACTIONS]
+    if not changes:
+        return [], executor
+    # Resolved once and reused for every pushed event
+    calendar = await ctx.caldav()
+    results = await executor.run(
+        (change.uid, partial(REMOTE_ACTIONS[change.action], ctx, calendar, change.uid,
+                             change.href if change.action == DELETE else change.event))
+        for change in changes
+    )
+    events = {change.uid: change.event for change in changes}
+    put, removed = [], []
+    for result in results:
+        homebase_event = events[result.key]
+        if not result.ok:
+            logger.error(f"Failed to push event {result.key} to iCloud: {result.error}")
+        elif homebase_event is None:
+            removed.append(result.key)
+        else:
+            ctx.record_remote(result.key, local_event_dict(homebase_event))
+            ctx.wrote("db")
+            put.append(result.key)
+        if homebase_event is not None:
+            db.add(homebase_event)
+    # The deletes have reached iCloud; a pushed event is alive again
+    await tombstones.mark_propagated(db, removed)
+    await tombstones.clear(db, put)
+    return results, executor
+
+async def sync_homebase_to_icloud(db: AsyncSession, ctx: Optional[SyncContext] = None, dry_run: bool = False) -> Dict:
     """
     Sync events from HomeBase to iCloud (export).
-    Always checks iCloud first to prevent duplicates.
+    Always checks iCloud first to prevent duplicates. Dashboard deletions the
+    outbox could not deliver are sent again (see tombstones).
+    ctx carries state shared with the other phases of the same run.
+    With dry_run the plan is returned (details.plan) and nothing is sent or committed.
     """
+    if ctx is None:
+        ctx = SyncContext(db, dry_run=dry_run)
     # Verify credentials
     if not settings.caldav_url or not settings.icloud_username or not settings.icloud_password:
         return {
             "status": "error",
             "message": "CalDAV credentials are not configured."
         }
+    # Both the snapshot and the pushes need iCloud; skip rather than wait on timeouts
+    down = unavailable(ICLOUD_FEED, ICLOUD_CALDAV)
+    if down:
+        return down
 
-    try:
-        # Connect to CalDAV server
-        client = caldav.DAVClient(
-            url=settings.caldav_url,
-            username=settings.icloud_username,
-            password=settings.icloud_password
-        )
-        
-        # Find the target calendar (HomeBase calendar)
-        target_calendar_name = "HomeBase"
-        principal = client.principal()
-        caldav_calendars = [
-            c for c in principal.calendars()
-            if c.name == target_calendar_name
-        ]
-
-        if not caldav_calendars:
-            return {"status": "error", "message": f"Calendar '{target_calendar_name}' not found on iCloud."}
-
-        target_calendar = caldav_calendars[0]
-        
-    except AuthorizationError:
-        return {"status": "error", "message": "iCloud authorization failed. Check credentials."}
-    except Exception as e:
-        return {"status": "error", "message": f"Failed to connect to iCloud: {e}"}
+    if not dry_run:
+        try:
+            # Shared CalDAV session (cached connection and calendar URL)
+            await ctx.caldav()
+        except CalendarNotFound as e:
+            return {"status": "error", "message": str(e)}
+        except AuthorizationError:
+            return {"status": "error", "message": "iCloud authorization failed. Check credentials."}
+        except Exception as e:
+            return {"status": "error", "message": f"Failed to connect to iCloud: {e}"}
 
-    # Fetch current state from both sources
-    icloud_events = await fetch_icloud_events()
-    homebase_events = await get_homebase_events(db)
-    
-    events_added = 0
-    events_updated = 0
-    events_skipped = 0
-
-    # Process each HomeBase event
-    for uid, homebase_event in homebase_events.items():
-        icloud_event = icloud_events.get(uid)
-        
-        if not icloud_event:
-            # Event doesn't exist in iCloud - add it
-            try:
-                new_ievent = iEvent()
-                new_ievent.add('uid', uid)
-                new_ievent.add('summary', homebase_event.title)
-                new_ievent.add('dtstart', homebase_event.start_time)
-                new_ievent.add('dtend', homebase_event.end_time)
-                if homebase_event.description:
-                    new_ievent.add('description', homebase_event.description)
-                if homebase_event.location:
-                    new_ievent.add('location', vText(homebase_event.location))
-
-                new_ical = iCalendar()
-                new_ical.add_component(new_ievent)
-
-                # Delete any existing events with this UID to prevent corruption
-                for event in target_calendar.events():
-                    try:
-                        ical = event.icalendar_component
-                        event_uid = str(ical.get('uid', ''))
-                        if normalize_uid(event_uid) == normalize_uid(uid):
-                            event.delete()
-                            logger.info(f"Deleted existing event with UID: {event_uid}")
-                    except Exception as e:
-                        logger.warning(f"Failed to check/delete event: {e}")
-
-                target_calendar.save_event(new_ical.to_ical())
-                
-                # Mark as synced
-                homebase_event.synced_at = datetime.utcnow()
-                db.add(homebase_event)
-                
-                events_added += 1
-                logger.info(f"Added event to iCloud: {homebase_event.title}")
-                
-            except Exception as e:
-                logger.error(f"Failed to add event {uid} to iCloud: {e}")
-                events_skipped += 1
-        else:
-            # Event exists in iCloud - check if it needs updating
-            needs_update = (
-                icloud_event['title'] != homebase_event.title or
-                icloud_event['description'] != homebase_event.description or
-                icloud_event['location'] != homebase_event.location or
-                icloud_event['start_time'] != homebase_event.start_time or
-                icloud_event['end_time'] != homebase_event.end_time
-            )
-            
-            if needs_update:
-                try:
-                    # Update the event in iCloud
-                    new_ievent = iEvent()
-                    new_ievent.add('uid', uid)
-                    new_ievent.add('summary', homebase_event.title)
-                    new_ievent.add('dtstart', homebase_event.start_time)
-                    new_ievent.add('dtend', homebase_event.end_time)
-                    if homebase_event.description:
-                        new_ievent.add('description', homebase_event.description)
-                    if homebase_event.location:
-                        new_ievent.add('location', vText(homebase_event.location))
-
-                    new_ical = iCalendar()
-                    new_ical.add_component(new_ievent)
-
-                    # Delete any existing events with this UID to prevent corruption
-                    for event in target_calendar.events():
-                        try:
-                            ical = event.icalendar_component
-                            event_uid = str(ical.get('uid', ''))
-                            if normalize_uid(event_uid) == normalize_uid(uid):
-                                event.delete()
-                                logger.info(f"Deleted existing event with UID: {event_uid}")
-                        except Exception as e:
-                            logger.warning(f"Failed to check/delete event: {e}")
-
-                    target_calendar.save_event(new_ical.to_ical())
-                    
-                    # Mark as synced
-                    homebase_event.synced_at = datetime.utcnow()
-                    db.add(homebase_event)
-                    
-                    events_updated += 1
-                    logger.info(f"Updated event in iCloud: {homebase_event.title}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to update event {uid} in iCloud: {e}")
-                    events_skipped += 1
-            else:
-                events_skipped += 1
+    # Current state from both sources (reused from the import phase when there was one)
+    with ctx.phase("export.fetch"):
+        try:
+            icloud_events = await remote_snapshot(ctx)
+        except CircuitOpen as e:
+            return skipped(e)
+        except Exception as e:
+            return {"status": "error", "message": f"Could not fetch the iCloud feed: {e}"}
 
-    await db.commit()
+    with ctx.phase("export.plan"):
+        plan = await plan_export(db, ctx, icloud_events)
+    ctx.plans["export"] = plan
+    if dry_run:
+        return {
+            "status": "success",
+            "message": f"HomeBase → iCloud dry run: {len(plan)} changes planned",
+            "details": {
+                "dry_run": True,
+                "plan": plan.report(),
+                "window": ctx.window.report() if ctx.window is not None else None
+            }
+        }
+
+    with ctx.phase("export.apply"):
+        results, executor = await apply_remote_plan(db, ctx, plan)
+        await db.commit()
+
+    events_skipped = plan.skipped + sum(1 for r in results if not r.ok)
+    events_added = sum(1 for r in results if r.ok and r.value == "added")
+    events_updated = sum(1 for r in results if r.ok and r.value == "updated")
+    events_conflicts = sum(1 for r in results if r.ok and r.value == "conflict")
+    events_deleted = sum(1 for r in results if r.ok and r.value in ("deleted", "already gone"))
     
     return {
         "status": "success",
@@ -363,30 +1079,66 @@ async def sync_homebase_to_icloud(db: AsyncSession) -> Dict:
         "details": {
             "added": events_added,
             "updated": events_updated,
-            "skipped": events_skipped
+            "skipped": events_skipped,
+            "conflicts": events_conflicts,
+            "deleted": events_deleted,
+            "failed": sum(1 for r in results if not r.ok),
+            "items": [r.summary() for r in results],
+            "push": executor.stats(),
+            "plan": plan.counts(),
+            "writes": dict(ctx.writes),
+            "window": ctx.window.report() if ctx.window is not None else None
         }
     }
 
-async def full_two_way_sync(db: AsyncSession) -> Dict:
+async def full_two_way_sync(db: AsyncSession, audit: bool = False, dry_run: bool = False) -> Dict:
     """
     Perform a complete two-way sync between HomeBase and iCloud.
     This ensures both systems are in sync with no duplicates.
+    A routine run compares the events in the sync window; an audit run compares all of them.
+    With dry_run nothing is written, sent or committed: the result lists the
+    queued outbox operations and the import and export plans (details.*.plan).
     """
-    logger.info("Starting full two-way sync...")
+    logger.info("Starting full two-way sync..." if not audit else "Starting two-way sync audit...")
     
+    # One context for both phases: one feed download, one load of the local events
+    ctx = SyncContext(db, audit=audit, dry_run=dry_run)
+
+    # Step 0: Deliver queued dashboard writes first, so both phases see them in iCloud
+    with ctx.phase("outbox"):
+        if dry_run:
+            ctx.plans["outbox"] = await outbox_plan(db)
+            outbox_result = {"details": {"plan": ctx.plans["outbox"].report()}}
+        else:
+            outbox_result = await deliver_outbox(db)
+
     # Step 1: Sync from iCloud to HomeBase (import)
-    import_result = await sync_icloud_to_homebase(db)
-    if import_result["status"] == "error":
+    import_result = await sync_icloud_to_homebase(db, ctx=ctx, dry_run=dry_run)
+    if import_result["status"] != "success":
         return import_result
     
     # Step 2: Sync from HomeBase to iCloud (export)
-    export_result = await sync_homebase_to_icloud(db)
-    if export_result["status"] == "error":
+    export_result = await sync_homebase_to_icloud(db, ctx=ctx, dry_run=dry_run)
+    if export_result["status"] != "success":
         return export_result
+
+    details = {
+        "outbox": outbox_result["details"],
+        "import": import_result["details"],
+        "export": export_result["details"],
+        "writes": dict(ctx.writes),
+        "timings": dict(ctx.timings)
+    }
+    if dry_run:
+        planned = sum(len(plan) for plan in ctx.plans.values())
+        return {
+            "status": "success",
+            "message": f"Dry run: {planned} changes planned",
+            "details": dict(details, dry_run=True)
+        }
     
     # Update calendar last_synced timestamp
-    result = await db.execute(select(CalendarModel).where(CalendarModel.name == "HomeBase"))
-    calendar = result.scalar_one_or_none()
+    calendar = await ctx.calendar_row()
     if calendar:
         calendar.last_synced = datetime.utcnow()
         db.add(calendar)
@@ -395,55 +1147,71 @@ async def full_two_way_sync(db: AsyncSession) -> Dict:
     return {
         "status": "success",
         "message": "Full two-way sync completed successfully",
-        "details": {
-            "import": import_result["details"],
-            "export": export_result["details"]
-        }
+        "details": details
     }
 
-async def delete_event_from_icloud(uid: str, start_time) -> bool:
+async def audit_two_way_sync(db: AsyncSession) -> Dict:
+    """Two-way sync of every event, outside the sync window too (see sync_window)."""
+    return await full_two_way_sync(db, audit=True)
+
+async def delete_icloud_event(calendar, uid: str, href: Optional[str] = None) -> bool:
+    """
+    Delete the iCloud resource holding uid: href if it is given and still there,
+    otherwise whatever a UID calendar-query finds. Returns False if there was none.
+    """
+    if href and await delete_resource(calendar, href):
+        return True
+    # Index miss or stale href: find the resource by UID
+    deleted = False
+    for found_href, _etag, ical_text in await calendar_query_uid(calendar.http, calendar.url, uid):
+        try:
+            if uid in resource_uids(ical_text) and await delete_resource(calendar, found_href):
+                deleted = True
+        except (AuthorizationError, NotFoundError):
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to parse or delete event: {e}")
+    return deleted
+
+async def delete_event_from_icloud(uid: str, start_time=None, href: Optional[str] = None) -> bool:
     """
-    Delete an event from iCloud HomeBase calendar by UID and start_time.
+    Delete an event from iCloud HomeBase calendar.
     This is used to ensure iCloud is the canonical source: events are deleted from iCloud first, then the local DB is synced from iCloud.
+    The resource is addressed directly by its stored href; without one (or if it is stale)
+    it is looked up with a UID calendar-query. start_time is only used for logging.
     Returns True if deleted, False if not found or error.
     """
     try:
-        client = caldav.DAVClient(
-            url=settings.caldav_url,
-            username=settings.icloud_username,
-            password=settings.icloud_password
-        )
-        principal = client.principal()
-        caldav_calendars = [c for c in principal.calendars() if c.name == "HomeBase"]
-        if not caldav_calendars:
-            logger.error("HomeBase calendar not found on iCloud")
-            return False
-        calendar = caldav_calendars[0]
-        # Find the event by UID and DTSTART
-        for event in calendar.events():
-            try:
-                ical = event.icalendar_component
-                event_uid = str(ical.get('uid', ''))
-                event_start = ical.get('dtstart')
-                if event_uid == uid and event_start and getattr(event_start, 'dt', None) == start_time:
-                    event.delete()
-                    logger.info(f"Deleted event from iCloud: {uid} {start_time}")
-                    return True
-            except Exception as e:
-                logger.warning(f"Failed to parse or delete event: {e}")
-        logger.warning(f"Event not found in iCloud for deletion: {uid} {start_time}")
+        deleted = await caldav_session.run(lambda calendar: delete_icloud_event(calendar, uid, href))
+        if deleted:
+            logger.info(f"Deleted event from iCloud: {uid} {start_time}")
+        else:
+            logger.warning(f"Event not found in iCloud for deletion: {uid} {start_time}")
+        return deleted
+    except CalendarNotFound:
+        logger.error("HomeBase calendar not found on iCloud")
         return False
     except Exception as e:
         logger.error(f"Error deleting event from iCloud: {e}")
         return False
 
-async def smart_two_way_sync(db: AsyncSession) -> Dict:
+async def smart_two_way_sync(db: AsyncSession, ctx: Optional[SyncContext] = None) -> Dict:
     """
     Smart two-way sync: Pull from iCloud, compare to local, push only truly new local events to iCloud, and update local DB to match iCloud.
     """
     logger.info("Starting smart two-way sync...")
-    icloud_events = await fetch_icloud_events()
-    homebase_events = await get_homebase_events(db)
+    if ctx is None:
+        ctx = SyncContext(db)
+    down = unavailable(ICLOUD_FEED, ICLOUD_CALDAV)
+    if down:
+        return down
+    try:
+        icloud_events = await remote_snapshot(ctx)
+    except CircuitOpen as e:
+        return skipped(e)
+    except Exception as e:
+        return {"status": "error", "message": f"Could not fetch the iCloud feed: {e}"}
+    homebase_events = await ctx.local_events()
 
     # Helper: strong match (title, start date)
     def strong_match(ev1, ev2):
@@ -453,81 +1221,64 @@ async def smart_two_way_sync(db: AsyncSession) -> Dict:
         date2 = str((ev2['start_time'] if isinstance(ev2, dict) else ev2.start_time).date())
         return fuzz.ratio(title1, title2) > 90 and date1 == date2
 
-    # 1. Push new local events to iCloud
-    pushed = 0
-    for uid, local_event in homebase_events.items():
-        # If UID exists in iCloud, skip
-        if uid in icloud_events:
-            continue
-        # If strong match exists in iCloud, skip
-        if any(strong_match(local_event, ic_ev) for ic_ev in icloud_events.values()):
-            continue
-        # Otherwise, push to iCloud
-        try:
-            client = caldav.DAVClient(
-                url=settings.caldav_url,
-                username=settings.icloud_username,
-                password=settings.icloud_password
-            )
-            principal = client.principal()
-            caldav_calendars = [c for c in principal.calendars() if c.name == "HomeBase"]
-            if not caldav_calendars:
-                logger.error("HomeBase calendar not found on iCloud")
-                continue
-            calendar = caldav_calendars[0]
-            new_ievent = iEvent()
-            new_ievent.add('uid', uid)
-            new_ievent.add('summary', local_event.title)
-            new_ievent.add('dtstart', local_event.start_time)
-            new_ievent.add('dtend', local_event.end_time)
-            if local_event.description:
-                new_ievent.add('description', local_event.description)
-            if local_event.location:
-                new_ievent.add('location', vText(local_event.location))
-            new_ical = iCalendar()
-            new_ical.add_component(new_ievent)
-            calendar.save_event(new_ical.to_ical())
-            pushed += 1
-            logger.info(f"Pushed new local event to iCloud: {local_event.title} {local_event.start_time}")
-        except Exception as e:
-            logger.error(f"Failed to push event {uid} to iCloud: {e}")
-
-    # 2. Add new iCloud events to local DB
-    # Fetch HomeBase calendar once
-    result = await db.execute(select(CalendarModel).where(CalendarModel.name == "HomeBase"))
-    calendar = result.scalar_one_or_none()
+    # Fetch HomeBase calendar and categories once
+    calendar = await ctx.calendar_row()
     if not calendar:
         raise Exception("HomeBase calendar not found in DB")
-    added = 0
-    for uid, ic_event in icloud_events.items():
-        if uid in homebase_events:
-            continue
-        if any(strong_match(ic_event, ev) for ev in homebase_events.values()):
-            continue
+    categories = await ctx.categories()
+
+    plan = SyncPlan()
+    with ctx.phase("smart.plan"):
+        # 1. New local events go to iCloud
+        held = await pending_uids(db)
+        for uid, local_event in homebase_events.items():
+            # If UID exists in iCloud, skip
+            if uid in icloud_events:
+                continue
+            # Waiting in the outbox, which delivers it
+            if uid in held:
+                continue
+            # Overrides of a recurring series only come from iCloud
+            if local_event.series_uid:
+                continue
+            # Had been in iCloud, so it was deleted there
+            if had_icloud_copy(local_event):
+                continue
+            # If strong match exists in iCloud, skip
+            if any(strong_match(local_event, ic_ev) for ic_ev in icloud_events.values()):
+                continue
+            plan.remote_puts.append(RemoteChange(uid, "missing in iCloud", CREATE, local_event))
+
+        # 2. New iCloud events come to the local DB, unless they were deleted here or
+        # the feed still lists them after a delete
+        synced_at = datetime.utcnow()
+        new = [uid for uid in icloud_events if uid not in homebase_events]
+        dead = await tombstones.tombstoned(db, new)
+        for uid in new:
+            ic_event = icloud_events[uid]
+            if uid in dead:
+                continue
+            if any(strong_match(ic_event, ev) for ev in homebase_events.values()):
+                continue
+            category = categories.match(ic_event['title'], ic_event['description'])
+            row = icloud_row(ic_event, calendar.id, category.id if category else None, synced_at)
+            plan.local_inserts.append(LocalChange(uid, "new in iCloud", row))
+    ctx.plans["smart"] = plan
+
+    push_results = []
+    with ctx.phase("smart.apply_remote"):
         try:
-            # Find matching category
-            result = await db.execute(select(Category))
-            categories = result.scalars().all()
-            category = find_matching_category(ic_event['title'], ic_event['description'], categories)
-            new_event = Event(
-                uid=uid,
-                title=ic_event['title'],
-                description=ic_event['description'],
-                location=ic_event['location'],
-                start_time=ic_event['start_time'],
-                end_time=ic_event['end_time'],
-                calendar_id=calendar.id,  # <-- Set the correct calendar_id
-                category_id=category.id if category else None,
-                synced_at=datetime.utcnow()
-            )
-            db.add(new_event)
-            added += 1
-            logger.info(f"Added new iCloud event to local DB: {ic_event['title']} {ic_event['start_time']}")
+            push_results, _executor = await apply_remote_plan(db, ctx, plan)
         except Exception as e:
-            logger.error(f"Failed to add iCloud event {uid} to local DB: {e}")
+            logger.error(f"Failed to push events to iCloud: {e}")
+    pushed = sum(1 for r in push_results if r.ok)
+
+    with ctx.phase("smart.apply_local"):
+        added = (await apply_local_plan(db, ctx, plan))["added"]
     await db.commit()
     return {
         "status": "success",
         "message": f"Smart two-way sync complete. Pushed {pushed} new local events to iCloud, added {added} new iCloud events to local DB.",
-        "details": {"pushed": pushed, "added": added}
+        "details": {"pushed": pushed, "added": added, "push_items": [r.summary() for r in push_results],
+                    "plan": plan.counts(), "writes": dict(ctx.writes), "timings": dict(ctx.timings)}
     } 
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+Conditional fetching of the published iCloud (webcal) feed: ETag / Last-Modified
+validators and a digest of the body, stored per consumer on the Calendar row.
+"""
+
+import hashlib
+import httpx
+import re
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Optional
+
+from app.services.resilience import ICLOUD_FEED
+
+# DTSTAMP is regenerated on every request by some servers, so it is left out of the digest
+_DTSTAMP_LINE = re.compile(rb'^DTSTAMP[;:].*\r?\n', re.MULTILINE)
+
+
+@dataclass
+class FeedResponse:
+    unchanged: bool
+    text: Optional[str] = None
+    validators: Dict[str, Optional[str]] = field(default_factory=dict)
+
+
+def webcal_to_https(url: str) -> str:
+    """Convert a webcal:// URL to https://"""
+    if url.startswith('webcal://'):
+        return url.replace('webcal://', 'https://', 1)
+    return url
+
+
+def feed_digest(body: bytes) -> str:
+    return hashlib.sha256(_DTSTAMP_LINE.sub(b'', body)).hexdigest()
+
+
+class FeedDigest:
+    """feed_digest() computed over a body that arrives in chunks."""
+
+    def __init__(self):
+        self._hash = hashlib.sha256()
+        self._partial = b''
+
+    def update(self, chunk: bytes):
+        lines = (self._partial + chunk).split(b'\n')
+        self._partial = lines.pop()
+        for line in lines:
+            if not (line.startswith(b'DTSTAMP:') or line.startswith(b'DTSTAMP;')):
+                self._hash.update(line + b'\n')
+
+    def hexdigest(self) -> str:
+        # A last line without a newline is hashed as-is, like feed_digest() does
+        final = self._hash.copy()
+        final.update(self._partial)
+        return final.hexdigest()
+
+
+def get_feed_validators(calendar_row, consumer: str) -> Optional[Dict[str, Optional[str]]]:
+    """Validators stored for one consumer of the feed, or None if it never fetched it."""
+    state = calendar_row.feed_state or {}
+    return state.get(consumer)
+
+
+def set_feed_validators(calendar_row, consumer: str, validators: Dict[str, Optional[str]]):
+    # Assign a new dict so SQLAlchemy notices the JSON column changed
+    state = dict(calendar_row.feed_state or {})
+    state[consumer] = validators
+    calendar_row.feed_state = state
+
+
+class FeedStream:
+    """
+    An open feed response. not_modified is known up front (304); unchanged only
+    once iter_bytes() has been consumed and the digest compared.
+    """
+
+    def __init__(self, response: Optional[httpx.Response], previous: Optional[Dict[str, Optional[str]]]):
+        self._response = response
+        self._previous = previous
+        self._digest = FeedDigest()
+        self.not_modified = response is None
+        self.encoding = None if self.not_modified else response.encoding
+        if self.not_modified:
+            self.validators = previous
+        else:
+            self.validators = {
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified'),
+                'digest': None,
+            }
+
+    async def iter_bytes(self) -> AsyncIterator[bytes]:
+        if self.not_modified:
+            return
+        async for chunk in self._response.aiter_bytes():
+            self._digest.update(chunk)
+            yield chunk
+        self.validators['digest'] = self._digest.hexdigest()
+
+    @property
+    def unchanged(self) -> bool:
+        if self.not_modified:
+            return True
+        digest = self.validators['digest']
+        return digest is not None and bool(self._previous) and self._previous.get('digest') == digest
+
+
+def _conditional_headers(previous: Optional[Dict[str, Optional[str]]]) -> Dict[str, str]:
+    headers = {}
+    if previous:
+        if previous.get('etag'):
+            headers['If-None-Match'] = previous['etag']
+        if previous.get('last_modified'):
+            headers['If-Modified-Since'] = previous['last_modified']
+    return headers
+
+
+@asynccontextmanager
+async def open_feed(url: str, previous: Optional[Dict[str, Optional[str]]] = None) -> AsyncIterator[FeedStream]:
+    """
+    Streaming GET of the feed, conditional on previous validators like fetch_feed().
+    Raises httpx errors like a plain GET would, and CircuitOpen while the feed is
+    known to be down.
+    """
+    async with ICLOUD_FEED.client() as client:
+        async with client.stream('GET', webcal_to_https(url), headers=_conditional_headers(previous)) as response:
+            if response.status_code == 304 and previous:
+                yield FeedStream(None, previous)
+                return
+            response.raise_for_status()
+            yield FeedStream(response, previous)
+
+
+async def fetch_feed(url: str, previous: Optional[Dict[str, Optional[str]]] = None) -> FeedResponse:
+    """
+    GET the feed, sending If-None-Match / If-Modified-Since from previous validators.
+    Raises httpx errors like a plain GET would.
+    """
+    async with open_feed(url, previous) as feed:
+        body = b''.join([chunk async for chunk in feed.iter_bytes()])
+    if feed.unchanged:
+        return FeedResponse(unchanged=True, validators=feed.validators)
+    return FeedResponse(unchanged=False, text=body.decode(feed.encoding or 'utf-8', errors='replace'), validators=feed.validators)
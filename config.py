@@ -18,12 +18,48 @@ class Settings(BaseSettings):
     
     # Calendar sync settings
     sync_interval_minutes: int = 15
-    max_sync_retries: int = 3
+    max_sync_retries: int = 3  # Attempts per failed request, throttled PUT/DELETE, and outbox operation iCloud rejects
+    scheduler_enabled: bool = True  # Run syncs in-process instead of on page load
+    hockey_sync_interval_minutes: int = 360
+    cleanup_interval_hours: int = 24
+    sync_jitter_seconds: int = 30  # Random delay added to each scheduled run
+    adaptive_sync_enabled: bool = True  # Stretch the sync intervals when idle, shorten them when busy
+    sync_interval_min_minutes: int = 5  # Bounds for the adaptive iCloud sync interval
+    sync_interval_max_minutes: int = 120
+    hockey_sync_interval_min_minutes: int = 30  # Bounds for the adaptive hockey sync interval
+    hockey_sync_interval_max_minutes: int = 1440
+    sync_idle_runs: int = 3  # Unchanged runs in a row before an interval starts to grow
+    sync_soon_hours: float = 3  # Sync at the floor interval while an event starts within this
+    sync_job_timeout_seconds: int = 300  # A scheduled job running longer is cancelled
     
     # CalDAV (iCloud) credentials for upward sync
     caldav_url: str = "https://caldav.icloud.com"
     icloud_username: Optional[str] = None  # Apple ID (typically email)
     icloud_password: Optional[str] = None  # App-specific password
+    icloud_incremental_sync: bool = True  # Pull only changes via CalDAV sync tokens when possible
+    icloud_push_concurrency: int = 8  # Upper bound on parallel PUT/DELETE requests during export
+    icloud_push_target_latency: float = 2.0  # Seconds; slower responses make the export back off
+    sync_window_enabled: bool = True  # Routine syncs only compare events near today (see sync_window)
+    sync_window_past_days: int = 30
+    sync_window_future_days: int = 400
+    sync_audit_interval_hours: int = 24  # Full comparison of all events, outside the window too
+    outbox_retry_seconds: int = 30  # First retry of a failed iCloud delivery; doubles per attempt
+    outbox_max_backoff_seconds: int = 3600  # Longest wait between delivery attempts
+    tombstone_retention_days: int = 30  # How long deleted events are remembered (see services/tombstones)
+    feed_lag_minutes: int = 60  # The published feed can trail CalDAV by this much; newer rows aren't taken for deleted
+    connect_timeout_seconds: float = 10.0  # Connecting to any upstream (iCloud, hockey site)
+    caldav_timeout_seconds: float = 30.0  # Per read/write on the iCloud CalDAV API
+    feed_timeout_seconds: float = 60.0  # Per read of the published iCloud feed
+    hockey_timeout_seconds: float = 10.0  # Per read of the hockey schedule page
+    retry_backoff_seconds: float = 1.0  # Jittered, doubling delay between retries of a failed request
+    max_retry_after_seconds: float = 30.0  # A longer Retry-After on a 503 is left to the caller instead of retried
+    circuit_failure_threshold: int = 5  # Failed requests in a row before an upstream is skipped
+    circuit_reset_seconds: int = 300  # How long an upstream is skipped before it is tried again
+    sync_chunk_size: int = 500  # Events compared and written per batch when reconciling
+    parse_cache_size: int = 5000  # Parsed iCloud events kept, keyed by their raw VEVENT text
+    parse_cache_path: Optional[str] = None  # SQLite file to keep the parse cache across restarts
+    parse_workers: int = 0  # Processes for parsing large feeds; 0 = one per CPU core
+    parallel_parse_threshold: int = 2000  # VEVENTs in a feed before parsing moves to worker processes
     icloud_calendar_url: str = "webcal://p43-caldav.icloud.com/published/2/Mzk5NDQ4NDUzOTk0NDg0NYieABKiuSspjU8oqXOZnTvGWNwhKf6cpBl8WkUQZDQhqNWjzFxzS5-0BzlIZ9P1IXQtpDvRv0Xgs5PLYMQbjLc"
     
     # Weather API settings (Phase 2)
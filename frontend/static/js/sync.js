@@ -2,29 +2,45 @@
 // Handles the Sync Now button and calls the backend sync API
 
 document.addEventListener('DOMContentLoaded', async () => {
-    // Auto-sync from iCloud on every page load using the new two-way sync
+    // Syncs run on the server's schedule; page loads only read the last result
     const syncStatus = document.getElementById('sync-status');
-    if (syncStatus) syncStatus.textContent = 'Syncing from iCloud...';
+    const lastSync = document.getElementById('last-sync');
     try {
-        const response = await fetch('/api/calendar/sync-two-way', { method: 'POST' });
-        const result = await response.json();
-        if (response.ok) {
+        const response = await fetch('/api/calendar/sync-status');
+        const status = await response.json();
+        if (!response.ok) {
+            throw new Error(status.detail || 'Could not read sync status');
+        }
+        if (!status.scheduler.enabled) {
+            // Scheduler turned off (SCHEDULER_ENABLED=false): fall back to syncing on load
+            if (syncStatus) syncStatus.textContent = 'Syncing from iCloud...';
+            // Tabs opened together share one sync; a sync from the last minute is reused
+            const syncResponse = await fetch('/api/calendar/sync-two-way?max_age=60', { method: 'POST' });
+            const result = await syncResponse.json();
+            if (!syncResponse.ok) {
+                throw new Error(result.detail || 'Sync failed');
+            }
             if (syncStatus) syncStatus.textContent = result.message || 'Sync successful!';
         } else {
-            throw new Error(result.detail || 'Sync failed');
+            const job = status.scheduler.jobs.icloud_sync || {};
+            if (syncStatus) syncStatus.textContent = job.message || 'Sync scheduled';
+        }
+        if (lastSync && status.last_synced) {
+            // Stored as naive UTC
+            const stamp = /[Z+]/.test(status.last_synced.slice(10)) ? status.last_synced : status.last_synced + 'Z';
+            lastSync.textContent = `Last synced ${new Date(stamp).toLocaleTimeString()}`;
         }
     } catch (error) {
-        console.error('Auto-sync failed:', error);
+        console.error('Sync status failed:', error);
         if (syncStatus) syncStatus.textContent = `Error: ${error.message}`;
     }
-    // After sync, refresh events if available
+    // Render events from the local database
     if (window.fetchAndRenderEvents) {
         window.fetchAndRenderEvents();
     }
 
     const syncNowBtn = document.getElementById('sync-now-btn');
     const syncUpBtn = document.getElementById('sync-up-btn');
-    const lastSync = document.getElementById('last-sync');
 
     if (syncNowBtn) {
         syncNowBtn.addEventListener('click', async () => {
@@ -1,10 +1,8 @@
 import asyncio
-from app.utils.database import engine, Base
-from app.models import calendar, events, sync_logs, __init__
+from app.utils.database import init_db
 
 async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await init_db()
     print("Database tables created successfully.")
 
 if __name__ == "__main__":
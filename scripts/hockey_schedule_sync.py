@@ -6,7 +6,8 @@ Handles additions, updates, and deletions
 """
 
 import asyncio
-import requests
+import os
+import sys
 from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import pytz
@@ -14,6 +15,10 @@ import pytz
 # Imports will be handled inside the async functions
 import logging
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.resilience import HOCKEY
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,7 +36,9 @@ def parse_hockey_schedule():
     """Scrape and parse the hockey schedule from the website"""
     try:
         logger.info("Fetching hockey schedule from website...")
-        response = requests.get(HOCKEY_SCHEDULE_URL, timeout=10)
+        # Timed out, retried and skipped while the site is down by the HOCKEY upstream
+        with HOCKEY.sync_client(follow_redirects=True) as client:
+            response = client.get(HOCKEY_SCHEDULE_URL)
         response.raise_for_status()
         
         soup = BeautifulSoup(response.content, 'html.parser')
@@ -139,7 +146,8 @@ async def sync_hockey_events():
     """Sync hockey events to the HomeBase calendar with full comparison"""
     try:
         # Get hockey events from website
-        hockey_events = parse_hockey_schedule()
+        # The scrape blocks (and may sleep between retries): keep it off the event loop
+        hockey_events = await asyncio.to_thread(parse_hockey_schedule)
         if not hockey_events:
             logger.warning("No hockey events found to sync")
             return
@@ -157,12 +165,14 @@ async def sync_hockey_events():
             if not calendar:
                 logger.error("HomeBase calendar not found")
                 return
+            calendar_id = calendar.id
             
             # Get Nico category ID first
             from app.models.events import Category
             category_query = select(Category).where(Category.name == "Nico")
             category_result = await db.execute(category_query)
             nico_category = category_result.scalar_one_or_none()
+            nico_category_id = nico_category.id if nico_category else None
             
             if not nico_category:
                 # Create Nico category if it doesn't exist
@@ -174,81 +184,42 @@ async def sync_hockey_events():
                         color=nico_config["color"]
                     )
                     db.add(nico_category)
+                    await db.flush()
+                    nico_category_id = nico_category.id
                     await db.commit()
                     logger.info("Created Nico category")
                 else:
                     logger.warning("Could not create Nico category, events will not be highlighted")
                     nico_category = None
             
-            # Get existing hockey events
-            existing_events = await get_existing_hockey_events(db)
-            
-            # Create sets for comparison
-            website_uids = {event['uid'] for event in hockey_events}
-            db_uids = {event.uid for event in existing_events}
-            
-            # Find events to add, update, and delete
-            events_to_add = [event for event in hockey_events if event['uid'] not in db_uids]
-            events_to_delete = [event for event in existing_events if event.uid not in website_uids]
-            
-            # Find events that might need updates
-            events_to_update = []
-            for website_event in hockey_events:
-                if website_event['uid'] in db_uids:
-                    # Find the corresponding database event
-                    db_event = next((e for e in existing_events if e.uid == website_event['uid']), None)
-                    if db_event:
-                        # Check if any fields need updating
-                        if (db_event.title != website_event['title'] or
-                            db_event.start_time != website_event['start_time'] or
-                            db_event.end_time != website_event['end_time'] or
-                            db_event.location != website_event['location'] or
-                            db_event.description != website_event['description'] or
-                            db_event.user != website_event['user']):
-                            events_to_update.append((db_event, website_event))
-            
-            # Process deletions
-            deleted_count = 0
-            for event in events_to_delete:
-                await db.delete(event)
-                deleted_count += 1
-                logger.info(f"Deleted hockey event: {event.title}")
-            
-            # Process updates
-            updated_count = 0
-            for db_event, website_event in events_to_update:
-                db_event.title = website_event['title']
-                db_event.start_time = website_event['start_time']
-                db_event.end_time = website_event['end_time']
-                db_event.location = website_event['location']
-                db_event.description = website_event['description']
-                db_event.user = website_event['user']
-                # Ensure hockey events are assigned to Nico category
-                if nico_category and not db_event.category_id:
-                    db_event.category_id = nico_category.id
-                db_event.updated_at = datetime.utcnow()
-                updated_count += 1
-                logger.info(f"Updated hockey event: {website_event['title']}")
-            
-            # Process additions
-            added_count = 0
-            for event_data in events_to_add:
-                new_event = Event(
-                    uid=event_data['uid'],
-                    title=event_data['title'],
-                    start_time=event_data['start_time'],
-                    end_time=event_data['end_time'],
-                    location=event_data['location'],
-                    description=event_data['description'],
-                    user=event_data['user'],
-                    calendar_id=calendar.id,
-                    category_id=nico_category.id if nico_category else None,
-                    synced_at=datetime.utcnow()
-                )
-                
-                db.add(new_event)
-                added_count += 1
-                logger.info(f"Added hockey event for {event_data['user']}: {event_data['title']}")
+            # Reconcile the scraped schedule in a few set-based statements
+            from sqlalchemy import and_, func
+            from app.services.reconciler import reconcile
+            hockey_scope = and_(Event.calendar_id == calendar_id, Event.uid.like("hockey_%"))
+            total_db_events = await db.scalar(select(func.count()).select_from(Event).where(hockey_scope))
+            
+            synced_at = datetime.utcnow()
+            rows = [
+                {
+                    'uid': event_data['uid'],
+                    'title': event_data['title'],
+                    'start_time': event_data['start_time'],
+                    'end_time': event_data['end_time'],
+                    'location': event_data['location'],
+                    'description': event_data['description'],
+                    'user': event_data['user'],
+                    'calendar_id': calendar_id,
+                    'category_id': nico_category_id,
+                    'synced_at': synced_at
+                }
+                for event_data in hockey_events
+            ]
+            # Games gone from the website are deleted; a category already set on a
+            # game is kept, otherwise it is assigned to the Nico category
+            reconciled = await reconcile(db, rows, scope=hockey_scope, keep_existing=("category_id",))
+            added_count = reconciled.added
+            updated_count = reconciled.updated
+            deleted_count = reconciled.deleted
             
             await db.commit()
             
@@ -263,7 +234,7 @@ async def sync_hockey_events():
                 "updated": updated_count,
                 "deleted": deleted_count,
                 "total_website_events": len(hockey_events),
-                "total_db_events": len(existing_events),
+                "total_db_events": total_db_events,
                 "user": HOCKEY_USER
             }
             
@@ -5,7 +5,6 @@ Script to import events from a specific iCloud calendar into the HomeBase databa
 
 import asyncio
 import httpx
-from icalendar import Calendar
 from datetime import datetime, timezone, time, date
 import pytz
 import sys
@@ -15,6 +14,8 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.utils.database import get_db
+from app.services.ics_stream import stream_components
+from app.services.parallel_parse import parse_event_records
 from app.models.events import Event
 from app.models.calendar import Calendar as CalendarModel
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -23,39 +24,29 @@ from sqlalchemy.future import select
 # Calendar URL to import from
 CALENDAR_URL = "https://p161-caldav.icloud.com/published/2/MTc0Njc1NDk5MTc0Njc1NECXAE2K05ddTmhrame5rQ1DuqpPOakb6jR3hBiEdBEIzsGLQLoDoM50OJRoLnQhyqUrsQ2RPtA1BeSH4E5mKmk"
 
-async def fetch_calendar_events(url: str):
-    """Fetch calendar data from the given URL."""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/calendar, text/plain, */*',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Cache-Control': 'no-cache'
-        }
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, headers=headers)
+async def fetch_calendar_records(url: str):
+    """
+    Download the calendar at the given URL and parse its VEVENTs into event
+    records (across worker processes for large calendars).
+    """
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'text/calendar, text/plain, */*',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Cache-Control': 'no-cache'
+    }
+    
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        async with client.stream('GET', url, headers=headers) as response:
             response.raise_for_status()
-            return response.text
-    except Exception as e:
-        print(f"Error fetching calendar: {e}")
-        return None
+            components = [component async for component in stream_components(response.aiter_bytes())]
+    return await parse_event_records(components)
 
 async def import_events_from_calendar():
     """Import events from the specified calendar into the database."""
     print("🔄 Starting calendar import...")
     print(f"📅 Source: {CALENDAR_URL}")
     
-    # Fetch calendar data
-    print("📡 Fetching calendar data...")
-    ical_data = await fetch_calendar_events(CALENDAR_URL)
-    if not ical_data:
-        print("❌ Failed to fetch calendar data")
-        return
-    
-    # Parse calendar
-    cal = Calendar.from_ical(ical_data)
-    
     # Get database session
     async for db in get_db():
         try:
@@ -75,68 +66,74 @@ async def import_events_from_calendar():
             
             print(f"📋 Target calendar: {target_calendar.name} (ID: {target_calendar.id})")
             
-            # Process events
+            # Fetch and parse calendar data
+            print("📡 Fetching calendar data...")
+            records = await fetch_calendar_records(CALENDAR_URL)
             events_added = 0
             events_skipped = 0
             
-            for component in cal.walk():
-                if component.name == "VEVENT":
-                    uid = str(component.get('uid'))
-                    
-                    # Check if event already exists
-                    result = await db.execute(select(Event).filter(Event.uid == uid))
-                    existing_event = result.scalar_one_or_none()
-                    
-                    if existing_event:
-                        print(f"⏭️  Skipping existing event: {component.get('summary', 'Unknown')}")
-                        events_skipped += 1
-                        continue
-                    
-                    # Extract event data
-                    start_time = component.get('dtstart').dt if component.get('dtstart') else None
-                    end_time = component.get('dtend').dt if component.get('dtend') else None
-                    
-                    if not start_time or not end_time:
-                        print(f"⚠️  Skipping event without start/end time: {component.get('summary', 'Unknown')}")
-                        events_skipped += 1
-                        continue
-                    
-                    # Ensure datetime objects are timezone-aware and convert date to datetime
-                    def to_utc_datetime(dt):
-                        if isinstance(dt, datetime):
-                            if dt.tzinfo is None:
-                                return pytz.utc.localize(dt)
-                            return dt.astimezone(timezone.utc)
-                        elif isinstance(dt, date):
-                            # Convert date to datetime at midnight UTC
-                            return datetime.combine(dt, time.min, tzinfo=timezone.utc)
-                        return None
-                    start_time = to_utc_datetime(start_time)
-                    end_time = to_utc_datetime(end_time)
-                    
-                    # Only import future events
-                    now = datetime.now(timezone.utc)
-                    if not end_time or end_time <= now:
-                        print(f"⏭️  Skipping past event: {component.get('summary', 'Unknown')} (ended {end_time})")
-                        events_skipped += 1
-                        continue
-                    
-                    # Create new event
-                    new_event = Event(
-                        uid=uid,
-                        title=str(component.get('summary', 'Untitled Event')),
-                        start_time=start_time,
-                        end_time=end_time,
-                        description=str(component.get('description', '')),
-                        location=str(component.get('location', '')),
-                        calendar_id=target_calendar.id,
-                        synced_at=datetime.utcnow()
-                    )
-                    
-                    db.add(new_event)
-                    events_added += 1
-                    print(f"✅ Added: {new_event.title} ({start_time.strftime('%Y-%m-%d %H:%M')})")
-            
+            for record in records:
+                uid = record['uid']
+                
+                # Check if event already exists
+                result = await db.execute(select(Event).filter(Event.uid == uid))
+                existing_event = result.scalar_one_or_none()
+                
+                if existing_event:
+                    print(f"⏭️  Skipping existing event: {record['title'] or 'Unknown'}")
+                    events_skipped += 1
+                    continue
+                
+                # Extract event data
+                start_time = record['start_time']
+                end_time = record['end_time']
+                
+                if not start_time or not end_time:
+                    print(f"⚠️  Skipping event without start/end time: {record['title'] or 'Unknown'}")
+                    events_skipped += 1
+                    continue
+                
+                # Ensure datetime objects are timezone-aware and convert date to datetime
+                def to_utc_datetime(dt):
+                    if isinstance(dt, datetime):
+                        if dt.tzinfo is None:
+                            return pytz.utc.localize(dt)
+                        return dt.astimezone(timezone.utc)
+                    elif isinstance(dt, date):
+                        # Convert date to datetime at midnight UTC
+                        return datetime.combine(dt, time.min, tzinfo=timezone.utc)
+                    return None
+                start_time = to_utc_datetime(start_time)
+                end_time = to_utc_datetime(end_time)
+                
+                # Only import future events
+                now = datetime.now(timezone.utc)
+                # A recurring series is kept whole (expanded when read)
+                if not record['rrule'] and (not end_time or end_time <= now):
+                    print(f"⏭️  Skipping past event: {record['title'] or 'Unknown'} (ended {end_time})")
+                    events_skipped += 1
+                    continue
+                
+                # Create new event
+                new_event = Event(
+                    uid=uid,
+                    title=record['title'] or 'Untitled Event',
+                    start_time=start_time,
+                    end_time=end_time,
+                    description=record['description'],
+                    location=record['location'],
+                    rrule=record['rrule'],
+                    exdates=record['exdates'],
+                    recurrence_id=record['recurrence_id'],
+                    series_uid=record['series_uid'],
+                    calendar_id=target_calendar.id,
+                    synced_at=datetime.utcnow()
+                )
+                
+                db.add(new_event)
+                events_added += 1
+                print(f"✅ Added: {new_event.title} ({start_time.strftime('%Y-%m-%d %H:%M')})")
+        
             # Commit all changes
             await db.commit()
             
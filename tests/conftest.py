@@ -0,0 +1,72 @@
+"""
+Shared helpers for the test scripts: httpx clients answered by a handler instead
+of the network, and throwaway in-memory databases.
+Test scripts import them directly (from conftest import ...), so they also run without pytest.
+"""
+
+import sys
+import os
+from contextlib import asynccontextmanager, contextmanager
+from unittest.mock import patch
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.resilience import ICLOUD_FEED
+from app.utils.database import Base
+
+
+def mock_client(handler) -> httpx.AsyncClient:
+    """An httpx client whose requests are answered by handler(request)."""
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@contextmanager
+def mock_feed(handler):
+    """
+    Answer the webcal feed download with handler(request). Only the network is
+    replaced: requests still go through ICLOUD_FEED's retries and breaker, which
+    is reset afterwards.
+    """
+    client = ICLOUD_FEED.client
+    with patch.object(ICLOUD_FEED, 'client', lambda **kwargs: client(transport=httpx.MockTransport(handler), **kwargs)):
+        try:
+            yield
+        finally:
+            ICLOUD_FEED.breaker.reset()
+
+
+@asynccontextmanager
+async def memory_db(*rows):
+    """
+    A fresh in-memory SQLite database with every table, holding rows; yields its
+    session factory. Sessions are configured like AsyncSessionLocal: objects
+    expire on commit, so a lazy load after a commit fails here as it would in the app.
+    """
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
+    try:
+        if rows:
+            async with session_factory() as db:
+                db.add_all(rows)
+                await db.commit()
+        yield session_factory
+    finally:
+        await engine.dispose()
+
+
+async def run_steps(session_factory, steps, commit=False):
+    """Run each step(db) in its own session, committing after it if commit; return their results."""
+    results = []
+    for step in steps:
+        async with session_factory() as db:
+            results.append(await step(db))
+            if commit:
+                await db.commit()
+    return results
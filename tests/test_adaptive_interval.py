@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script for the adaptive sync intervals.
+Runs against an in-memory SQLite database; nothing is synced for real.
+"""
+
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.calendar import Calendar
+from app.models.events import Event
+from app.services import sync_scheduler as scheduler_module
+from app.services.adaptive_interval import AdaptiveInterval
+from app.services.sync_scheduler import HOCKEY_EVENTS, SyncScheduler, hockey_changed, two_way_changed
+from conftest import memory_db
+
+
+def minutes(value):
+    return timedelta(minutes=value)
+
+
+def test_idle_runs_back_off():
+    """Unchanged runs stretch the interval up to the ceiling; a change halves it"""
+    interval = AdaptiveInterval(minutes(15), minutes(5), minutes(120), idle_runs=3)
+    grown = [interval.record(False) for _ in range(6)]
+    assert grown == [minutes(15), minutes(15), minutes(30), minutes(60), minutes(120), minutes(120)]
+    # Back below the configured interval at once, then towards the floor
+    assert [interval.record(True) for _ in range(3)] == [minutes(7.5), minutes(5), minutes(5)]
+    assert interval.unchanged_runs == 0
+    print("✅ Idle runs back off, changes tighten")
+
+
+def test_upcoming_events_use_floor():
+    """While an event is about to start the next run comes after the floor"""
+    interval = AdaptiveInterval(minutes(360), minutes(30), minutes(1440), idle_runs=1)
+    interval.record(False)
+    assert interval.next_interval(upcoming=False) == minutes(720)
+    assert interval.next_interval(upcoming=True) == minutes(30)
+    assert interval.report()["interval_minutes"] == 30
+    print("✅ Upcoming events tighten to the floor")
+
+
+def test_changes_read_from_results():
+    """Writes, outbox deliveries and hockey additions count as changes"""
+    assert not two_way_changed({"details": {"writes": {"db": 0, "icloud": 0}, "outbox": {"delivered": 0}}})
+    assert two_way_changed({"details": {"writes": {"db": 2, "icloud": 0}}})
+    assert two_way_changed({"details": {"writes": {}, "outbox": {"delivered": 1}}})
+    assert not hockey_changed({"details": {"added": 0, "updated": 0, "deleted": 0}})
+    assert hockey_changed({"details": {"added": 0, "updated": 1, "deleted": 0}})
+    print("✅ Changes detected from sync results")
+
+
+def test_adapt_checks_upcoming_games():
+    """The hockey job tightens for a game in two hours; the iCloud job ignores it"""
+    now = datetime.now().replace(second=0, microsecond=0)
+
+    async def run():
+        rows = [
+            Calendar(name="HomeBase", url="webcal://example.com"),
+            Event(uid="hockey_game", title="Game", start_time=now + timedelta(hours=2),
+                  end_time=now + timedelta(hours=3), calendar_id=1),
+            Event(uid="dentist", title="Dentist", start_time=now + timedelta(days=2),
+                  end_time=now + timedelta(days=2, hours=1), calendar_id=1),
+        ]
+        scheduler = SyncScheduler()
+        scheduler.adaptive = {
+            "hockey_sync": (AdaptiveInterval(minutes(360), minutes(30), minutes(1440), 3), hockey_changed, HOCKEY_EVENTS),
+            "icloud_sync": (AdaptiveInterval(minutes(15), minutes(5), minutes(120), 3), two_way_changed, ~HOCKEY_EVENTS),
+        }
+        async with memory_db(*rows) as session_factory:
+            with patch.object(scheduler_module, 'AsyncSessionLocal', session_factory):
+                hockey = await scheduler.adapt("hockey_sync", {"details": {"added": 0, "updated": 0, "deleted": 0}})
+                icloud = await scheduler.adapt("icloud_sync", {"details": {"writes": {"db": 0}}})
+        return hockey, icloud, scheduler.snapshot()["jobs"]
+
+    hockey, icloud, jobs = asyncio.run(run())
+    assert hockey == minutes(30) and icloud == minutes(15)
+    assert jobs["hockey_sync"]["adaptive"]["upcoming_events"] is True
+    assert jobs["icloud_sync"]["adaptive"]["unchanged_runs"] == 1
+    print("✅ Upcoming games checked per source")
+
+
+if __name__ == "__main__":
+    test_idle_runs_back_off()
+    test_upcoming_events_use_floor()
+    test_changes_read_from_results()
+    test_adapt_checks_upcoming_games()
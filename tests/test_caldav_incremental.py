@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental CalDAV pull (sync-collection + calendar-multiget).
+Uses an httpx mock transport, so no iCloud credentials are needed.
+"""
+
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import two_way_sync
+from app.services.caldav_client import (
+    CalDAVCalendar,
+    SyncTokenInvalid,
+    caldav_session,
+    calendar_multiget,
+    calendar_query_uid,
+    is_caldav_collection_url,
+    sync_collection,
+)
+from app.services.two_way_sync import fetch_icloud_changes, parse_icloud_events, patch_ical
+
+CALENDAR_URL = "https://p43-caldav.icloud.com/123/calendars/HOMEBASE/"
+
+SYNC_RESPONSE = b"""<?xml version="1.0" encoding="utf-8"?>
+<d:multistatus xmlns:d="DAV:">
+  <d:response>
+    <d:href>/123/calendars/HOMEBASE/event-1.ics</d:href>
+    <d:propstat>
+      <d:prop><d:getetag>"etag-1"</d:getetag></d:prop>
+      <d:status>HTTP/1.1 200 OK</d:status>
+    </d:propstat>
+  </d:response>
+  <d:response>
+    <d:href>/123/calendars/HOMEBASE/gone.ics</d:href>
+    <d:status>HTTP/1.1 404 Not Found</d:status>
+  </d:response>
+  <d:sync-token>https://example.com/sync/2</d:sync-token>
+</d:multistatus>"""
+
+MULTIGET_RESPONSE = b"""<?xml version="1.0" encoding="utf-8"?>
+<d:multistatus xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">
+  <d:response>
+    <d:href>/123/calendars/HOMEBASE/event-1.ics</d:href>
+    <d:propstat>
+      <d:prop>
+        <d:getetag>"etag-1"</d:getetag>
+        <c:calendar-data>BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//test//EN
+BEGIN:VEVENT
+UID:event-1
+SUMMARY:Soccer with Luca
+DTSTART:20250801T150000Z
+DTEND:20250801T160000Z
+END:VEVENT
+END:VCALENDAR
+</c:calendar-data>
+      </d:prop>
+      <d:status>HTTP/1.1 200 OK</d:status>
+    </d:propstat>
+  </d:response>
+</d:multistatus>"""
+
+
+def make_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_sync_collection_delta():
+    """sync-collection returns changed hrefs with etags, deleted hrefs and the new token"""
+    seen_bodies = []
+
+    def handler(request):
+        seen_bodies.append(request.content)
+        assert request.method == "REPORT"
+        assert request.headers["Depth"] == "1"
+        return httpx.Response(207, content=SYNC_RESPONSE)
+
+    async def run():
+        async with make_client(handler) as client:
+            return await sync_collection(client, CALENDAR_URL, "https://example.com/sync/1")
+
+    delta = asyncio.run(run())
+    assert b"https://example.com/sync/1" in seen_bodies[0]
+    assert delta.sync_token == "https://example.com/sync/2"
+    assert delta.changed == {"/123/calendars/HOMEBASE/event-1.ics": '"etag-1"'}
+    assert delta.deleted == ["/123/calendars/HOMEBASE/gone.ics"]
+    print("✅ sync-collection delta parsed")
+
+
+def test_sync_collection_invalid_token():
+    """An expired token surfaces as SyncTokenInvalid so the caller can restart"""
+    def handler(request):
+        return httpx.Response(403, content=b'<d:error xmlns:d="DAV:"><d:valid-sync-token/></d:error>')
+
+    async def run():
+        async with make_client(handler) as client:
+            await sync_collection(client, CALENDAR_URL, "stale")
+
+    try:
+        asyncio.run(run())
+        assert False, "expected SyncTokenInvalid"
+    except SyncTokenInvalid:
+        print("✅ Invalid sync token detected")
+
+
+def test_calendar_multiget():
+    """calendar-multiget returns the calendar data for each requested href"""
+    def handler(request):
+        assert b"event-1.ics" in request.content
+        return httpx.Response(207, content=MULTIGET_RESPONSE)
+
+    async def run():
+        async with make_client(handler) as client:
+            return await calendar_multiget(client, CALENDAR_URL, ["/123/calendars/HOMEBASE/event-1.ics"])
+
+    resources = asyncio.run(run())
+    assert len(resources) == 1
+    href, etag, ical_text = resources[0]
+    assert etag == '"etag-1"'
+    events = parse_icloud_events(ical_text)
+    assert events["event-1"]["title"] == "Soccer with Luca"
+    print("✅ calendar-multiget parsed")
+
+
+def test_parse_failure_keeps_token():
+    """A resource that fails to parse keeps the old sync token, so the next pull reports it again"""
+    broken = MULTIGET_RESPONSE.replace(b"</d:multistatus>", b"""  <d:response>
+    <d:href>/123/calendars/HOMEBASE/broken.ics</d:href>
+    <d:propstat>
+      <d:prop>
+        <d:getetag>"etag-2"</d:getetag>
+        <c:calendar-data>BEGIN:VCALENDAR
+BEGIN:VEVENT
+UID:broken
+DTSTART:not-a-date
+END:VEVENT
+END:VCALENDAR
+</c:calendar-data>
+      </d:prop>
+      <d:status>HTTP/1.1 200 OK</d:status>
+    </d:propstat>
+  </d:response>
+</d:multistatus>""")
+
+    def pull(multiget_response):
+        def handler(request):
+            if b"sync-collection" in request.content:
+                return httpx.Response(207, content=SYNC_RESPONSE)
+            return httpx.Response(207, content=multiget_response)
+
+        calendar = CalDAVCalendar(make_client(handler), CALENDAR_URL)
+        row = SimpleNamespace(sync_token="https://example.com/sync/1")
+        settings = two_way_sync.settings
+        with patch.object(caldav_session, 'get_calendar', AsyncMock(return_value=calendar)), \
+                patch.object(settings, 'icloud_username', "user@example.com"), \
+                patch.object(settings, 'icloud_password', "app-password"):
+            return asyncio.run(fetch_icloud_changes(None, row))
+
+    changes = pull(broken)
+    assert list(changes['events']) == ["event-1"]
+    assert changes['sync_token'] == "https://example.com/sync/1"
+    assert pull(MULTIGET_RESPONSE)['sync_token'] == "https://example.com/sync/2"
+    print("✅ Parse failure keeps the sync token")
+
+
+def test_calendar_query_uid():
+    """An index miss falls back to a UID-filtered calendar-query"""
+    def handler(request):
+        assert b'<c:prop-filter name="UID">' in request.content
+        assert b"event-1" in request.content
+        return httpx.Response(207, content=MULTIGET_RESPONSE)
+
+    async def run():
+        async with make_client(handler) as client:
+            return await calendar_query_uid(client, CALENDAR_URL, "event-1")
+
+    resources = asyncio.run(run())
+    assert [(href, etag) for href, etag, _ in resources] == [("/123/calendars/HOMEBASE/event-1.ics", '"etag-1"')]
+    print("✅ UID calendar-query parsed")
+
+
+def test_collection_url_detection():
+    assert is_caldav_collection_url(CALENDAR_URL)
+    assert not is_caldav_collection_url("webcal://p43-caldav.icloud.com/published/2/abc")
+    assert not is_caldav_collection_url("https://p43-caldav.icloud.com/published/2/abc")
+    print("✅ Collection URL detection")
+
+
+def test_patch_ical_keeps_other_properties():
+    """An update patched onto the current copy keeps alarms and other server-side data"""
+    from datetime import datetime
+    import pytz
+
+    current = (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//test//EN\r\n"
+        "BEGIN:VEVENT\r\nUID:event-1\r\nSUMMARY:Old title\r\n"
+        "DTSTART:20250801T150000Z\r\nDTEND:20250801T160000Z\r\n"
+        "BEGIN:VALARM\r\nACTION:DISPLAY\r\nTRIGGER:-PT15M\r\nEND:VALARM\r\n"
+        "END:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+    patched = patch_ical(
+        current, "Soccer with Luca",
+        datetime(2025, 8, 2, 15, tzinfo=pytz.utc), datetime(2025, 8, 2, 16, tzinfo=pytz.utc),
+        None, "Field 3"
+    ).decode()
+    assert "BEGIN:VALARM" in patched
+    event = parse_icloud_events(patched)["event-1"]
+    assert event["title"] == "Soccer with Luca"
+    assert event["location"] == "Field 3"
+    assert event["start_time"].day == 2
+    print("✅ Patched update keeps alarms")
+
+
+if __name__ == "__main__":
+    test_sync_collection_delta()
+    test_sync_collection_invalid_token()
+    test_calendar_multiget()
+    test_parse_failure_keeps_token()
+    test_calendar_query_uid()
+    test_collection_url_detection()
+    test_patch_ical_keeps_other_properties()
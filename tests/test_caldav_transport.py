@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test script for the async CalDAV transport (discovery, PUT/GET/DELETE with ETags).
+Uses an httpx mock transport, so no iCloud credentials are needed.
+"""
+
+import asyncio
+import sys
+import os
+from unittest.mock import AsyncMock
+
+import httpx
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from caldav.lib.error import AuthorizationError, NotFoundError
+from app.services.caldav_client import (
+    CalDAVCalendar,
+    CalDAVSessionManager,
+    PreconditionFailed,
+    create_resource,
+    delete_resource,
+    discover_calendar_url,
+    get_resource,
+    put_resource,
+)
+
+CALENDAR_URL = "https://p43-caldav.icloud.com/123/calendars/HOMEBASE/"
+
+PRINCIPAL = b"""<?xml version="1.0"?>
+<d:multistatus xmlns:d="DAV:"><d:response><d:href>/</d:href><d:propstat>
+<d:prop><d:current-user-principal><d:href>/123/principal/</d:href></d:current-user-principal></d:prop>
+<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response></d:multistatus>"""
+
+HOME_SET = b"""<?xml version="1.0"?>
+<d:multistatus xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav"><d:response><d:href>/123/principal/</d:href><d:propstat>
+<d:prop><c:calendar-home-set><d:href>https://p43-caldav.icloud.com/123/calendars/</d:href></c:calendar-home-set></d:prop>
+<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response></d:multistatus>"""
+
+HOME_LISTING = b"""<?xml version="1.0"?>
+<d:multistatus xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">
+<d:response><d:href>/123/calendars/</d:href><d:propstat>
+<d:prop><d:resourcetype><d:collection/></d:resourcetype></d:prop>
+<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>
+<d:response><d:href>/123/calendars/WORK/</d:href><d:propstat>
+<d:prop><d:displayname>Work</d:displayname><d:resourcetype><d:collection/><c:calendar/></d:resourcetype></d:prop>
+<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>
+<d:response><d:href>/123/calendars/HOMEBASE/</d:href><d:propstat>
+<d:prop><d:displayname>HomeBase</d:displayname><d:resourcetype><d:collection/><c:calendar/></d:resourcetype></d:prop>
+<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>
+</d:multistatus>"""
+
+
+def make_calendar(handler):
+    return CalDAVCalendar(httpx.AsyncClient(transport=httpx.MockTransport(handler)), CALENDAR_URL)
+
+
+def test_discover_calendar_url():
+    """PROPFIND discovery walks principal -> calendar home -> calendar by display name"""
+    def handler(request):
+        assert request.method == "PROPFIND"
+        if request.url.path == "/":
+            return httpx.Response(207, content=PRINCIPAL)
+        if request.url.path == "/123/principal/":
+            return httpx.Response(207, content=HOME_SET)
+        assert request.headers["Depth"] == "1"
+        return httpx.Response(207, content=HOME_LISTING)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await discover_calendar_url(client, "https://caldav.icloud.com", "HomeBase")
+
+    assert asyncio.run(run()) == CALENDAR_URL
+    print("✅ Calendar discovered via PROPFIND")
+
+
+def test_create_and_conditional_put():
+    """New events are stored as <uid>.ics; updates send If-Match and surface 412"""
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, request.url.path, request.headers.get("If-Match")))
+        if request.headers.get("If-Match") is None:
+            assert request.headers.get("If-None-Match") == "*"
+        if request.headers.get("If-Match") == '"stale"':
+            return httpx.Response(412)
+        return httpx.Response(201, headers={"ETag": '"etag-2"'})
+
+    async def run():
+        calendar = make_calendar(handler)
+        href, etag = await create_resource(calendar, "event 1", b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n")
+        assert href == "/123/calendars/HOMEBASE/event%201.ics"
+        assert etag == '"etag-2"'
+        try:
+            await put_resource(calendar, href, b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n", '"stale"')
+            assert False, "expected PreconditionFailed"
+        except PreconditionFailed:
+            pass
+
+    asyncio.run(run())
+    assert seen[0] == ("PUT", "/123/calendars/HOMEBASE/event 1.ics", None)  # url.path is decoded
+    assert seen[1][2] == '"stale"'
+    print("✅ Create and conditional PUT")
+
+
+def test_create_existing_resource():
+    """A create that finds the resource already there keeps it and returns its ETag"""
+    seen = []
+
+    def handler(request):
+        seen.append(request.method)
+        if request.method == "PUT":
+            return httpx.Response(412)
+        return httpx.Response(200, text="BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n", headers={"ETag": '"stored"'})
+
+    async def run():
+        return await create_resource(make_calendar(handler), "event-1", b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n")
+
+    assert asyncio.run(run()) == ("/123/calendars/HOMEBASE/event-1.ics", '"stored"')
+    assert seen == ["PUT", "GET"]
+    print("✅ Create of an existing resource keeps it")
+
+
+def test_delete_resource():
+    """DELETE returns False when the resource is already gone and raises on 401"""
+    def handler(request):
+        if request.url.path.endswith("gone.ics"):
+            return httpx.Response(404)
+        if request.url.path.endswith("locked.ics"):
+            return httpx.Response(401)
+        return httpx.Response(204)
+
+    async def run():
+        calendar = make_calendar(handler)
+        assert await delete_resource(calendar, "/123/calendars/HOMEBASE/event-1.ics") is True
+        assert await delete_resource(calendar, "/123/calendars/HOMEBASE/gone.ics") is False
+        try:
+            await delete_resource(calendar, "/123/calendars/HOMEBASE/locked.ics")
+            assert False, "expected AuthorizationError"
+        except AuthorizationError:
+            pass
+
+    asyncio.run(run())
+    print("✅ DELETE status handling")
+
+
+def test_rediscover_only_for_collection():
+    """A 404 for one event goes back to the caller; a 404 for the calendar re-discovers it"""
+    calendar = make_calendar(lambda request: httpx.Response(404))
+    session = CalDAVSessionManager()
+
+    async def run(href):
+        session.get_calendar = AsyncMock(return_value=calendar)
+        try:
+            await session.run(lambda calendar: get_resource(calendar, href))
+            assert False, "expected NotFoundError"
+        except NotFoundError:
+            pass
+        return session.get_calendar.await_count
+
+    assert asyncio.run(run("/123/calendars/HOMEBASE/gone.ics")) == 1
+    assert asyncio.run(run(CALENDAR_URL)) == 2
+    print("✅ Re-discovery only for the calendar")
+
+
+if __name__ == "__main__":
+    test_discover_calendar_url()
+    test_create_and_conditional_put()
+    test_create_existing_resource()
+    test_delete_resource()
+    test_rediscover_only_for_collection()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test script for the canonical event field comparison used by both sync directions.
+Uses an in-memory SQLite database for the round-trip check; no iCloud access needed.
+"""
+
+import asyncio
+import sys
+import os
+from datetime import date, datetime, timedelta, timezone
+
+from icalendar import vText
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.calendar import Calendar
+from app.models.event_fields import canonical_fields, fields_differ, fingerprint, storage_time
+from app.models.events import Event
+from app.services.two_way_sync import parse_icloud_events
+from conftest import memory_db
+
+EASTERN = timezone(timedelta(hours=-4))
+
+FEED = """BEGIN:VCALENDAR
+VERSION:2.0
+BEGIN:VEVENT
+UID:evt-1
+SUMMARY:Soccer practice
+DTSTART:20250710T193000Z
+DTEND:20250710T210000Z
+DTSTAMP:20250801T000000Z
+LAST-MODIFIED:20250101T120000Z
+SEQUENCE:2
+END:VEVENT
+BEGIN:VEVENT
+UID:evt-2
+SUMMARY:Holiday
+DTSTART;VALUE=DATE:20250711
+DTEND;VALUE=DATE:20250712
+DTSTAMP:20250801T000000Z
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def icloud_event(**overrides):
+    event = {
+        'uid': 'evt-1',
+        'title': vText('Soccer practice'),
+        'description': '',
+        'location': vText('Field 2'),
+        'start_time': datetime(2025, 7, 10, 15, 30, tzinfo=EASTERN),
+        'end_time': datetime(2025, 7, 10, 17, 0, tzinfo=EASTERN),
+    }
+    event.update(overrides)
+    return event
+
+
+def test_representation_differences_are_ignored():
+    """vText/str, ''/None and aware/naive-local forms of the same event compare equal"""
+    remote = icloud_event()
+    local = Event(
+        uid='evt-1',
+        title='Soccer practice',
+        description=None,
+        location='Field 2 ',
+        start_time=storage_time(remote['start_time']),
+        end_time=storage_time(remote['end_time']),
+    )
+    assert not fields_differ(local, remote)
+    assert fields_differ(local, icloud_event(title='Soccer game'))
+    assert fields_differ(local, icloud_event(start_time=remote['start_time'] + timedelta(minutes=15)))
+    print("✅ Representation differences ignored, real changes detected")
+
+
+def test_all_day_events():
+    """An all-day date equals the stored midnight-to-midnight span, not a timed event"""
+    remote = icloud_event(start_time=date(2025, 7, 10), end_time=date(2025, 7, 11))
+    stored = Event(title='Soccer practice', description='', location='Field 2',
+                   start_time=storage_time(date(2025, 7, 10)), end_time=storage_time(date(2025, 7, 11)))
+    assert stored.start_time == datetime(2025, 7, 10)
+    assert canonical_fields(stored) == canonical_fields(remote)
+    assert fields_differ(stored, icloud_event())
+    print("✅ All-day events compare as dates")
+
+
+def test_sqlite_round_trip_is_stable():
+    """A row written from an iCloud event and read back from SQLite still matches it"""
+    remote = icloud_event()
+    remote_hash = fingerprint(remote)
+
+    async def run():
+        async with memory_db(Calendar(name="HomeBase", url="webcal://example.com")) as session_factory:
+            async with session_factory() as db:
+                db.add(Event(uid='evt-1', title=remote['title'], description=remote['description'],
+                             location=remote['location'], start_time=storage_time(remote['start_time']),
+                             end_time=storage_time(remote['end_time']), calendar_id=1))
+                await db.commit()
+            async with session_factory() as db:
+                row = await db.get(Event, 1)
+                assert row.content_hash == remote_hash
+        return row
+
+    row = asyncio.run(run())
+    assert row.start_time.tzinfo is None
+    assert not fields_differ(row, remote)
+    print("✅ SQLite round trip compares unchanged")
+
+
+def test_fingerprint_and_version():
+    """Parsed events carry a fingerprint matching the stored row, plus their SEQUENCE"""
+    events = parse_icloud_events(FEED)
+    remote = events['evt-1']
+    assert remote['sequence'] == 2
+    stored = Event(title='Soccer practice', description=None, location=None,
+                   start_time=storage_time(remote['start_time']), end_time=storage_time(remote['end_time']))
+    assert fingerprint(stored) == remote['fingerprint']
+    assert fingerprint(stored) != events['evt-2']['fingerprint']
+    print("✅ Fingerprints and versions parsed")
+
+
+if __name__ == "__main__":
+    test_representation_differences_are_ignored()
+    test_all_day_events()
+    test_sqlite_round_trip_is_stable()
+    test_fingerprint_and_version()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test script for dashboard writes through the events API: committed locally, then
+delivered by the outbox with a targeted read-back, never a calendar-wide fetch.
+Uses an in-memory SQLite database and httpx mock transports; no iCloud access needed.
+"""
+
+import asyncio
+import sys
+import os
+from contextlib import AsyncExitStack
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from fastapi import BackgroundTasks
+from sqlalchemy.future import select
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api import events as events_api
+from app.models.calendar import Calendar
+from app.models.events import Event
+from app.schemas import EventCreate, EventUpdate
+from app.services import outbox, sync_gate as sync_gate_module
+from app.services.caldav_client import CalDAVCalendar, caldav_session
+from app.services.outbox import deliver_in_background
+from app.services.two_way_sync import reconcile_in_background
+from conftest import memory_db, mock_client, mock_feed
+
+CALENDAR_URL = "https://p43-caldav.icloud.com/123/calendars/HOMEBASE/"
+CALENDAR_PATH = "/123/calendars/HOMEBASE/"
+HREF = CALENDAR_PATH + "evt-1.ics"
+START = datetime(2027, 3, 10, 18, 0)
+
+
+def stored_ical(uid, title):
+    return (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nBEGIN:VEVENT\r\n"
+        f"UID:{uid}\r\nSUMMARY:{title}\r\nDTSTART:20270310T180000\r\nDTEND:20270310T190000\r\n"
+        "END:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+
+
+def icloud(title):
+    """A mocked iCloud holding one event per resource, titled title."""
+    def handler(request):
+        if request.method == "REPORT":
+            # UID lookup of an event without an href: not on iCloud yet
+            return httpx.Response(207, text='<?xml version="1.0"?><d:multistatus xmlns:d="DAV:"/>')
+        if request.method in ("PUT", "DELETE"):
+            return httpx.Response(201 if request.method == "PUT" else 204, headers={"ETag": '"2"'})
+        uid = request.url.path.rsplit("/", 1)[-1][:-len(".ics")]
+        return httpx.Response(200, text=stored_ical(uid, title), headers={"ETag": '"2"'})
+    return handler
+
+
+def run(write, handler, rows=()):
+    """
+    Call write(db, background_tasks) as a request would, then run the outbox
+    delivery it queued (the reconcile is only checked for, not run).
+    Returns (write's result, the queued task functions, titles stored before
+    delivery, CalDAV requests, feed requests).
+    """
+    requests, feed = [], []
+
+    def caldav(request):
+        requests.append((request.method, request.url.path))
+        return handler(request)
+
+    def published(request):
+        feed.append(request.url.path)
+        return httpx.Response(500)
+
+    async def main():
+        background = BackgroundTasks()
+        calendar = CalDAVCalendar(mock_client(caldav), CALENDAR_URL)
+        async with AsyncExitStack() as stack:
+            stack.enter_context(patch.object(caldav_session, 'get_calendar', AsyncMock(return_value=calendar)))
+            stack.enter_context(patch.object(outbox, 'has_caldav_credentials', return_value=True))
+            stack.enter_context(mock_feed(published))
+            session_factory = await stack.enter_async_context(
+                memory_db(Calendar(name="HomeBase", url=CALENDAR_URL), *rows)
+            )
+            stack.enter_context(patch.object(sync_gate_module, 'AsyncSessionLocal', session_factory))
+            async with session_factory() as db:
+                result = await write(db, background)
+            async with session_factory() as db:
+                stored = dict((await db.execute(select(Event.uid, Event.title))).all())
+            queued = [task.func for task in background.tasks]
+            await background.tasks[queued.index(deliver_in_background)]()
+        return result, queued, stored, requests, feed
+
+    return asyncio.run(main())
+
+
+def indexed_event():
+    return Event(uid="evt-1", title="Practice", start_time=START, end_time=START + timedelta(hours=1),
+                 calendar_id=1, remote_href=HREF, remote_etag='"1"')
+
+
+def test_create_writes_through():
+    """A new event is committed, PUT once and read back by its href"""
+    async def create(db, background):
+        event = EventCreate(title="Practice", start_time=START, end_time=START + timedelta(hours=1))
+        return (await events_api.create_event(event, background, db)).uid
+
+    uid, queued, stored, requests, feed = run(create, icloud("Practice"))
+    href = f"{CALENDAR_PATH}{uid}.ics"
+    assert stored == {uid: "Practice"}
+    assert queued == [deliver_in_background, reconcile_in_background]
+    assert requests == [("REPORT", CALENDAR_PATH), ("PUT", href), ("GET", href)]
+    assert feed == []
+    print("✅ Create writes through")
+
+
+def test_update_writes_through():
+    """An edit is committed, patched into its resource and read back by href only"""
+    async def update(db, background):
+        return (await events_api.update_event(1, EventUpdate(title="Practice (moved)"), background, db)).title
+
+    title, queued, stored, requests, feed = run(update, icloud("Practice (moved)"), [indexed_event()])
+    assert title == "Practice (moved)" and stored == {"evt-1": "Practice (moved)"}
+    assert queued == [deliver_in_background, reconcile_in_background]
+    # The stored copy is fetched to be patched, then confirmed once after the PUT
+    assert requests == [("GET", HREF), ("PUT", HREF), ("GET", HREF)]
+    assert feed == []
+    print("✅ Update writes through")
+
+
+def test_delete_writes_through():
+    """A delete is committed and sent as one DELETE of its href"""
+    async def remove(db, background):
+        return await events_api.delete_event(1, background, db)
+
+    _, queued, stored, requests, feed = run(remove, icloud("Practice"), [indexed_event()])
+    assert stored == {}
+    assert queued == [deliver_in_background, reconcile_in_background]
+    assert requests == [("DELETE", HREF)]
+    assert feed == []
+    print("✅ Delete writes through")
+
+
+if __name__ == "__main__":
+    test_create_writes_through()
+    test_update_writes_through()
+    test_delete_writes_through()
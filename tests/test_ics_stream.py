@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental iCalendar parser.
+Feeds documents in small chunks; no network access needed.
+"""
+
+import sys
+import os
+from datetime import datetime
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.ics_stream import ICSStreamParser, iter_components
+from app.services.two_way_sync import parse_icloud_events
+from app.services.webcal_feed import FeedDigest, feed_digest
+
+VTIMEZONE = """BEGIN:VTIMEZONE
+TZID:Club Time
+BEGIN:STANDARD
+DTSTART:19700101T000000
+TZOFFSETFROM:-0500
+TZOFFSETTO:-0500
+END:STANDARD
+END:VTIMEZONE
+"""
+
+EVENTS = """BEGIN:VEVENT
+UID:evt-1
+SUMMARY:Soccer practice at the field behind the school with a very long title that
+  gets folded
+DTSTART;TZID=Club Time:20250710T180000
+DTEND;TZID=Club Time:20250710T190000
+DTSTAMP:20250801T000000Z
+BEGIN:VALARM
+UID:alarm-1
+ACTION:DISPLAY
+TRIGGER:-PT15M
+END:VALARM
+END:VEVENT
+BEGIN:VEVENT
+UID:evt-2
+SUMMARY:Dinner
+DTSTART:20250711T230000Z
+DTEND:20250712T000000Z
+DTSTAMP:20250801T000000Z
+END:VEVENT
+"""
+
+
+def document(*parts):
+    return ("BEGIN:VCALENDAR\nVERSION:2.0\n" + "".join(parts) + "END:VCALENDAR\n").replace("\n", "\r\n").encode()
+
+
+def feed_in_chunks(body, size):
+    parser = ICSStreamParser()
+    components = []
+    for start in range(0, len(body), size):
+        components += parser.feed(body[start:start + size])
+    return components + parser.close()
+
+
+def test_chunk_boundaries_and_folding():
+    """Any chunk size gives the same components, with folded lines joined"""
+    body = document(VTIMEZONE, EVENTS)
+    for size in (1, 7, 64, len(body)):
+        components = feed_in_chunks(body, size)
+        assert [c.name for c in components] == ["VTIMEZONE", "VEVENT", "VEVENT"]
+        event = components[1]
+        assert event.property('UID') == 'evt-1'  # Not the VALARM's UID
+        assert event.property('SUMMARY').endswith('title that gets folded')
+    print("✅ Chunk boundaries and folded lines handled")
+
+
+def test_timezone_defined_after_its_events():
+    """Events using a TZID defined later in the feed wait for its VTIMEZONE"""
+    parser = ICSStreamParser()
+    ready = parser.feed(document(EVENTS, VTIMEZONE)[:-len("END:VCALENDAR\r\n")])
+    assert [c.property('UID') for c in ready] == ['evt-2', None, 'evt-1']
+    start = ready[2].parse().get('dtstart').dt
+    assert start.utcoffset().total_seconds() == -5 * 3600
+    print("✅ Forward TZID references resolved")
+
+
+def test_matches_whole_document_parse():
+    """parse_icloud_events on the stream gives the same events as before"""
+    events = parse_icloud_events(document(VTIMEZONE, EVENTS))
+    assert sorted(events) == ['evt-1', 'evt-2']
+    assert events['evt-1']['title'].endswith('gets folded')
+    assert events['evt-2']['start_time'].replace(tzinfo=None) == datetime(2025, 7, 11, 23, 0)
+    assert [c.name for c in iter_components(document(VTIMEZONE, EVENTS).decode())][1:] == ["VEVENT", "VEVENT"]
+    print("✅ Same events as a whole-document parse")
+
+
+def test_streamed_digest():
+    """The digest computed chunk by chunk equals feed_digest() of the whole body"""
+    body = document(VTIMEZONE, EVENTS)
+    for size in (1, 5, len(body)):
+        digest = FeedDigest()
+        for start in range(0, len(body), size):
+            digest.update(body[start:start + size])
+        assert digest.hexdigest() == feed_digest(body)
+    print("✅ Streamed digest matches")
+
+
+if __name__ == "__main__":
+    test_chunk_boundaries_and_folding()
+    test_timezone_defined_after_its_events()
+    test_matches_whole_document_parse()
+    test_streamed_digest()
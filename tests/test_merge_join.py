@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming merge-join between iCloud events and the events table.
+Runs against an in-memory SQLite database.
+"""
+
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.calendar import Calendar
+from app.models.event_fields import fingerprint
+from app.models.events import Event
+from app.services.merge_join import merge_join
+from app.services.reconciler import reconcile
+from conftest import memory_db
+
+START = datetime(2025, 7, 10, 9, 0)
+
+
+def remote_event(uid, title=None):
+    event = {
+        'uid': uid,
+        'title': title or f"Event {uid}",
+        'description': '',
+        'location': '',
+        'start_time': START,
+        'end_time': START + timedelta(hours=1),
+    }
+    event['fingerprint'] = fingerprint(event)
+    return event
+
+
+def with_database(local_uids, body):
+    """Create the given local events, then run body(db) and return its result."""
+    async def run():
+        rows = [Calendar(name="HomeBase", url="webcal://example.com")]
+        for uid in local_uids:
+            rows.append(Event(uid=uid, title=f"Event {uid}", description='', location='',
+                              start_time=START, end_time=START + timedelta(hours=1), calendar_id=1))
+        async with memory_db(*rows) as session_factory:
+            async with session_factory() as db:
+                return await body(db)
+    return asyncio.run(run())
+
+
+def test_differences_in_chunks():
+    """Remote-only, changed and local-only events come out in bounded chunks"""
+    local = [f"e{i:03d}" for i in range(0, 40, 2)]  # even uids
+    remote = [remote_event(f"e{i:03d}", "Renamed" if i == 12 else None) for i in range(0, 40, 4)]  # every 4th
+    remote += [remote_event(f"e{i:03d}") for i in range(1, 40, 8)]  # some odd ones, new
+
+    async def body(db):
+        return [chunk async for chunk in merge_join(db, sorted(remote, key=lambda e: e['uid']), chunk_size=4)]
+
+    chunks = with_database(local, body)
+    assert all(len(chunk) <= 4 for chunk in chunks)
+    remote_only = [e['uid'] for c in chunks for e in c.remote_only]
+    changed = [e['uid'] for c in chunks for e in c.changed]
+    local_only = [uid for c in chunks for uid in c.local_only]
+    assert remote_only == [f"e{i:03d}" for i in range(1, 40, 8)]
+    assert changed == ["e012"]
+    assert local_only == [f"e{i:03d}" for i in range(2, 40, 4)]
+    assert sum(c.unchanged for c in chunks) == 9
+    print(f"✅ {len(chunks)} chunks, none larger than 4")
+
+
+def test_writing_chunks_during_the_merge():
+    """Rows inserted while the merge runs are not read back as local events"""
+    local = [f"e{i:03d}" for i in range(0, 30, 3)]
+    remote = [remote_event(f"e{i:03d}") for i in range(30)]
+
+    async def body(db):
+        local_only = []
+        async for chunk in merge_join(db, remote, chunk_size=5):
+            local_only += chunk.local_only
+            rows = [
+                {'calendar_id': 1, **{k: v for k, v in event.items() if k != 'fingerprint'}}
+                for event in chunk.remote_only
+            ]
+            await reconcile(db, rows)
+        count = await db.scalar(select(func.count()).select_from(Event))
+        return local_only, count
+
+    local_only, count = with_database(local, body)
+    assert local_only == []
+    assert count == 30
+    print("✅ Chunks written mid-merge")
+
+
+if __name__ == "__main__":
+    test_differences_in_chunks()
+    test_writing_chunks_during_the_merge()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Test script for the outbox of dashboard writes.
+Runs against an in-memory SQLite database and an httpx mock transport; no iCloud access needed.
+"""
+
+import asyncio
+import sys
+import os
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.calendar import Calendar
+from app.models.events import Event
+from app.models.outbox import OutboxOperation
+from app.services import outbox
+from app.services.caldav_client import CalDAVCalendar, caldav_session
+from app.services.outbox import DELETE, PUT, deliver_outbox, enqueue, pending_uids
+from app.services.sync_context import SyncContext
+from app.services.two_way_sync import update_in_icloud
+from conftest import memory_db, mock_client, run_steps
+
+CALENDAR_URL = "https://p43-caldav.icloud.com/123/calendars/HOMEBASE/"
+START = datetime(2027, 3, 10, 18, 0)
+
+
+def stored_ical(uid, title):
+    return (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nBEGIN:VEVENT\r\n"
+        f"UID:{uid}\r\nSUMMARY:{title}\r\nDTSTART:20270310T180000\r\nDTEND:20270310T190000\r\n"
+        "END:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+
+
+def run(handler, steps):
+    """Run each step(db) in its own session against a mocked iCloud; return their results."""
+    async def main():
+        calendar = CalDAVCalendar(mock_client(handler), CALENDAR_URL)
+        with ExitStack() as stack:
+            stack.enter_context(patch.object(caldav_session, 'get_calendar', AsyncMock(return_value=calendar)))
+            stack.enter_context(patch.object(outbox, 'has_caldav_credentials', return_value=True))
+            async with memory_db(Calendar(name="HomeBase", url=CALENDAR_URL)) as session_factory:
+                return await run_steps(session_factory, steps, commit=True)
+    return asyncio.run(main())
+
+
+async def add_event(db, uid="evt-1", title="Practice"):
+    db.add(Event(uid=uid, title=title, start_time=START, end_time=START + timedelta(hours=1), calendar_id=1))
+    await enqueue(db, uid, PUT)
+
+
+async def operations(db):
+    """The queued operations as plain rows, still readable once the session has committed."""
+    return (await db.execute(select(*OutboxOperation.__table__.columns).order_by(OutboxOperation.id))).all()
+
+
+def test_edits_collapse():
+    """Every write to one event shares a single queued operation"""
+    async def edit_twice_then_delete(db):
+        await add_event(db)
+        await enqueue(db, "evt-1", PUT)
+        await db.flush()
+        assert len(await operations(db)) == 1
+        await enqueue(db, "evt-1", DELETE, "/123/calendars/HOMEBASE/evt-1.ics")
+        return await operations(db)
+
+    [ops] = run(lambda request: httpx.Response(500), [edit_twice_then_delete])
+    assert [(op.operation, op.remote_href) for op in ops] == [("delete", "/123/calendars/HOMEBASE/evt-1.ics")]
+    print("✅ Edits collapse into one operation")
+
+
+def test_delivery_sends_current_state_once():
+    """Delivery PUTs the event as it is now, confirms it and clears the operation"""
+    requests = []
+
+    def handler(request):
+        requests.append((request.method, request.url.path))
+        if request.method == "REPORT":
+            # UID lookup before the first PUT: not on iCloud yet
+            return httpx.Response(207, text='<?xml version="1.0"?><d:multistatus xmlns:d="DAV:"/>')
+        if request.method == "PUT":
+            assert b"SUMMARY:Practice (moved)" in request.content
+            return httpx.Response(201, headers={"ETag": '"1"'})
+        return httpx.Response(200, text=stored_ical("evt-1", "Practice (moved)"), headers={"ETag": '"1"'})
+
+    async def edit(db):
+        event = (await db.execute(select(Event))).scalar_one()
+        event.title = "Practice (moved)"
+        await enqueue(db, event.uid, PUT)
+
+    async def delivered(db):
+        return (await db.execute(select(Event.remote_href, Event.remote_etag))).one(), await pending_uids(db)
+
+    results = run(handler, [add_event, edit, deliver_outbox, delivered])
+    report = results[2]["details"]
+    (href, etag), pending = results[3]
+    assert (report["delivered"], report["pending"]) == (1, 0)
+    assert [method for method, _path in requests] == ["REPORT", "PUT", "GET"]
+    assert (href, etag) == ("/123/calendars/HOMEBASE/evt-1.ics", '"1"')
+    assert pending == set()
+    print("✅ One PUT per event, operation cleared")
+
+
+def test_edit_patches_stored_copy():
+    """An edit patches the stored resource (its alarm survives), conditional on the last pulled ETag"""
+    puts = []
+    alarm = "BEGIN:VALARM\r\nACTION:DISPLAY\r\nTRIGGER:-PT15M\r\nEND:VALARM\r\n"
+
+    def handler(request):
+        if request.method == "PUT":
+            puts.append((request.headers.get("If-Match"), request.content))
+            return httpx.Response(204, headers={"ETag": '"2"'})
+        text = stored_ical("evt-1", "Practice").replace("END:VEVENT", alarm + "END:VEVENT")
+        return httpx.Response(200, text=text, headers={"ETag": '"1"'})
+
+    async def add_indexed(db):
+        await add_event(db)
+        event = (await db.execute(select(Event))).scalar_one()
+        event.title = "Practice (moved)"
+        event.remote_href, event.remote_etag = "/123/calendars/HOMEBASE/evt-1.ics", '"1"'
+
+    results = run(handler, [add_indexed, deliver_outbox])
+    assert results[1]["details"]["delivered"] == 1
+    [(if_match, body)] = puts
+    assert if_match == '"1"'
+    assert b"SUMMARY:Practice (moved)" in body and b"BEGIN:VALARM" in body
+    print("✅ Edit keeps what we don't model")
+
+
+def test_conflict_keeps_icloud_version():
+    """A 412 is handled alike from the outbox and the export: iCloud's version wins, nothing is re-sent"""
+    puts = []
+
+    def handler(request):
+        if request.method == "PUT":
+            puts.append(request.headers.get("If-Match"))
+            return httpx.Response(412)
+        # Renamed on another device since our last pull
+        return httpx.Response(200, text=stored_ical("evt-1", "Renamed on iPhone"), headers={"ETag": '"2"'})
+
+    async def add_indexed(db):
+        await add_event(db)
+        event = (await db.execute(select(Event))).scalar_one()
+        event.title = "Practice (moved)"
+        event.remote_href, event.remote_etag = "/123/calendars/HOMEBASE/evt-1.ics", '"1"'
+
+    async def export_edit(db):
+        event = (await db.execute(select(Event))).scalar_one()
+        event.title, event.remote_etag = "Practice (again)", '"1"'
+        ctx = SyncContext(db)
+        calendar = await caldav_session.get_calendar(db)
+        return await update_in_icloud(ctx, calendar, event.uid, event), event.title, event.remote_etag, ctx.writes
+
+    async def title(db):
+        event = (await db.execute(select(Event))).scalar_one()
+        return event.title, event.remote_etag
+
+    results = run(handler, [add_indexed, deliver_outbox, title, export_edit])
+    [item] = results[1]["details"]["items"]
+    assert item["ok"] and item["action"] == "conflict"
+    assert results[2] == ("Renamed on iPhone", '"2"')
+    assert results[3] == ("conflict", "Renamed on iPhone", '"2"', {"db": 0, "icloud": 0})
+    # One conditional PUT per attempt, each on the ETag we last pulled
+    assert puts == ['"1"', '"1"']
+    print("✅ Conflicts keep the iCloud version")
+
+
+def test_unreachable_backs_off():
+    """While iCloud is unreachable operations wait with backoff and nothing is given up"""
+    def handler(request):
+        raise httpx.ConnectError("network down", request=request)
+
+    async def add_two(db):
+        await add_event(db, "evt-1")
+        await add_event(db, "evt-2")
+
+    results = run(handler, [add_two, deliver_outbox, deliver_outbox, operations])
+    first, second, ops = results[1]["details"], results[2]["details"], results[3]
+    assert (first["retrying"], first["failed"]) == (1, 0)
+    # The first failure stops the run; the backed-off operation isn't due yet on the next one
+    assert [item["uid"] for item in first["items"]] == ["evt-1"]
+    assert [op.attempts for op in ops] == [1, 1]
+    assert ops[0].next_attempt_at > datetime.utcnow() and ops[0].status == "pending"
+    assert second["retrying"] == 1 and [item["uid"] for item in second["items"]] == ["evt-2"]
+    print("✅ Unreachable iCloud backs off")
+
+
+def test_rejected_operation_given_up():
+    """An operation iCloud keeps rejecting is marked failed after max_sync_retries attempts"""
+    async def make_due(db):
+        await db.execute(update(OutboxOperation).values(next_attempt_at=datetime.utcnow()))
+
+    steps = [add_event]
+    for _ in range(outbox.settings.max_sync_retries):
+        steps += [deliver_outbox, make_due]
+    steps.append(operations)
+    results = run(lambda request: httpx.Response(403), steps)
+    [op] = results[-1]
+    assert op.status == "failed" and op.attempts == outbox.settings.max_sync_retries
+    assert "403" in op.last_error
+    print("✅ Rejected operation given up")
+
+
+if __name__ == "__main__":
+    test_edits_collapse()
+    test_delivery_sends_current_state_once()
+    test_edit_patches_stored_copy()
+    test_conflict_keeps_icloud_version()
+    test_unreachable_backs_off()
+    test_rejected_operation_given_up()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for parsing large feeds across worker processes.
+Forces the process pool with a low threshold; no network access needed.
+"""
+
+import asyncio
+import sys
+import os
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.event_fields import storage_time
+from app.services import parallel_parse
+from app.services.ics_stream import iter_components
+from app.services.parallel_parse import parse_event_records
+from app.services.recurrence import override_uid
+
+VTIMEZONE = """BEGIN:VTIMEZONE
+TZID:Club Time
+BEGIN:STANDARD
+DTSTART:19700101T000000
+TZOFFSETFROM:-0500
+TZOFFSETTO:-0500
+END:STANDARD
+END:VTIMEZONE
+"""
+
+
+def feed(count):
+    events = []
+    for i in range(count):
+        events.append(
+            f"BEGIN:VEVENT\nUID:evt-{i}\nSUMMARY:Event {i}\n"
+            f"DTSTART;TZID=Club Time:20270{1 + i % 9}{10 + i % 18}T180000\n"
+            f"DTEND;TZID=Club Time:20270{1 + i % 9}{10 + i % 18}T190000\nEND:VEVENT\n"
+        )
+    # A weekly series with one moved occurrence
+    events.append(
+        "BEGIN:VEVENT\nUID:series\nSUMMARY:Practice\nRRULE:FREQ=WEEKLY;COUNT=3\n"
+        "DTSTART;TZID=Club Time:20270105T170000\nDTEND;TZID=Club Time:20270105T180000\nEND:VEVENT\n"
+        "BEGIN:VEVENT\nUID:series\nSUMMARY:Practice (moved)\nRECURRENCE-ID;TZID=Club Time:20270112T170000\n"
+        "DTSTART;TZID=Club Time:20270113T170000\nDTEND;TZID=Club Time:20270113T180000\nEND:VEVENT\n"
+    )
+    return "BEGIN:VCALENDAR\nVERSION:2.0\n" + VTIMEZONE + "".join(events) + "END:VCALENDAR\n"
+
+
+def run(coroutine_factory, parallel):
+    settings = parallel_parse.settings
+    threshold = 10 if parallel else 10 ** 6
+    with patch.object(settings, 'parallel_parse_threshold', threshold), patch.object(settings, 'parse_workers', 2):
+        return asyncio.run(coroutine_factory())
+
+
+def test_parallel_records_match_inline():
+    """The process pool returns the same records as parsing in-process"""
+    components = list(iter_components(feed(60)))
+    inline = run(lambda: parse_event_records(components), parallel=False)
+    pooled = run(lambda: parse_event_records(components), parallel=True)
+    key = lambda record: (record['uid'], record['start_time'])
+    assert sorted(inline, key=key) == sorted(pooled, key=key)
+    assert len(pooled) == 62
+    assert pooled[0]['start_time'].utcoffset().total_seconds() == -5 * 3600
+    print("✅ Parallel records match")
+
+
+def test_series_parsed_as_master_and_override():
+    """A recurring series comes back as its master and one override, not as occurrences"""
+    components = list(iter_components(feed(60)))
+    records = run(lambda: parse_event_records(components), parallel=True)
+    series = sorted((r for r in records if 'series' in r['uid']), key=lambda r: r['uid'])
+    moved = storage_time(datetime(2027, 1, 12, 22, 0, tzinfo=timezone.utc))
+    assert [r['uid'] for r in series] == ['series', override_uid('series', moved)]
+    assert series[0]['rrule'] == 'FREQ=WEEKLY;COUNT=3'
+    assert series[1]['series_uid'] == 'series' and series[1]['title'] == 'Practice (moved)'
+    print("✅ Series parsed as master and override")
+
+
+if __name__ == "__main__":
+    test_parallel_records_match_inline()
+    test_series_parsed_as_master_and_override()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-VEVENT parse cache.
+Uses a temporary SQLite file for the persistence check; no iCloud access needed.
+"""
+
+import sys
+import os
+import tempfile
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.parse_cache import ComponentCache, CountingCache
+from app.services.two_way_sync import parse_icloud_events
+
+FEED = """BEGIN:VCALENDAR
+VERSION:2.0
+BEGIN:VTIMEZONE
+TZID:Club Time
+BEGIN:STANDARD
+DTSTART:19700101T000000
+TZOFFSETFROM:-0500
+TZOFFSETTO:-0500
+END:STANDARD
+END:VTIMEZONE
+BEGIN:VEVENT
+UID:evt-1
+SUMMARY:Soccer practice
+DTSTART;TZID=Club Time:20250710T180000
+DTEND;TZID=Club Time:20250710T190000
+DTSTAMP:20250801T000000Z
+END:VEVENT
+BEGIN:VEVENT
+UID:evt-2
+SUMMARY:Dinner
+DTSTART:20250711T230000Z
+DTEND:20250712T000000Z
+DTSTAMP:20250801T000000Z
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def test_unchanged_events_hit():
+    """A restamped feed is all hits; an edited event or zone misses"""
+    cache = ComponentCache(100)
+    first = CountingCache(cache)
+    events = parse_icloud_events(FEED, cache=first)
+    assert first.report() == {"hits": 0, "misses": 2, "hit_rate": 0.0}
+
+    restamped = CountingCache(cache)
+    again = parse_icloud_events(FEED.replace("DTSTAMP:20250801", "DTSTAMP:20250901"), cache=restamped)
+    assert restamped.report()["hit_rate"] == 1.0
+    assert again['evt-1']['start_time'] == events['evt-1']['start_time']
+    assert again['evt-1'] == events['evt-1'] and again['evt-1'] is not events['evt-1']
+
+    edited = CountingCache(cache)
+    parse_icloud_events(FEED.replace("SUMMARY:Dinner", "SUMMARY:Lunch").replace("-0500", "-0400"), cache=edited)
+    assert (edited.hits, edited.misses) == (0, 2)
+    print("✅ Restamped events hit, edited ones miss")
+
+
+def test_lru_eviction():
+    """The least recently used entry goes once the cache is full"""
+    cache = ComponentCache(2)
+    cache.put("a", {"uid": "a"})
+    cache.put("b", {"uid": "b"})
+    cache.get("a")
+    cache.put("c", {"uid": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    print("✅ LRU eviction")
+
+
+def test_persisted_across_instances():
+    """Saved records are found by a new cache on the same SQLite file"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "parse_cache.db")
+        warm = CountingCache(ComponentCache(100, path))
+        parse_icloud_events(FEED, cache=warm)
+        warm.save()
+
+        restarted = CountingCache(ComponentCache(100, path))
+        events = parse_icloud_events(FEED, cache=restarted)
+        assert restarted.report()["hit_rate"] == 1.0
+        assert events['evt-2']['title'] == 'Dinner'
+    print("✅ Persisted cache survives a restart")
+
+
+if __name__ == "__main__":
+    test_unchanged_events_hit()
+    test_lru_eviction()
+    test_persisted_across_instances()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for the concurrent iCloud push executor.
+Jobs are plain coroutines, so no iCloud credentials are needed.
+"""
+
+import asyncio
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.caldav_client import ServerBusy
+from app.services.push_executor import PushExecutor
+
+
+def test_concurrency_is_bounded():
+    """Jobs run in parallel but never above max_concurrency"""
+    state = {"running": 0, "peak": 0}
+
+    async def job():
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.01)
+        state["running"] -= 1
+        return "added"
+
+    async def run():
+        executor = PushExecutor(max_concurrency=3, initial_concurrency=3, target_latency=5)
+        return await executor.run((f"event-{i}", job) for i in range(12))
+
+    results = asyncio.run(run())
+    assert [r.key for r in results] == [f"event-{i}" for i in range(12)]
+    assert all(r.ok and r.value == "added" for r in results)
+    assert 1 < state["peak"] <= 3
+    print(f"✅ Peak concurrency {state['peak']}")
+
+
+def test_throttling_backs_off_and_retries():
+    """A 429/503 halves the limit and the job is retried"""
+    calls = {"count": 0}
+
+    async def busy_once():
+        calls["count"] += 1
+        if calls["count"] == 1:
+            raise ServerBusy("PUT returned HTTP 503", retry_after=0)
+        return "updated"
+
+    async def run():
+        executor = PushExecutor(max_concurrency=8, initial_concurrency=8, target_latency=5)
+        results = await executor.run([("event-1", busy_once)])
+        return executor, results
+
+    executor, results = asyncio.run(run())
+    assert results[0].ok and results[0].attempts == 2
+    assert executor.stats() == {"concurrency": 4, "throttled": 1}
+    print("✅ Throttled push retried with reduced concurrency")
+
+
+def test_failures_are_reported_per_item():
+    """One failing push does not stop the others"""
+    async def ok():
+        return "added"
+
+    async def broken():
+        raise RuntimeError("PUT returned HTTP 500")
+
+    async def run():
+        return await PushExecutor(max_retries=0).run([("a", ok), ("b", broken), ("c", ok)])
+
+    results = asyncio.run(run())
+    assert [r.ok for r in results] == [True, False, True]
+    assert results[1].summary()["error"] == "PUT returned HTTP 500"
+    assert results[0].summary()["action"] == "added"
+    print("✅ Per-item results reported")
+
+
+if __name__ == "__main__":
+    test_concurrency_is_bounded()
+    test_throttling_backs_off_and_retries()
+    test_failures_are_reported_per_item()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script for the set-based event reconciler.
+Runs against an in-memory SQLite database.
+"""
+
+import asyncio
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.calendar import Calendar
+from app.models.events import Category, Event
+from app.services.reconciler import reconcile
+from conftest import memory_db, run_steps
+
+START = datetime(2025, 7, 10, 9, 0)
+
+
+def snapshot(count, **overrides):
+    rows = []
+    for i in range(count):
+        row = {
+            'uid': f"evt-{i}",
+            'title': f"Event {i}",
+            'description': '',
+            'location': None,
+            'start_time': START + timedelta(hours=i),
+            'end_time': START + timedelta(hours=i + 1),
+            'calendar_id': 1,
+            'category_id': None,
+        }
+        row.update(overrides.get(row['uid'], {}))
+        rows.append(row)
+    return rows
+
+
+def run(steps):
+    """Run each step(db) in its own session and commit; return their results."""
+    async def main():
+        rows = [Calendar(name="HomeBase", url="webcal://example.com"), Category(name="Soccer", color="#00ff00")]
+        async with memory_db(*rows) as session_factory:
+            return await run_steps(session_factory, steps, commit=True)
+    return asyncio.run(main())
+
+
+async def load(db):
+    """The stored events as plain rows, still readable once the session has committed."""
+    result = await db.execute(select(*Event.__table__.columns).order_by(Event.id))
+    return {row.uid: row for row in result.all()}
+
+
+def test_insert_update_delete():
+    """New rows are inserted, changed ones updated, missing ones in scope deleted"""
+    changed = snapshot(4, **{'evt-1': {'title': 'Renamed'}})
+    results = run([
+        lambda db: reconcile(db, snapshot(5)),
+        lambda db: reconcile(db, snapshot(5)),
+        lambda db: reconcile(db, changed, scope=Event.uid.like('evt-%')),
+        load,
+    ])
+    first, again, third, rows = results
+    assert (first.added, first.updated, first.unchanged) == (5, 0, 0)
+    assert again.writes == 0 and again.unchanged == 5
+    assert (third.added, third.updated, third.deleted, third.unchanged) == (0, 1, 1, 3)
+    assert sorted(rows) == ['evt-0', 'evt-1', 'evt-2', 'evt-3']
+    assert rows['evt-1'].title == 'Renamed' and rows['evt-1'].content_hash
+    print("✅ Inserted, updated and deleted in bulk")
+
+
+def test_keep_existing_and_insert_only():
+    """keep_existing preserves a category set earlier; update=False never touches existing rows"""
+    async def pick_category(db):
+        event = (await db.execute(select(Event).where(Event.uid == 'evt-0'))).scalar_one()
+        event.category_id = 1
+
+    results = run([
+        lambda db: reconcile(db, snapshot(2)),
+        pick_category,
+        lambda db: reconcile(db, snapshot(2, **{'evt-0': {'title': 'Moved', 'category_id': None}}),
+                             keep_existing=('category_id',)),
+        lambda db: reconcile(db, snapshot(3, **{'evt-1': {'title': 'Ignored'}}), update=False),
+        load,
+    ])
+    rows = results[-1]
+    assert rows['evt-0'].title == 'Moved' and rows['evt-0'].category_id == 1
+    assert results[3].added == 1 and results[3].updated == 0
+    assert rows['evt-1'].title == 'Event 1'
+    print("✅ Existing categories kept, insert-only mode leaves rows alone")
+
+
+def test_large_snapshot():
+    """A 5,000-event snapshot reconciles with a handful of statements"""
+    timings = []
+
+    async def timed(db):
+        started = time.perf_counter()
+        result = await reconcile(db, snapshot(5000))
+        timings.append(time.perf_counter() - started)
+        return result
+
+    first, second = run([timed, timed])
+    assert first.added == 5000 and second.unchanged == 5000
+    print(f"✅ 5,000 events: {timings[0]:.2f}s initial, {timings[1]:.2f}s unchanged")
+
+
+if __name__ == "__main__":
+    test_insert_update_delete()
+    test_keep_existing_and_insert_only()
+    test_large_snapshot()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for storing recurring events as series and expanding them on read.
+Runs against an in-memory SQLite database; no iCloud access needed.
+"""
+
+import asyncio
+import sys
+import os
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.calendar import Calendar
+from app.models.events import Event
+from app.services.reconciler import reconcile
+from app.services.recurrence import expand_events, occurrences, override_uid
+from app.services.two_way_sync import parse_icloud_events
+from conftest import memory_db
+
+# Weekly practice: the 2nd occurrence moved a day later, the 3rd cancelled
+FEED = """BEGIN:VCALENDAR
+VERSION:2.0
+BEGIN:VEVENT
+UID:practice
+SUMMARY:Practice
+DTSTART:20270105T170000
+DTEND:20270105T180000
+RRULE:FREQ=WEEKLY;COUNT=4
+EXDATE:20270119T170000
+END:VEVENT
+BEGIN:VEVENT
+UID:practice
+SUMMARY:Practice (moved)
+RECURRENCE-ID:20270112T170000
+DTSTART:20270113T170000
+DTEND:20270113T180000
+END:VEVENT
+BEGIN:VEVENT
+UID:dinner
+SUMMARY:Dinner
+DTSTART:20270106T190000
+DTEND:20270106T200000
+END:VEVENT
+END:VCALENDAR
+"""
+
+WINDOW = (datetime(2027, 1, 1), datetime(2027, 2, 1))
+
+
+def store(rows):
+    """Reconcile rows into a fresh database and return the stored events."""
+    async def run():
+        async with memory_db(Calendar(name="HomeBase", url="webcal://example.com")) as session_factory:
+            async with session_factory() as db:
+                await reconcile(db, rows)
+                await db.commit()
+                return (await db.execute(
+                    select(Event).options(selectinload(Event.category)).order_by(Event.uid)
+                )).scalars().all()
+    return asyncio.run(run())
+
+
+def rows_from(records):
+    columns = ('uid', 'title', 'description', 'location', 'start_time', 'end_time',
+               'rrule', 'exdates', 'recurrence_id', 'series_uid')
+    return [dict({c: record[c] for c in columns}, calendar_id=1) for record in records.values()]
+
+
+def test_master_and_override_keys():
+    """The master keeps the UID; the override gets its own key pointing at the series"""
+    records = parse_icloud_events(FEED)
+    moved = override_uid('practice', datetime(2027, 1, 12, 17, 0))
+    assert sorted(records) == ['dinner', 'practice', moved]
+    assert records['practice']['rrule'] == 'FREQ=WEEKLY;COUNT=4'
+    assert records['practice']['exdates'] == '2027-01-19T17:00:00'
+    assert records[moved]['series_uid'] == 'practice'
+    assert records[moved]['recurrence_id'] == datetime(2027, 1, 12, 17, 0)
+    print("✅ Master and override keyed separately")
+
+
+def test_stored_as_series_and_expanded():
+    """One row per series and override; reads expand to the occurrences in the window"""
+    events = store(rows_from(parse_icloud_events(FEED)))
+    assert len(events) == 3
+
+    shown = sorted(expand_events(events, *WINDOW), key=lambda event: event.start_time)
+    assert [(event.title, event.start_time.day) for event in shown] == [
+        ('Practice', 5), ('Dinner', 6), ('Practice (moved)', 13), ('Practice', 26)
+    ]
+    assert shown[-1].recurrence_id == datetime(2027, 1, 26, 17, 0)
+
+    # Single events are windowed by the query; only the series are expanded here
+    series = [event for event in events if event.rrule or event.series_uid]
+    narrow = expand_events(series, datetime(2027, 1, 20), datetime(2027, 1, 27))
+    assert [event.start_time.day for event in narrow] == [26]
+    print("✅ Series stored once and expanded on read")
+
+
+def test_expansion_cached():
+    """Reading the same window again reuses the cached expansion"""
+    events = store(rows_from(parse_icloud_events(FEED)))
+    occurrences.cache_clear()
+    expand_events(events, *WINDOW)
+    expand_events(events, *WINDOW)
+    info = occurrences.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    print("✅ Expansion served from cache")
+
+
+if __name__ == "__main__":
+    test_master_and_override_keys()
+    test_stored_as_series_and_expanded()
+    test_expansion_cached()
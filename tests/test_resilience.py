@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Test script for the timeouts, retries and circuit breakers around upstream calls.
+Uses httpx mock transports and an in-memory SQLite database; no network access needed.
+"""
+
+import asyncio
+import sys
+import os
+from unittest.mock import patch
+
+import httpx
+from sqlalchemy.future import select
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api import calendar as calendar_api
+from app.models.calendar import Calendar
+from app.models.events import Event
+from app.services import resilience
+from app.services.resilience import CLOSED, HALF_OPEN, HOCKEY, ICLOUD_FEED, OPEN, CircuitOpen, Upstream, unavailable
+from app.services.two_way_sync import sync_icloud_to_homebase
+from app.services.webcal_feed import fetch_feed
+from conftest import memory_db, mock_feed
+
+URL = "https://example.com/feed.ics"
+
+
+def fetch(upstream, handler, count=1):
+    """GET URL count times through upstream's transport; returns each response or exception."""
+    async def run():
+        outcomes = []
+        async with upstream.client(transport=httpx.MockTransport(handler)) as client:
+            for _ in range(count):
+                try:
+                    outcomes.append(await client.get(URL))
+                except httpx.TransportError as e:
+                    outcomes.append(e)
+        return outcomes
+    with patch.object(resilience.settings, 'retry_backoff_seconds', 0):
+        return asyncio.run(run())
+
+
+def test_transient_failure_retried():
+    """A 502 or a dropped connection is retried; the caller only sees the success"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if len(calls) == 1:
+            return httpx.Response(502)
+        if len(calls) == 2:
+            raise httpx.ConnectError("connection reset", request=request)
+        return httpx.Response(200, text="ok")
+
+    upstream = Upstream("test", "feed_timeout_seconds")
+    [response] = fetch(upstream, handler)
+    assert response.status_code == 200 and len(calls) == 3
+    assert upstream.breaker.state == CLOSED
+    print("✅ Transient failures retried")
+
+
+def test_conditional_write_not_retried():
+    """A conditional PUT is sent once: a replay that had been applied would come back 412"""
+    calls = []
+
+    def handler(request):
+        calls.append((request.method, request.headers.get("If-Match")))
+        return httpx.Response(502)
+
+    async def run():
+        async with Upstream("test", "caldav_timeout_seconds").client(transport=httpx.MockTransport(handler)) as client:
+            conditional = await client.put(URL, content=b"x", headers={"If-Match": '"1"'})
+            unconditional = await client.put(URL, content=b"x")
+            revalidation = await client.get(URL, headers={"If-None-Match": '"1"'})
+        return conditional, unconditional, revalidation
+
+    with patch.object(resilience.settings, 'retry_backoff_seconds', 0):
+        responses = asyncio.run(run())
+    retries = resilience.settings.max_sync_retries
+    assert [response.status_code for response in responses] == [502, 502, 502]
+    assert [method for method, _ in calls] == ["PUT"] + ["PUT"] * retries + ["GET"] * retries
+    assert calls[0] == ("PUT", '"1"')
+    print("✅ Conditional writes not retried")
+
+
+def test_unavailable_counts_as_failure():
+    """A 503 is retried after its Retry-After and counts against the breaker; a long Retry-After is left to the caller"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        return httpx.Response(503, headers={"Retry-After": "0" if len(calls) < 3 else "3600"})
+
+    upstream = Upstream("test", "feed_timeout_seconds")
+    upstream.breaker.failure_threshold = 2
+    first, second = fetch(upstream, handler, count=2)
+    retries = resilience.settings.max_sync_retries
+    assert (first.status_code, second.status_code) == (503, 503)
+    # The first GET is retried; the second stops at the Retry-After of an hour
+    assert len(calls) == retries + 1
+    assert upstream.breaker.state == OPEN
+    print("✅ 503 counts as a failure")
+
+
+def test_feed_goes_through_breaker():
+    """The feed download is retried and guarded by ICLOUD_FEED: an outage opens its breaker"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        return httpx.Response(503)
+
+    async def download():
+        try:
+            await fetch_feed("webcal://example.com/feed.ics")
+        except (httpx.HTTPStatusError, CircuitOpen) as e:
+            return type(e)
+
+    threshold = ICLOUD_FEED.breaker.failure_threshold
+    with mock_feed(handler), patch.object(resilience.settings, 'retry_backoff_seconds', 0):
+        outcomes = [asyncio.run(download()) for _ in range(threshold + 1)]
+        state = ICLOUD_FEED.breaker.state
+    assert outcomes == [httpx.HTTPStatusError] * threshold + [CircuitOpen]
+    assert len(calls) == threshold * resilience.settings.max_sync_retries
+    assert state == OPEN and ICLOUD_FEED.breaker.state == CLOSED
+    print("✅ Feed guarded by its breaker")
+
+
+def test_breaker_opens_and_fails_fast():
+    """Repeated failures open the breaker; further calls fail without a request"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        raise httpx.ConnectTimeout("timed out", request=request)
+
+    upstream = Upstream("test", "feed_timeout_seconds")
+    upstream.breaker.failure_threshold = 2
+    outcomes = fetch(upstream, handler, count=3)
+    retries = resilience.settings.max_sync_retries
+    assert [type(outcome) for outcome in outcomes] == [httpx.ConnectTimeout, httpx.ConnectTimeout, CircuitOpen]
+    assert len(calls) == 2 * retries
+    assert upstream.breaker.state == OPEN
+    assert unavailable(upstream)["details"]["unavailable"] == "test"
+    print("✅ Open breaker fails fast")
+
+
+def test_half_open_trial_closes():
+    """After the cooldown one trial request goes through and closes the breaker"""
+    upstream = Upstream("test", "feed_timeout_seconds")
+    for _ in range(upstream.breaker.failure_threshold):
+        upstream.breaker.record_failure("HTTP 504")
+    assert upstream.breaker.state == OPEN
+    upstream.breaker.reset_seconds = 0
+    assert upstream.breaker.state == HALF_OPEN
+    [response] = fetch(upstream, lambda request: httpx.Response(200))
+    assert response.status_code == 200 and upstream.breaker.state == CLOSED
+    print("✅ Half-open trial closes the breaker")
+
+
+def test_sync_skipped_while_open():
+    """An import with the feed's breaker open returns at once and leaves local data alone"""
+    async def run():
+        async with memory_db(Calendar(name="HomeBase", url="webcal://example.com")) as session_factory:
+            async with session_factory() as db:
+                result = await sync_icloud_to_homebase(db, incremental=False)
+                events = (await db.execute(select(Event))).scalars().all()
+        return result, events
+
+    for _ in range(ICLOUD_FEED.breaker.failure_threshold):
+        ICLOUD_FEED.breaker.record_failure("ConnectTimeout")
+    try:
+        result, events = asyncio.run(run())
+    finally:
+        ICLOUD_FEED.breaker.reset()
+    assert result["status"] == "skipped" and result["details"]["unavailable"] == "icloud_feed"
+    assert result["details"]["circuit"]["state"] == OPEN
+    assert events == []
+    print("✅ Sync skipped while the upstream is down")
+
+
+def test_endpoints_skip_instead_of_failing():
+    """With a breaker open the sync endpoints answer 200 with status "skipped" instead of a 500"""
+    async def run():
+        smart = await calendar_api.smart_sync()
+        hockey = await calendar_api.sync_hockey_schedule()
+        return smart, hockey
+
+    for upstream in (ICLOUD_FEED, HOCKEY):
+        for _ in range(upstream.breaker.failure_threshold):
+            upstream.breaker.record_failure("ConnectTimeout")
+    try:
+        smart, hockey = asyncio.run(run())
+    finally:
+        ICLOUD_FEED.breaker.reset()
+        HOCKEY.breaker.reset()
+    assert smart["status"] == "skipped" and smart["details"]["unavailable"] == "icloud_feed"
+    assert hockey["status"] == "skipped" and hockey["details"]["unavailable"] == "hockey"
+    print("✅ Endpoints report skipped syncs without an error")
+
+
+if __name__ == "__main__":
+    test_transient_failure_retried()
+    test_conditional_write_not_retried()
+    test_unavailable_counts_as_failure()
+    test_feed_goes_through_breaker()
+    test_breaker_opens_and_fails_fast()
+    test_half_open_trial_closes()
+    test_sync_skipped_while_open()
+    test_endpoints_skip_instead_of_failing()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-run sync context.
+Only in-memory state is exercised, so no database or iCloud access is needed.
+"""
+
+import asyncio
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.events import Category, Event
+from app.services.sync_context import CategoryMatcher, SyncContext
+from app.services.two_way_sync import remote_snapshot
+
+
+def test_category_matcher():
+    """Category names are matched case-insensitively in title or description"""
+    matcher = CategoryMatcher([Category(name="Hockey"), Category(name="School")])
+    assert matcher.match("Hockey practice", None).name == "Hockey"
+    assert matcher.match("Pickup", "after school").name == "School"
+    assert matcher.match("Dinner", "") is None
+    print("✅ Category matcher")
+
+
+def test_phases_share_snapshots():
+    """Changes recorded by one phase are visible to the next without reloading"""
+    ctx = SyncContext(db=None)
+    ctx.local = {}
+    ctx.remote = {"a": {"uid": "a", "title": "From iCloud"}}
+
+    ctx.record_local(Event(uid="a", title="From iCloud"))
+    ctx.record_remote("b", {"uid": "b", "title": "Pushed"})
+    assert set(ctx.local) == {"a"}
+
+    # Already fetched by an earlier phase, so no download happens here
+    snapshot = asyncio.run(remote_snapshot(ctx))
+    assert set(snapshot) == {"a", "b"}
+
+    ctx.forget_local("a")
+    assert ctx.local == {}
+    print("✅ Snapshots shared between phases")
+
+
+def test_record_before_load_is_ignored():
+    """Recording into a snapshot nobody loaded leaves it unloaded"""
+    ctx = SyncContext(db=None)
+    ctx.record_local(Event(uid="a"))
+    ctx.record_remote("a", {"uid": "a"})
+    assert ctx.local is None and ctx.remote is None
+    print("✅ Unloaded snapshots stay unloaded")
+
+
+if __name__ == "__main__":
+    test_category_matcher()
+    test_phases_share_snapshots()
+    test_record_before_load_is_ignored()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script for the single-flight sync gate.
+The sync functions are stubs, so nothing is synced for real.
+"""
+
+import asyncio
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.sync_gate import SyncGate
+
+
+def test_concurrent_callers_share_one_run():
+    """Five tabs opening at once cause exactly one sync"""
+    calls = {"count": 0}
+
+    async def full_sync(db):
+        calls["count"] += 1
+        await asyncio.sleep(0.05)
+        return {"status": "success", "message": "Full two-way sync completed successfully"}
+
+    async def run():
+        gate = SyncGate()
+        return await asyncio.gather(*(gate.run("two_way", full_sync) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert calls["count"] == 1
+    assert all(r["message"] == "Full two-way sync completed successfully" for r in results)
+    print("✅ Five concurrent callers, one sync")
+
+
+def test_max_age_reuses_recent_result():
+    """A recent successful result is returned without syncing; failures are not reused"""
+    calls = {"count": 0}
+
+    async def full_sync(db):
+        calls["count"] += 1
+        return {"status": "success", "message": "ok"}
+
+    async def failing_sync(db):
+        calls["count"] += 1
+        return {"status": "error", "message": "iCloud unreachable"}
+
+    async def run():
+        gate = SyncGate()
+        await gate.run("two_way", full_sync)
+        cached = await gate.run("two_way", full_sync, max_age=60)
+        fresh = await gate.run("two_way", full_sync, max_age=0)
+        await gate.run("import", failing_sync)
+        await gate.run("import", failing_sync, max_age=60)
+        return cached, fresh
+
+    cached, fresh = asyncio.run(run())
+    assert cached["cached"] is True
+    assert "cached" not in fresh
+    assert calls["count"] == 4
+    print("✅ max_age reuses only recent successful results")
+
+
+if __name__ == "__main__":
+    test_concurrent_callers_share_one_run()
+    test_max_age_reuses_recent_result()
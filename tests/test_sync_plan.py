@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Test script for sync plans and the dry-run preview.
+Uses an httpx mock transport and an in-memory SQLite database; no iCloud access needed.
+"""
+
+import asyncio
+import sys
+import os
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from sqlalchemy.future import select
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.calendar import Calendar
+from app.models.events import Event
+from app.services import two_way_sync
+from app.services.caldav_client import CalDAVCalendar, caldav_session
+from app.services.parse_cache import CountingCache
+from app.services.outbox import PUT, enqueue
+from app.services.sync_context import SyncContext
+from app.services.two_way_sync import full_two_way_sync, parse_icloud_events, plan_import, sync_icloud_to_homebase
+from conftest import memory_db, mock_client, mock_feed, run_steps
+
+CALENDAR_URL = "https://p43-caldav.icloud.com/123/calendars/HOMEBASE/"
+START = datetime(2027, 3, 10, 18, 0)
+
+FEED = b"""BEGIN:VCALENDAR
+VERSION:2.0
+BEGIN:VEVENT
+UID:new
+SUMMARY:Only in iCloud
+DTSTART:20270310T180000
+DTEND:20270310T190000
+END:VEVENT
+BEGIN:VEVENT
+UID:changed
+SUMMARY:Renamed in iCloud
+DTSTART:20270310T180000
+DTEND:20270310T190000
+END:VEVENT
+BEGIN:VEVENT
+UID:same
+SUMMARY:Same
+DTSTART:20270310T180000
+DTEND:20270310T190000
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def run(steps, caldav_handler=None, feed_handler=None, incremental=False):
+    """Run each step(db) in its own session against the mocked feed (and CalDAV); return their results."""
+    async def main():
+        rows = [Calendar(name="HomeBase", url="webcal://example.com")]
+        for uid, title in [("changed", "Original"), ("same", "Same"), ("local", "Only here")]:
+            rows.append(Event(uid=uid, title=title, start_time=START, end_time=START + timedelta(hours=1), calendar_id=1))
+        async with memory_db(*rows) as session_factory:
+            return await run_steps(session_factory, steps)
+
+    settings = two_way_sync.settings
+    with ExitStack() as stack:
+        stack.enter_context(mock_feed(feed_handler or (lambda request: httpx.Response(200, content=FEED))))
+        stack.enter_context(patch.object(two_way_sync, '_feed_cache', {}))
+        stack.enter_context(patch.object(settings, 'sync_window_enabled', False))
+        stack.enter_context(patch.object(settings, 'icloud_incremental_sync', incremental))
+        stack.enter_context(patch.object(settings, 'icloud_username', "user@example.com"))
+        stack.enter_context(patch.object(settings, 'icloud_password', "app-password"))
+        if caldav_handler is not None:
+            calendar = CalDAVCalendar(mock_client(caldav_handler), CALENDAR_URL)
+            stack.enter_context(patch.object(caldav_session, 'get_calendar', AsyncMock(return_value=calendar)))
+        return asyncio.run(main())
+
+
+async def titles(db):
+    return dict((await db.execute(select(Event.uid, Event.title))).all())
+
+
+def test_dry_run_previews_without_writing():
+    """A dry run lists every planned change with its reason and changes nothing"""
+    async def queue_edit(db):
+        await enqueue(db, "local", PUT)
+        await db.commit()
+
+    async def dry_run(db):
+        return await full_two_way_sync(db, dry_run=True)
+
+    async def feed_state(db):
+        return (await db.execute(select(Calendar.feed_state))).scalar_one()
+
+    _, result, after, state = run([queue_edit, dry_run, titles, feed_state])
+    details = result["details"]
+    imported, exported = details["import"]["plan"], details["export"]["plan"]
+    assert details["dry_run"] is True
+    assert imported["local_inserts"] == [{"uid": "new", "reason": "new in iCloud"}]
+    assert imported["local_updates"] == [{"uid": "changed", "reason": "changed in iCloud"}]
+    # "changed" is about to be imported and "local" is left to the outbox: nothing to export
+    assert exported["counts"]["remote_puts"] == 0
+    assert details["outbox"]["plan"]["remote_puts"][0]["uid"] == "local"
+    assert {"import.fetch", "import.plan", "export.plan"} <= set(details["timings"])
+    assert after == {"changed": "Original", "same": "Same", "local": "Only here"}
+    assert state is None
+    print("✅ Dry run previews without side effects")
+
+
+def test_dry_run_after_sync():
+    """A dry run after a real sync downloads the whole feed and leaves validators and caches alone"""
+    requests = []
+
+    def feed_handler(request):
+        requests.append(("FEED", request.headers.get("If-None-Match")))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=FEED, headers={"ETag": '"v1"'})
+
+    def caldav_handler(request):
+        requests.append((request.method, request.url.path))
+        if request.method == "REPORT":
+            return httpx.Response(207, text='<?xml version="1.0"?><d:multistatus xmlns:d="DAV:"/>')
+        return httpx.Response(201, headers={"ETag": '"1"'})
+
+    async def sync(db):
+        return await full_two_way_sync(db)
+
+    async def edit_locally(db):
+        # Written behind the sync's back: the next import would take the iCloud title back
+        event = (await db.execute(select(Event).where(Event.uid == "same"))).scalar_one()
+        event.title = "Edited here"
+        await db.commit()
+
+    async def dry_run(db):
+        state = (await db.execute(select(Calendar.feed_state))).scalar_one()
+        snapshot = two_way_sync._feed_cache
+        requests.clear()
+        with patch.object(CountingCache, 'save') as save:
+            result = await full_two_way_sync(db, dry_run=True)
+        after = (await db.execute(select(Calendar.feed_state))).scalar_one()
+        return result, list(requests), state == after, two_way_sync._feed_cache is snapshot, save.called
+
+    _, _, (result, sent, same_state, same_cache, saved) = run([sync, edit_locally, dry_run],
+                                                              caldav_handler=caldav_handler, feed_handler=feed_handler,
+                                                              incremental=True)
+    assert sent == [("FEED", None)]
+    assert result["details"]["import"]["plan"]["local_updates"] == [{"uid": "same", "reason": "changed in iCloud"}]
+    assert same_state and same_cache and not saved
+    print("✅ Dry run after a sync has no side effects")
+
+
+def test_export_plan_reasons():
+    """Local events missing from iCloud are planned as puts"""
+    async def dry_run(db):
+        return await full_two_way_sync(db, dry_run=True)
+
+    [result] = run([dry_run])
+    puts = result["details"]["export"]["plan"]["remote_puts"]
+    assert puts == [{"uid": "local", "reason": "missing in iCloud", "action": "add"}]
+    print("✅ Export plan lists puts with reasons")
+
+
+def test_export_applies_puts():
+    """A real export sends the planned puts and indexes the new resource"""
+    requests = []
+
+    def handler(request):
+        requests.append((request.method, request.url.path))
+        if request.method == "REPORT":
+            return httpx.Response(207, text='<?xml version="1.0"?><d:multistatus xmlns:d="DAV:"/>')
+        return httpx.Response(201, headers={"ETag": '"1"'})
+
+    async def sync(db):
+        return await full_two_way_sync(db)
+
+    async def local(db):
+        return (await db.execute(select(Event).where(Event.uid == "local"))).scalar_one()
+
+    result, event = run([sync, local], caldav_handler=handler)
+    export = result["details"]["export"]
+    assert (export["added"], export["plan"]["remote_puts"]) == (1, 1)
+    assert ("PUT", "/123/calendars/HOMEBASE/local.ics") in requests
+    assert event.remote_href == "/123/calendars/HOMEBASE/local.ics" and event.synced_at is not None
+    assert {"outbox", "import.apply", "export.apply"} <= set(result["details"]["timings"])
+    print("✅ Export applies its plan")
+
+
+def test_incremental_sync_without_changes():
+    """With incremental import, a run with nothing new costs a REPORT and a 304"""
+    same = FEED.split(b"BEGIN:VEVENT")[3].split(b"END:VEVENT")[0]
+    feed = b"BEGIN:VCALENDAR\nVERSION:2.0\nBEGIN:VEVENT" + same + b"END:VEVENT\nEND:VCALENDAR\n"
+    delta = []  # Resources the next sync-collection reports changed
+    requests = []
+
+    def feed_handler(request):
+        requests.append(("FEED", request.headers.get("If-None-Match")))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=feed, headers={"ETag": '"v1"'})
+
+    def caldav_handler(request):
+        requests.append((request.method, request.url.path))
+        if b"sync-collection" in request.content:
+            responses = "".join(
+                f'<d:response><d:href>{href}</d:href><d:propstat><d:prop><d:getetag>"2"</d:getetag></d:prop>'
+                f'<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>' for href, _ in delta)
+            return httpx.Response(207, text=f'<?xml version="1.0"?><d:multistatus xmlns:d="DAV:">{responses}'
+                                            f'<d:sync-token>t{len(requests)}</d:sync-token></d:multistatus>')
+        if b"calendar-multiget" in request.content:
+            responses = "".join(
+                f'<d:response><d:href>{href}</d:href><d:propstat><d:prop><d:getetag>"2"</d:getetag>'
+                f'<c:calendar-data>{data}</c:calendar-data></d:prop>'
+                f'<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>' for href, data in delta)
+            return httpx.Response(207, text='<?xml version="1.0"?><d:multistatus xmlns:d="DAV:" '
+                                            f'xmlns:c="urn:ietf:params:xml:ns:caldav">{responses}</d:multistatus>')
+        if request.method == "REPORT":
+            return httpx.Response(207, text='<?xml version="1.0"?><d:multistatus xmlns:d="DAV:"/>')
+        return httpx.Response(201, headers={"ETag": '"1"'})
+
+    async def sync(db):
+        requests.clear()
+        result = await full_two_way_sync(db)
+        return result, list(requests)
+
+    async def rename_in_icloud(db):
+        renamed = (b"BEGIN:VCALENDAR\nVERSION:2.0\nBEGIN:VEVENT" + same + b"END:VEVENT\nEND:VCALENDAR\n")
+        delta.append(("/123/calendars/HOMEBASE/same.ics", renamed.decode().replace("SUMMARY:Same", "SUMMARY:Renamed")))
+
+    first, second, _, third, after = run([sync, sync, rename_in_icloud, sync, titles],
+                                         caldav_handler=caldav_handler, feed_handler=feed_handler, incremental=True)
+    assert ("FEED", None) in first[1]
+    result, sent = second
+    assert [request for request in sent if request[0] == "FEED"] == [("FEED", '"v1"')]
+    assert [method for method, _ in sent] == ["REPORT", "FEED"]
+    assert result["details"]["writes"] == {"db": 0, "icloud": 0}
+    # The renamed event is imported from the delta, not pushed back from the 304's older snapshot
+    result, sent = third
+    assert result["details"]["import"]["updated"] == 1
+    assert "PUT" not in [method for method, _ in sent]
+    assert after["same"] == "Renamed"
+    print("✅ Incremental sync without changes costs one REPORT and a 304")
+
+
+def test_import_applies_its_plan():
+    """A real import applies exactly the planned inserts and updates"""
+    async def sync(db):
+        return await sync_icloud_to_homebase(db)
+
+    result, after = run([sync, titles])
+    details = result["details"]
+    assert (details["added"], details["updated"]) == (1, 1)
+    assert details["plan"]["local_inserts"] == 1 and details["plan"]["local_updates"] == 1
+    assert after["new"] == "Only in iCloud" and after["changed"] == "Renamed in iCloud"
+    print("✅ Import applies its plan")
+
+
+def test_incremental_plan_deletes():
+    """Deleted resources plan local deletes, except for events with a queued dashboard edit"""
+    async def plan(db):
+        for uid in ("gone", "edited"):
+            db.add(Event(uid=uid, title=uid, start_time=START, end_time=START + timedelta(hours=1),
+                         calendar_id=1, remote_href=f"/cal/{uid}.ics"))
+        await enqueue(db, "edited", PUT)
+        await db.commit()
+        events = parse_icloud_events(FEED.decode())
+        delta = {uid: dict(events[uid], href=f"/cal/{uid}.ics", etag='"1"') for uid in ("new", "same")}
+        changes = {'events': delta, 'deleted_hrefs': ["/cal/gone.ics", "/cal/edited.ics"], 'sync_token': "t2"}
+        return await plan_import(db, SyncContext(db), delta, changes)
+
+    [result] = run([plan])
+    assert [(c.uid, c.reason) for c in result.local_inserts] == [("new", "new in iCloud")]
+    # Same content, but the row now points at its resource
+    assert [(c.uid, c.reason) for c in result.local_updates] == [("same", "iCloud resource rewritten")]
+    assert [(c.uid, c.reason) for c in result.local_deletes] == [("gone", "deleted in iCloud")]
+    print("✅ Incremental plan deletes removed resources")
+
+
+if __name__ == "__main__":
+    test_dry_run_previews_without_writing()
+    test_dry_run_after_sync()
+    test_export_plan_reasons()
+    test_export_applies_puts()
+    test_incremental_sync_without_changes()
+    test_import_applies_its_plan()
+    test_incremental_plan_deletes()
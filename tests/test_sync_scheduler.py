@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for the background sync scheduler's job runner.
+Jobs are plain coroutines, so nothing is synced for real.
+"""
+
+import asyncio
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.sync_scheduler import SyncScheduler
+
+
+def test_run_job_records_result():
+    """A finished job's status and message are kept for /sync-status"""
+    async def job():
+        return {"status": "success", "message": "Full two-way sync completed successfully"}
+
+    scheduler = SyncScheduler()
+    asyncio.run(scheduler.run_job("icloud_sync", job))
+    state = scheduler.snapshot()["jobs"]["icloud_sync"]
+    assert state["status"] == "success"
+    assert state["message"] == "Full two-way sync completed successfully"
+    assert state["running"] is False
+    print("✅ Job result recorded")
+
+
+def test_run_job_timeout_and_errors():
+    """Slow or failing jobs are recorded as errors instead of raising"""
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def broken():
+        raise RuntimeError("iCloud unreachable")
+
+    scheduler = SyncScheduler()
+    asyncio.run(scheduler.run_job("hockey_sync", slow, timeout=0.01))
+    asyncio.run(scheduler.run_job("cleanup", broken))
+    jobs = scheduler.snapshot()["jobs"]
+    assert jobs["hockey_sync"]["status"] == "error"
+    assert "Timed out" in jobs["hockey_sync"]["message"]
+    assert jobs["cleanup"]["message"] == "iCloud unreachable"
+    assert scheduler.snapshot()["enabled"] is False
+    print("✅ Timeouts and errors recorded")
+
+
+if __name__ == "__main__":
+    test_run_job_records_result()
+    test_run_job_timeout_and_errors()
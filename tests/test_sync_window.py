@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for the active sync window.
+Uses an httpx mock transport and an in-memory SQLite database; no iCloud access needed.
+"""
+
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+
+import httpx
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.calendar import Calendar
+from app.models.events import Event
+from app.services.merge_join import merge_join
+from app.services.sync_context import SyncContext
+from app.services.sync_window import SyncWindow
+from app.services.two_way_sync import fetch_icloud_events
+from conftest import memory_db, mock_feed
+
+WINDOW = SyncWindow(datetime(2027, 1, 1), datetime(2027, 6, 1))
+
+FEED = b"""BEGIN:VCALENDAR
+VERSION:2.0
+BEGIN:VEVENT
+UID:old
+SUMMARY:Years ago
+DTSTART:20200310T180000Z
+DTEND:20200310T190000Z
+END:VEVENT
+BEGIN:VEVENT
+UID:current
+SUMMARY:Practice
+DTSTART:20270310T180000
+DTEND:20270310T190000
+END:VEVENT
+BEGIN:VEVENT
+UID:edge
+SUMMARY:Just before the window
+DTSTART:20261231T120000
+DTEND:20261231T130000
+END:VEVENT
+BEGIN:VEVENT
+UID:weekly
+SUMMARY:Since forever
+DTSTART:20190107T170000
+DTEND:20190107T180000
+RRULE:FREQ=WEEKLY
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def test_feed_limited_to_window():
+    """Events outside the window are dropped, mostly before they are parsed; series are kept"""
+    ctx = SyncContext(db=None)
+    ctx.window = WINDOW
+    with mock_feed(lambda request: httpx.Response(200, content=FEED)):
+        events = asyncio.run(fetch_icloud_events(ctx=ctx))
+    assert sorted(events) == ['current', 'weekly']
+    assert sorted(ctx.remote) == ['current', 'weekly']
+    # "old" never reached the parser; "edge" was parsed (within the raw margin) and then dropped
+    cache = ctx.parse_cache()
+    assert cache.hits + cache.misses == 3
+    print("✅ Feed limited to the sync window")
+
+
+def test_audit_has_no_window():
+    """Routine runs get the configured window; audits compare everything"""
+    routine = SyncContext(db=None)
+    assert routine.window is not None and routine.window.start < datetime.now() < routine.window.end
+    assert SyncContext(db=None, audit=True).window is None
+    print("✅ Audit runs are unwindowed")
+
+
+def test_local_side_limited_to_window():
+    """Local rows outside the window never show up in the merge-join"""
+    async def run():
+        rows = [Calendar(name="HomeBase", url="webcal://example.com")]
+        for uid, start, rrule in [("old", datetime(2020, 3, 10, 18), None),
+                                  ("current", datetime(2027, 3, 10, 18), None),
+                                  ("weekly", datetime(2019, 1, 7, 17), "FREQ=WEEKLY")]:
+            rows.append(Event(uid=uid, title=uid, start_time=start, end_time=start + timedelta(hours=1),
+                              rrule=rrule, calendar_id=1))
+        local_only = []
+        async with memory_db(*rows) as session_factory:
+            async with session_factory() as db:
+                async for chunk in merge_join(db, [], scope=WINDOW.clause()):
+                    local_only += chunk.local_only
+        return local_only
+
+    assert asyncio.run(run()) == ['current', 'weekly']
+    print("✅ Local rows limited to the sync window")
+
+
+if __name__ == "__main__":
+    test_feed_limited_to_window()
+    test_audit_has_no_window()
+    test_local_side_limited_to_window()
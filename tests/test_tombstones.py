@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Test script for tombstone-based deletion propagation.
+Uses an httpx mock transport and an in-memory SQLite database; no iCloud access needed.
+"""
+
+import asyncio
+import sys
+import os
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from sqlalchemy.future import select
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.calendar import Calendar
+from app.models.events import Event
+from app.models.tombstone import Tombstone
+from app.services import tombstones, two_way_sync
+from app.services.caldav_client import CalDAVCalendar, caldav_session
+from app.services.sync_context import SyncContext
+from app.services.two_way_sync import (
+    full_two_way_sync,
+    parse_icloud_events,
+    plan_import,
+    sync_homebase_to_icloud,
+    sync_icloud_to_homebase,
+)
+from conftest import memory_db, mock_client, mock_feed, run_steps
+
+CALENDAR_URL = "https://p43-caldav.icloud.com/123/calendars/HOMEBASE/"
+START = (datetime.now() + timedelta(days=1)).replace(hour=18, minute=0, second=0, microsecond=0)
+LONG_AGO = datetime.utcnow() - timedelta(days=2)
+
+
+def vevent(uid, start):
+    return (f"BEGIN:VEVENT\nUID:{uid}\nSUMMARY:{uid}\nDTSTART:{start:%Y%m%dT%H%M%S}\n"
+            f"DTEND:{start + timedelta(hours=1):%Y%m%dT%H%M%S}\nEND:VEVENT\n")
+
+
+# "kept" is in the window; "moved" was moved out of it in iCloud
+FEED = ("BEGIN:VCALENDAR\nVERSION:2.0\n" + vevent("kept", START)
+        + vevent("moved", START + timedelta(days=2000)) + "END:VCALENDAR\n").encode()
+
+
+def local_event(uid, **columns):
+    return Event(uid=uid, title=uid, start_time=START, end_time=START + timedelta(hours=1), calendar_id=1, **columns)
+
+
+def run(rows, steps, caldav_handler=None):
+    """Insert rows, then run each step(db) in its own session against the mocked feed; return their results."""
+    async def main():
+        async with memory_db(Calendar(name="HomeBase", url="webcal://example.com"), *rows) as session_factory:
+            return await run_steps(session_factory, steps)
+
+    settings = two_way_sync.settings
+    with ExitStack() as stack:
+        stack.enter_context(mock_feed(lambda request: httpx.Response(200, content=FEED)))
+        stack.enter_context(patch.object(settings, 'sync_window_enabled', True))
+        stack.enter_context(patch.object(settings, 'icloud_incremental_sync', False))
+        stack.enter_context(patch.object(settings, 'icloud_username', "user@example.com"))
+        stack.enter_context(patch.object(settings, 'icloud_password', "app-password"))
+        if caldav_handler is not None:
+            calendar = CalDAVCalendar(mock_client(caldav_handler), CALENDAR_URL)
+            stack.enter_context(patch.object(caldav_session, 'get_calendar', AsyncMock(return_value=calendar)))
+        return asyncio.run(main())
+
+
+async def uids(db):
+    return set((await db.execute(select(Event.uid))).scalars().all())
+
+
+async def graves(db):
+    return {t.uid: t for t in (await db.execute(select(Tombstone))).scalars().all()}
+
+
+def test_feed_deletion_tombstoned():
+    """Events that had been in iCloud and are gone from the feed are deleted and tombstoned"""
+    rows = [
+        local_event("kept", synced_at=LONG_AGO, updated_at=LONG_AGO),
+        local_event("gone", synced_at=LONG_AGO, updated_at=LONG_AGO, remote_href="/cal/gone.ics"),
+        local_event("moved", synced_at=LONG_AGO, updated_at=LONG_AGO),
+        local_event("just-pushed", synced_at=datetime.utcnow(), remote_href="/cal/just-pushed.ics"),
+        local_event("never-synced"),
+    ]
+
+    async def sync(db):
+        return await sync_icloud_to_homebase(db)
+
+    result, after, dead = run(rows, [sync, uids, graves])
+    assert result["details"]["deleted"] == 1
+    # Out of the window but still in iCloud, too recent to be in the feed, or not in iCloud yet
+    assert after == {"kept", "moved", "just-pushed", "never-synced"}
+    assert list(dead) == ["gone"] and dead["gone"].origin == tombstones.ICLOUD
+    assert dead["gone"].propagated_at is not None
+    print("✅ Feed deletions removed locally and tombstoned")
+
+
+def test_hockey_games_not_swept():
+    """Hockey games are local-only: missing from the feed, they are kept and exported"""
+    requests = []
+
+    def handler(request):
+        requests.append((request.method, request.url.path))
+        if request.method == "REPORT":
+            return httpx.Response(207, text='<?xml version="1.0"?><d:multistatus xmlns:d="DAV:"/>')
+        return httpx.Response(201, headers={"ETag": '"1"'})
+
+    rows = [
+        # As the hockey sync writes them: synced_at set, never pushed
+        local_event("hockey_20270101_1800", synced_at=LONG_AGO, updated_at=LONG_AGO),
+        # Pushed once, then gone from the feed: still the hockey site's to decide
+        local_event("hockey_20270102_1800", synced_at=LONG_AGO, updated_at=LONG_AGO,
+                    remote_href="/cal/hockey_20270102_1800.ics"),
+    ]
+
+    async def sync(db):
+        return await full_two_way_sync(db)
+
+    result, after, dead = run(rows, [sync, uids, graves], caldav_handler=handler)
+    assert result["details"]["import"]["deleted"] == 0 and dead == {}
+    assert {"hockey_20270101_1800", "hockey_20270102_1800"} <= after
+    assert ("PUT", "/123/calendars/HOMEBASE/hockey_20270101_1800.ics") in requests
+    print("✅ Hockey games kept and exported")
+
+
+def test_tombstones_block_feed_reimport():
+    """The feed doesn't bring back an event deleted on either side"""
+    rows = [
+        Tombstone(uid="kept", origin=tombstones.LOCAL, remote_href="/cal/kept.ics"),
+    ]
+
+    async def sync(db):
+        return await sync_icloud_to_homebase(db)
+
+    result, after = run(rows, [sync, uids])
+    assert result["details"]["added"] == 0 and after == set()
+    print("✅ Tombstoned events not re-imported from the feed")
+
+
+def test_export_sends_given_up_delete():
+    """A dashboard delete the outbox gave up on is sent by the export; iCloud deletions aren't undone"""
+    requests = []
+
+    def handler(request):
+        requests.append((request.method, request.url.path))
+        return httpx.Response(204)
+
+    rows = [
+        local_event("moved", synced_at=LONG_AGO, updated_at=LONG_AGO),
+        local_event("just-pushed", synced_at=datetime.utcnow(), remote_href="/cal/just-pushed.ics"),
+        Tombstone(uid="kept", origin=tombstones.LOCAL, remote_href="/123/calendars/HOMEBASE/kept.ics"),
+    ]
+
+    async def export(db):
+        return await sync_homebase_to_icloud(db)
+
+    result, dead = run(rows, [export, graves], caldav_handler=handler)
+    details = result["details"]
+    assert (details["deleted"], details["added"]) == (1, 0)
+    assert requests == [("DELETE", "/123/calendars/HOMEBASE/kept.ics")]
+    assert dead["kept"].propagated_at is not None
+    print("✅ Export sends undelivered deletes and leaves iCloud deletions alone")
+
+
+def test_incremental_delta_revives():
+    """CalDAV outranks an iCloud tombstone, but not a dashboard delete still on its way"""
+    async def plan(db):
+        db.add(Tombstone(uid="kept", origin=tombstones.ICLOUD, propagated_at=LONG_AGO))
+        db.add(Tombstone(uid="moved", origin=tombstones.LOCAL))
+        db.add(local_event("gone", remote_href="/cal/gone.ics"))
+        await db.commit()
+        events = parse_icloud_events(FEED.decode())
+        delta = {uid: dict(events[uid], href=f"/cal/{uid}.ics", etag='"1"') for uid in ("kept", "moved")}
+        changes = {'events': delta, 'deleted_hrefs': ["/cal/gone.ics"], 'sync_token': "t2"}
+        return await plan_import(db, SyncContext(db), delta, changes)
+
+    [result] = run([], [plan])
+    assert [change.uid for change in result.local_inserts] == ["kept"]
+    assert [(change.uid, change.tombstone) for change in result.local_deletes] == [("gone", True)]
+    assert result.skipped == 1
+    print("✅ Incremental delta revives iCloud tombstones only")
+
+
+def test_garbage_collected():
+    """Tombstones past the retention period are dropped, recent ones kept"""
+    async def collect(db):
+        db.add(Tombstone(uid="old", origin=tombstones.ICLOUD, deleted_at=datetime.utcnow() - timedelta(days=31)))
+        db.add(Tombstone(uid="recent", origin=tombstones.LOCAL))
+        await db.commit()
+        collected = await tombstones.collect_garbage(db)
+        await db.commit()
+        return collected, await tombstones.tombstone_status(db)
+
+    with patch.object(tombstones.settings, 'tombstone_retention_days', 30):
+        [(collected, status)] = run([], [collect])
+    assert collected == 1
+    assert (status["icloud"], status["local"], status["unpropagated"]) == (0, 1, 1)
+    print("✅ Expired tombstones collected")
+
+
+if __name__ == "__main__":
+    test_feed_deletion_tombstoned()
+    test_hockey_games_not_swept()
+    test_tombstones_block_feed_reimport()
+    test_export_sends_given_up_delete()
+    test_incremental_delta_revives()
+    test_garbage_collected()
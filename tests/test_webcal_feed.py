@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for conditional webcal feed fetching (ETag / Last-Modified / digest).
+Uses an httpx mock transport, so no network access is needed.
+"""
+
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import httpx
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.calendar import Calendar
+from app.services import two_way_sync
+from app.services.sync_context import SyncContext
+from app.services.webcal_feed import fetch_feed, feed_digest, get_feed_validators, set_feed_validators
+from conftest import mock_feed
+
+FEED = b"BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:1\r\nDTSTAMP:20250101T000000Z\r\nSUMMARY:Dinner\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n"
+
+
+def run_with_handler(handler, previous):
+    with mock_feed(handler):
+        return asyncio.run(fetch_feed("webcal://example.com/published/feed", previous))
+
+
+def test_digest_ignores_dtstamp():
+    """A regenerated DTSTAMP alone does not count as a change"""
+    restamped = FEED.replace(b"DTSTAMP:20250101T000000Z", b"DTSTAMP:20250202T000000Z")
+    assert feed_digest(FEED) == feed_digest(restamped)
+    assert feed_digest(FEED) != feed_digest(FEED.replace(b"Dinner", b"Lunch"))
+    print("✅ Digest ignores DTSTAMP")
+
+
+def test_not_modified():
+    """Validators are sent back and a 304 reports the feed as unchanged"""
+    seen = {}
+
+    def handler(request):
+        seen.update(request.headers)
+        assert request.url.scheme == "https"
+        return httpx.Response(304)
+
+    previous = {'etag': '"abc"', 'last_modified': 'Wed, 01 Jan 2025 00:00:00 GMT', 'digest': 'x'}
+    feed = run_with_handler(handler, previous)
+    assert feed.unchanged and feed.text is None
+    assert seen['if-none-match'] == '"abc"'
+    assert seen['if-modified-since'] == previous['last_modified']
+    print("✅ 304 short-circuits")
+
+
+def test_same_digest_is_unchanged():
+    """A 200 with an identical body is still reported as unchanged"""
+    def handler(request):
+        return httpx.Response(200, content=FEED, headers={'ETag': '"new"'})
+
+    feed = run_with_handler(handler, {'etag': '"old"', 'last_modified': None, 'digest': feed_digest(FEED)})
+    assert feed.unchanged
+    assert feed.validators['etag'] == '"new"'
+
+    feed = run_with_handler(handler, None)
+    assert not feed.unchanged and "Dinner" in feed.text
+    print("✅ Digest short-circuits")
+
+
+def test_unchanged_feed_not_parsed():
+    """The events of a feed whose digest is unchanged are never parsed"""
+    def handler(request):
+        return httpx.Response(200, content=FEED)
+
+    def fetch(digest):
+        row = SimpleNamespace(feed_state=None)
+        set_feed_validators(row, two_way_sync.FEED_CONSUMER, {'etag': None, 'last_modified': None, 'digest': digest})
+        with mock_feed(handler), \
+                patch.object(two_way_sync, 'icloud_event_data', parse), \
+                patch.object(two_way_sync, '_feed_cache', {}):
+            return asyncio.run(two_way_sync.fetch_icloud_events(row))
+
+    parse = Mock(return_value={'uid': '1'})
+    assert fetch(feed_digest(FEED)) is None
+    assert parse.call_count == 0
+    assert list(fetch("changed")) == ['1']
+    assert parse.call_count == 1
+    print("✅ Unchanged feed not parsed")
+
+
+def test_snapshot_fetch_is_conditional():
+    """The snapshot a later phase downloads reuses the stored validators; only a copy this process lost is fetched in full"""
+    sent = []
+
+    def handler(request):
+        sent.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=FEED, headers={'ETag': '"v1"'})
+
+    row = Calendar(name="HomeBase", url="webcal://example.com")
+
+    def snapshot():
+        ctx = SyncContext(db=None)
+        ctx.window = None
+        ctx._calendar_row = row
+        return asyncio.run(two_way_sync.remote_snapshot(ctx))
+
+    parse = Mock(return_value={'uid': '1'})
+    with mock_feed(handler), patch.object(two_way_sync, 'icloud_event_data', parse), \
+            patch.object(two_way_sync, '_feed_cache', {}):
+        assert list(snapshot()) == ['1'] and sent == [None]
+        assert list(snapshot()) == ['1'] and sent == [None, '"v1"']
+        two_way_sync._feed_cache.clear()
+        assert list(snapshot()) == ['1'] and sent == [None, '"v1"', '"v1"', None]
+    assert get_feed_validators(row, two_way_sync.SNAPSHOT_CONSUMER)['etag'] == '"v1"'
+    print("✅ Snapshot fetch is conditional")
+
+
+def test_validators_per_consumer():
+    row = SimpleNamespace(feed_state=None)
+    set_feed_validators(row, "two_way", {'digest': 'a'})
+    set_feed_validators(row, "legacy", {'digest': 'b'})
+    assert get_feed_validators(row, "two_way") == {'digest': 'a'}
+    assert get_feed_validators(row, "legacy") == {'digest': 'b'}
+    print("✅ Validators stored per consumer")
+
+
+if __name__ == "__main__":
+    test_digest_ignores_dtstamp()
+    test_not_modified()
+    test_same_digest_is_unchanged()
+    test_unchanged_feed_not_parsed()
+    test_snapshot_fetch_is_conditional()
+    test_validators_per_consumer()